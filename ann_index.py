@@ -0,0 +1,152 @@
+"""
+Index approximatif (IVF) sur les facteurs articles ALS, en numpy pur
+
+Les articles sont répartis en listes inversées par k-means sur leurs facteurs.
+À la requête, seules les n_probe listes dont le centroïde a le meilleur produit
+scalaire avec le vecteur utilisateur sont parcourues ; les candidats obtenus
+sont ensuite re-scorés exactement par le Recommender.
+"""
+
+import numpy as np
+from typing import Optional
+
+
+def _assign(vectors, centroids, block_size: int = 65536) -> np.ndarray:
+    """Centroïde le plus proche (distance L2) de chaque vecteur, par blocs"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        distances = centroid_norms - 2 * (block @ centroids.T)
+        assignments[start:start + block_size] = np.argmin(distances, axis=1)
+    return assignments
+
+
+def _kmeans(vectors, n_clusters: int, n_iter: int, rng) -> np.ndarray:
+    """K-means de Lloyd (les clusters vides sont réinitialisés sur des points tirés au hasard)"""
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = _assign(vectors, centroids)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.stack([
+            np.bincount(assignments, weights=vectors[:, dim], minlength=n_clusters)
+            for dim in range(vectors.shape[1])
+        ], axis=1)
+
+        non_empty = counts > 0
+        centroids[non_empty] = (sums[non_empty] / counts[non_empty, None]).astype(np.float32)
+        n_empty = int((~non_empty).sum())
+        if n_empty:
+            centroids[~non_empty] = vectors[rng.choice(len(vectors), n_empty, replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Index IVF (inverted file) pour la recherche par produit scalaire maximal"""
+
+    def __init__(self, centroids, list_offsets, list_items):
+        """
+        Args:
+            centroids: Centroïdes (n_lists, factors) float32
+            list_offsets: Début de chaque liste dans list_items (n_lists + 1) int64
+            list_items: Indices d'articles regroupés par liste, int32
+        """
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_items = list_items
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, item_factors, n_lists: Optional[int] = None, n_iter: int = 10,
+              sample_size: int = 100000, seed: int = 42) -> 'IVFIndex':
+        """
+        Construit l'index à partir des facteurs articles
+
+        Args:
+            item_factors: Facteurs articles ALS (n_items, factors)
+            n_lists: Nombre de listes (défaut: ~4 * sqrt(n_items))
+            n_iter: Itérations de k-means
+            sample_size: Nombre d'articles utilisés pour apprendre les centroïdes
+            seed: Graine aléatoire
+        """
+        item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+        n_items = len(item_factors)
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(n_items))
+        n_lists = max(1, min(n_lists, n_items))
+
+        rng = np.random.default_rng(seed)
+        sample = item_factors
+        if n_items > sample_size:
+            sample = item_factors[rng.choice(n_items, sample_size, replace=False)]
+        centroids = _kmeans(sample, n_lists, n_iter, rng)
+
+        assignments = _assign(item_factors, centroids)
+        list_items = np.argsort(assignments, kind='stable').astype(np.int32)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=list_offsets[1:])
+
+        return cls(centroids, list_offsets, list_items)
+
+    def _gather(self, probes, exclude=None) -> np.ndarray:
+        """Articles des listes probes, sans ceux de exclude"""
+        candidates = np.concatenate([
+            self.list_items[self.list_offsets[probe]:self.list_offsets[probe + 1]]
+            for probe in probes
+        ])
+        if exclude is not None and len(exclude):
+            candidates = candidates[~np.isin(candidates, exclude)]
+        return candidates
+
+    def search(self, query, n_probe: int = 8, min_candidates: int = 0, exclude=None) -> np.ndarray:
+        """
+        Articles candidats pour un vecteur utilisateur
+
+        Args:
+            query: Vecteur utilisateur (factors,)
+            n_probe: Nombre de listes parcourues (compromis rappel / latence)
+            min_candidates: Nombre minimal de candidats : tant qu'il n'est pas atteint,
+                les listes suivantes (par score de centroïde décroissant) sont parcourues
+            exclude: Indices d'articles à écarter (déjà vus), non comptés dans min_candidates
+
+        Returns:
+            Indices d'articles candidats (int32), non triés
+        """
+        n_probe = min(max(1, n_probe), self.n_lists)
+        centroid_scores = self.centroids @ query
+        if n_probe < self.n_lists:
+            probes = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        else:
+            probes = np.arange(self.n_lists)
+        candidates = self._gather(probes, exclude)
+        if len(candidates) >= min_candidates or n_probe == self.n_lists:
+            return candidates
+
+        # Pas assez de candidats : listes suivantes, par blocs de taille croissante
+        order = np.argsort(-centroid_scores, kind='stable')
+        remaining = order[~np.isin(order, probes)]
+        parts, n_candidates, start, step = [candidates], len(candidates), 0, n_probe
+        while n_candidates < min_candidates and start < len(remaining):
+            extra = self._gather(remaining[start:start + step], exclude)
+            parts.append(extra)
+            n_candidates += len(extra)
+            start, step = start + step, step * 2
+        return np.concatenate(parts)
+
+    def to_arrays(self) -> dict:
+        """Arrays à écrire dans le bundle d'artefacts"""
+        return {
+            'ann_centroids': self.centroids,
+            'ann_list_offsets': self.list_offsets,
+            'ann_list_items': self.list_items
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> Optional['IVFIndex']:
+        """Reconstruit l'index depuis les arrays du bundle (None s'il est absent)"""
+        if 'ann_centroids' not in arrays:
+            return None
+        return cls(arrays['ann_centroids'], arrays['ann_list_offsets'], arrays['ann_list_items'])
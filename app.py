@@ -95,9 +95,13 @@ def calculate_azure_cost(execution_time_seconds):
 # Charger les métadonnées des articles si disponibles
 @st.cache_data
 def load_articles_metadata():
-    """Charge les métadonnées des articles"""
+    """Charge les métadonnées des articles (cache en colonnes si columnar_cache est disponible)"""
     try:
-        df = pd.read_csv('articles_metadata.csv')
+        try:
+            from columnar_cache import load_articles_metadata as load_cached_articles
+            df = load_cached_articles('articles_metadata.csv')
+        except ImportError:
+            df = pd.read_csv('articles_metadata.csv')
         return df
     except Exception as e:
         st.warning(f"Impossible de charger les métadonnées des articles: {e}")
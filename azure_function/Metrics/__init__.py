@@ -0,0 +1,50 @@
+"""
+Azure Function d'export des métriques du worker (GET /api/metrics)
+
+Histogrammes de durée par étape et compteurs de RecommendArticle (même
+worker), au format texte de Prometheus ou en JSON (?format=json). Chaque
+worker tient ses propres métriques : le label worker (pid) les distingue.
+"""
+
+import json
+import os
+import sys
+import azure.functions as func
+
+# Ajouter le chemin parent pour importer RecommendArticle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from ..RecommendArticle import METRICS, _response_cache
+except (ImportError, ValueError):
+    from RecommendArticle import METRICS, _response_cache
+
+
+def cache_counters() -> dict:
+    """Statistiques du cache des réponses non comptées par les requêtes (évictions, regroupements)"""
+    stats = _response_cache.stats()
+    return {'cache_evictions': stats['evictions'], 'cache_coalesced': stats['coalesced']}
+
+
+def main(req):
+    """
+    Azure Function HTTP Trigger (GET)
+
+    Args:
+        req: Requête HTTP (format=json pour un export JSON)
+
+    Returns:
+        Métriques du worker au format texte de Prometheus (ou JSON)
+    """
+    if req.params.get('format') == 'json':
+        snapshot = METRICS.snapshot()
+        snapshot['counters'].update(cache_counters())
+        snapshot['worker'] = os.getpid()
+        return func.HttpResponse(json.dumps(snapshot), status_code=200, mimetype='application/json')
+
+    return func.HttpResponse(
+        METRICS.render_prometheus(extra_counters=cache_counters()),
+        status_code=200,
+        mimetype='text/plain',
+        headers={'Cache-Control': 'no-store'}
+    )
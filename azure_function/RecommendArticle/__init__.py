@@ -1,253 +1,488 @@
 """
 Azure Function pour le système de recommandation
-Option 2: Charge directement les fichiers depuis Azure Blob Storage
+Le bundle d'artefacts est récupéré par la fonction elle-même, une seule fois par
+worker, et mis en cache sur le disque local (voir artifact_store.py)
+Chaque étape d'une requête est chronométrée (voir metrics.py) : durées exposées
+dans l'en-tête Server-Timing et cumulées pour la fonction Metrics (/api/metrics)
+Chaque requête produit au plus un enregistrement de log, échantillonné et émis
+depuis un thread d'arrière-plan (voir request_log.py)
 """
 
 import logging
 import json
-import pickle
 import os
 import sys
-from typing import List
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
 import azure.functions as func
 
 # Ajouter le chemin parent pour importer recommender
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from .recommender import Recommender
+    from .recommender import RECOMMENDATION_MODES, Recommender
+    from .artifact_store import default_cache_root, fetch_bundle, store_from_environment
+    from .metrics import Metrics, server_timing
+    from .request_log import RequestLog
 except ImportError:
-    try:
-        from recommender import Recommender
-    except ImportError:
-        # Si recommender n'est pas disponible, définir une classe minimale
-        class Recommender:
-            def __init__(self):
-                self.als_model = None
-                self.csr_train = None
-                self.user_to_idx = None
-                self.item_to_idx = None
-                self.unique_users = None
-                self.unique_items = None
-                self.popularity_recommendations = None
-            
-            def load_from_separate_files(self, model_path: str, metadata_path: str, csr_path: str):
-                with open(model_path, 'rb') as f:
-                    self.als_model = pickle.load(f)
-                with open(metadata_path, 'rb') as f:
-                    metadata = pickle.load(f)
-                self.user_to_idx = metadata['user_to_idx']
-                self.item_to_idx = metadata['item_to_idx']
-                self.unique_users = metadata['unique_users']
-                self.unique_items = metadata['unique_items']
-                self.popularity_recommendations = metadata['popularity_recommendations']
-                with open(csr_path, 'rb') as f:
-                    self.csr_train = pickle.load(f)
+    from recommender import RECOMMENDATION_MODES, Recommender
+    from artifact_store import default_cache_root, fetch_bundle, store_from_environment
+    from metrics import Metrics, server_timing
+    from request_log import RequestLog
+
+
+class ResponseCache:
+    """
+    Cache LRU/TTL en mémoire des réponses JSON déjà sérialisées
+    
+    Les clés incluent la version du modèle ; tout le cache est vidé quand un
+    nouveau modèle est chargé. Les requêtes identiques concurrentes sont
+    regroupées : une seule calcule la réponse, les autres attendent son résultat.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (expiration, bytes)
+        self._inflight = {}  # clé -> threading.Event du calcul en cours
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+    
+    def invalidate(self, model_version=None):
+        """Vide le cache (appelé au chargement d'un nouveau modèle)"""
+        with self._lock:
+            self._entries.clear()
+            self._model_version = model_version
+    
+    def ensure_model_version(self, model_version):
+        """Invalide tout le cache si le modèle servi a changé"""
+        if model_version != self._model_version:
+            self.invalidate(model_version)
+    
+    def _lookup(self, key):
+        """Entrée valide pour key, ou None (à appeler sous verrou)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def get_or_compute(self, key, compute):
+        """
+        Retourne (body, hit) : la réponse en cache, ou celle calculée par compute()
+        
+        Args:
+            key: Clé hashable (version du modèle, user_id, révision de l'utilisateur, n_reco, mode)
+            compute: Fonction sans argument retournant les bytes de la réponse
+        """
+        if self.max_size <= 0:
+            return compute(), False
+        
+        with self._lock:
+            body = self._lookup(key)
+            if body is not None:
+                self.hits += 1
+                return body, True
             
-            def recommend(self, user_id: int, n_reco: int = 5) -> List[int]:
-                if self.als_model is None:
-                    raise ValueError("Modèle non chargé")
-                if user_id not in self.user_to_idx:
-                    return self.popularity_recommendations[:n_reco]
-                user_idx = self.user_to_idx[user_id]
-                user_vector = self.csr_train[user_idx]
-                recommendations = self.als_model.recommend(user_idx, user_vector, N=n_reco, filter_already_liked_items=True)
-                import numpy as np
-                if isinstance(recommendations, np.ndarray):
-                    if recommendations.ndim == 2:
-                        recommended_item_ids = [self.unique_items[int(item_idx)] for item_idx in recommendations[:, 0]]
-                    else:
-                        recommended_item_ids = [self.unique_items[int(item_idx)] for item_idx in recommendations]
-                else:
-                    if len(recommendations) > 0 and isinstance(recommendations[0], (tuple, list)) and len(recommendations[0]) >= 2:
-                        recommended_item_ids = [self.unique_items[int(rec[0])] for rec in recommendations]
-                    else:
-                        recommended_item_ids = [self.unique_items[int(rec)] for rec in recommendations]
-                if len(recommended_item_ids) < n_reco:
-                    recommended_item_ids.extend(self.popularity_recommendations[:n_reco - len(recommended_item_ids)])
-                return recommended_item_ids[:n_reco]
-
-
-# Variable globale pour le recommandeur (chargé une seule fois)
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+                self.misses += 1
+        
+        if not leader:
+            # Même requête déjà en cours de calcul : attendre son résultat
+            event.wait()
+            with self._lock:
+                body = self._lookup(key)
+                if body is not None:
+                    self.coalesced += 1
+                    return body, True
+            # Le calcul concurrent a échoué : calculer sans partager
+            return compute(), False
+        
+        try:
+            body = compute()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return body, False
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced
+            }
+
+
+# Limites des requêtes (nombre de recommandations, taille des batchs)
+MAX_N_RECO = int(os.environ.get('MAX_N_RECO', '100'))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', '256'))
+# Articles de session acceptés pour personnaliser un utilisateur anonyme
+MAX_SESSION_ARTICLES = int(os.environ.get('MAX_SESSION_ARTICLES', '200'))
+
+# Cache des réponses (RESPONSE_CACHE_SIZE=0 le désactive)
+_response_cache = ResponseCache(
+    max_size=int(os.environ.get('RESPONSE_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '300'))
+)
+
+# Métriques du worker (METRICS_ENABLED=0 désactive chronométrage et en-tête Server-Timing)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS = Metrics()
+_NO_TIMER = nullcontext()
+
+
+def _timer(stage: str):
+    """Chronomètre une étape de la requête si les métriques sont actives"""
+    return METRICS.timer(stage) if METRICS_ENABLED else _NO_TIMER
+
+
+# Un enregistrement structuré par requête (REQUEST_LOG_VERBOSITY, REQUEST_LOG_SAMPLE_RATE)
+REQUEST_LOG = RequestLog()
+
+# Variable globale pour le recommandeur (chargé une seule fois par worker)
 _recommender = None
+_recommender_lock = threading.Lock()
+_bundle_version = None
+_refresh_thread = None
+
+# Relecture du journal de la surcouche (clics écrits par les autres workers)
+OVERLAY_SYNC_SECONDS = float(os.environ.get('OVERLAY_SYNC_SECONDS', '2'))
+_last_overlay_sync = 0.0
+
+
+def overlay_log_path():
+    """Journal des clics ajoutés depuis l'entraînement (OVERLAY_LOG_PATH, vide = en mémoire)"""
+    log_path = os.environ.get('OVERLAY_LOG_PATH')
+    if log_path is None:
+        return default_cache_root() / 'user_overlay.jsonl'
+    return log_path or None
+
+
+def _load_bundle(bundle_dir):
+    """Construit un Recommender sur un bundle du cache local"""
+    recommender = Recommender()
+    # USE_TOPK_TABLE=0 force le scoring ALS à la volée même si la table top-K est présente
+    recommender.use_topk_table = os.environ.get('USE_TOPK_TABLE', '1') != '0'
+    # ANN_N_PROBE : listes IVF parcourues si le bundle a un index approximatif (0 = exact)
+    recommender.ann_n_probe = int(os.environ.get('ANN_N_PROBE', '8'))
+    recommender.load_bundle(str(bundle_dir))
+    if METRICS_ENABLED:
+        recommender.metrics = METRICS
+    # Surcouche des utilisateurs mis à jour depuis l'entraînement (OVERLAY_ENABLED=0 la désactive)
+    if os.environ.get('OVERLAY_ENABLED', '1') != '0':
+        restored = recommender.enable_overlay(overlay_log_path())
+        if restored:
+            logging.info(f"Surcouche restaurée : {restored} utilisateurs mis à jour depuis l'entraînement")
+    return recommender
 
 
-def load_recommender(model_blob=None, metadata_blob=None, csr_blob=None):
+def sync_overlay(recommender):
+    """Applique, au plus toutes les OVERLAY_SYNC_SECONDS, les clics écrits par les autres workers"""
+    global _last_overlay_sync
+    
+    now = time.monotonic()
+    if recommender.overlay is None or now - _last_overlay_sync < OVERLAY_SYNC_SECONDS:
+        return
+    _last_overlay_sync = now
+    try:
+        recommender.sync_overlay()
+    except Exception as e:
+        logging.warning(f"Relecture du journal de la surcouche impossible: {e}")
+
+
+def _refresh_loop(store, interval: float):
     """
-    Charge le recommandeur depuis Azure Blob Storage (via input binding)
+    Vérifie périodiquement la version du bundle en arrière-plan
     
-    Args:
-        model_blob: Bytes du modèle ALS (depuis Azure Blob binding)
-        metadata_blob: Bytes des metadata (depuis Azure Blob binding)
-        csr_blob: Bytes de la matrice CSR (depuis Azure Blob binding)
+    Les requêtes ne touchent jamais le stockage : un nouveau modèle est chargé
+    ici puis substitué atomiquement au recommandeur courant.
+    """
+    global _recommender, _bundle_version
+    
+    while True:
+        time.sleep(interval)
+        try:
+            bundle_dir = fetch_bundle(store)
+            if bundle_dir.name != _bundle_version:
+                with _timer('model_load'):
+                    recommender = _load_bundle(bundle_dir)
+                METRICS.increment('model_reloads')
+                with _recommender_lock:
+                    _recommender, _bundle_version = recommender, bundle_dir.name
+                _response_cache.invalidate(recommender.model_version)
+                logging.info(f"✅ Nouveau modèle chargé (bundle {bundle_dir.name})")
+        except Exception as e:
+            logging.warning(f"Vérification du bundle impossible: {e}")
+
+
+def load_recommender():
+    """
+    Charge le recommandeur une seule fois par worker
+    
+    Le bundle est récupéré depuis Azure Blob Storage (ou ARTIFACTS_LOCAL_DIR) et
+    mis en cache sur le disque local, indexé par l'ETag du manifest.
+    ARTIFACTS_REFRESH_SECONDS > 0 active la détection d'un nouveau modèle en
+    arrière-plan (par défaut, le modèle change au redémarrage du worker).
     """
-    global _recommender
+    global _recommender, _bundle_version, _refresh_thread
     
     if _recommender is not None:
         return _recommender
     
-    try:
-        _recommender = Recommender()
+    with _recommender_lock:
+        if _recommender is not None:
+            return _recommender
         
-        # Si les blobs sont fournis (production Azure), les utiliser directement
-        if model_blob is not None and metadata_blob is not None and csr_blob is not None:
-            logging.info("Chargement depuis Azure Blob Storage (bindings)")
-            
-            # Les blobs peuvent être des InputStream, il faut les lire en bytes
-            import io
-            
-            # Fonction helper pour convertir InputStream en bytes
-            def read_blob(blob, name="blob"):
-                try:
-                    if hasattr(blob, 'read'):
-                        # C'est un InputStream, le lire en mode binaire
-                        # S'assurer qu'on lit tout le contenu
-                        if hasattr(blob, 'seek'):
-                            try:
-                                blob.seek(0)  # Retourner au début si possible
-                            except:
-                                pass  # Si seek n'est pas supporté, continuer
-                        
-                        # Lire tout le contenu
-                        data = blob.read()
-                        
-                        # Vérifier que c'est bien des bytes
-                        if isinstance(data, str):
-                            # Si c'est une string, c'est un problème - les pickles doivent être binaires
-                            logging.error(f"Blob {name} lu comme string au lieu de bytes! Type: {type(data)}, Premiers caractères: {data[:50] if len(data) > 50 else data}")
-                            # Essayer de convertir en bytes (mais cela peut corrompre les données)
-                            data = data.encode('latin-1')  # Préserver les bytes
-                            logging.warning(f"Conversion string->bytes effectuée pour {name}, mais les données peuvent être corrompues")
-                        elif not isinstance(data, bytes):
-                            # Essayer de convertir
-                            logging.warning(f"Blob {name} type inattendu: {type(data)}, tentative de conversion")
-                            data = bytes(data)
-                        
-                        # Vérifier les premiers bytes pour s'assurer que c'est un pickle valide
-                        if len(data) > 0:
-                            # Les fichiers pickle commencent généralement par certains bytes
-                            first_bytes = data[:4] if len(data) >= 4 else data
-                            logging.info(f"Blob {name} lu: {len(data)} bytes, premiers bytes: {first_bytes.hex() if isinstance(first_bytes, bytes) else str(first_bytes)}")
-                        else:
-                            logging.error(f"Blob {name} est vide!")
-                        
-                        return data
-                    elif isinstance(blob, bytes):
-                        # C'est déjà des bytes
-                        logging.info(f"Blob {name} déjà en bytes: {len(blob)} bytes")
-                        return blob
-                    else:
-                        # Essayer de convertir
-                        logging.warning(f"Blob {name} type inattendu: {type(blob)}, tentative de conversion")
-                        return bytes(blob)
-                except Exception as e:
-                    logging.error(f"Erreur lors de la lecture du blob {name}: {e}", exc_info=True)
-                    raise ValueError(f"Impossible de lire le blob {name}: {e}")
-            
-            logging.info("Lecture des blobs depuis InputStream...")
-            model_bytes = read_blob(model_blob, "model")
-            metadata_bytes = read_blob(metadata_blob, "metadata")
-            csr_bytes = read_blob(csr_blob, "csr")
-            
-            # Vérifier que les blobs ne sont pas vides
-            if len(model_bytes) == 0 or len(metadata_bytes) == 0 or len(csr_bytes) == 0:
-                raise ValueError("Un ou plusieurs blobs sont vides")
-            
-            logging.info(f"Taille des blobs - Modèle: {len(model_bytes)}, Metadata: {len(metadata_bytes)}, CSR: {len(csr_bytes)}")
-            
-            # Utiliser la méthode load_from_bytes si disponible
-            if hasattr(_recommender, 'load_from_bytes'):
-                _recommender.load_from_bytes(model_bytes, metadata_bytes, csr_bytes)
-            else:
-                # Fallback: charger manuellement
-                logging.info("Chargement du modèle...")
-                _recommender.als_model = pickle.load(io.BytesIO(model_bytes))
-                logging.info("Chargement des metadata...")
-                metadata = pickle.load(io.BytesIO(metadata_bytes))
-                logging.info("Chargement de la matrice CSR...")
-                _recommender.csr_train = pickle.load(io.BytesIO(csr_bytes))
-                
-                _recommender.user_to_idx = metadata['user_to_idx']
-                _recommender.item_to_idx = metadata['item_to_idx']
-                _recommender.unique_users = metadata['unique_users']
-                _recommender.unique_items = metadata['unique_items']
-                _recommender.popularity_recommendations = metadata['popularity_recommendations']
+        try:
+            store = store_from_environment()
+            logging.info(f"Chargement du bundle depuis {store.describe()}")
+            with _timer('model_load'):
+                bundle_dir = fetch_bundle(store)
+                _recommender, _bundle_version = _load_bundle(bundle_dir), bundle_dir.name
+            METRICS.increment('cold_starts')
+            logging.info(f"✅ Modèle chargé avec succès (bundle {_bundle_version})")
+        except Exception as e:
+            logging.error(f"❌ Erreur lors du chargement du modèle: {e}", exc_info=True)
+            raise
         
-        else:
-            # Fallback: charger depuis le système de fichiers (développement local)
-            logging.info("Chargement depuis le système de fichiers (mode développement)")
-            
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            local_model = os.path.join(script_dir, '..', '..', 'als_model.pkl')
-            local_metadata = os.path.join(script_dir, '..', '..', 'metadata.pkl')
-            local_csr = os.path.join(script_dir, '..', '..', 'csr_train.pkl')
-            
-            # Vérifier que les fichiers existent
-            if not os.path.exists(local_model):
-                raise FileNotFoundError(f"Fichier modèle non trouvé: {local_model}")
-            if not os.path.exists(local_metadata):
-                raise FileNotFoundError(f"Fichier metadata non trouvé: {local_metadata}")
-            if not os.path.exists(local_csr):
-                raise FileNotFoundError(f"Fichier CSR non trouvé: {local_csr}")
-            
-            _recommender.load_from_separate_files(local_model, local_metadata, local_csr)
+        refresh_interval = float(os.environ.get('ARTIFACTS_REFRESH_SECONDS', '0'))
+        if refresh_interval > 0 and _refresh_thread is None:
+            _refresh_thread = threading.Thread(
+                target=_refresh_loop, args=(store, refresh_interval), daemon=True
+            )
+            _refresh_thread.start()
         
-        logging.info("✅ Modèle chargé avec succès")
         return _recommender
+
+
+def iter_batch_results(recommender, user_ids, n_reco: int, chunk_size: int = BATCH_CHUNK_SIZE,
+                       mode: str = 'als'):
+    """
+    Recommandations d'un batch, calculées par blocs via le scoring vectorisé
     
-    except Exception as e:
-        logging.error(f"❌ Erreur lors du chargement du modèle: {e}", exc_info=True)
-        raise
+    Yields:
+        Tuples (user_id, liste de article_id) dans l'ordre de user_ids
+    """
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        for user_id, recommendations in zip(chunk, recommender.recommend_many(chunk, n_reco, mode=mode)):
+            yield user_id, [int(rec) for rec in recommendations]
+
+
+def iter_batch_jsonl(recommender, user_ids, n_reco: int, chunk_size: int = BATCH_CHUNK_SIZE,
+                     mode: str = 'als'):
+    """Réponse batch en JSON lines, produite bloc par bloc (une ligne par utilisateur)"""
+    lines = []
+    for user_id, recommendations in iter_batch_results(recommender, user_ids, n_reco, chunk_size, mode):
+        lines.append(json.dumps({'user_id': user_id, 'recommendations': recommendations}))
+        if len(lines) == chunk_size:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
 
 
-def main(req, modelBlob=None, metadataBlob=None, csrBlob=None):
+def _error_response(error: str, message: str, status_code: int = 400):
+    return func.HttpResponse(
+        json.dumps({'error': error, 'message': message}),
+        status_code=status_code,
+        mimetype='application/json'
+    )
+
+
+def _parse_n_reco(req, req_body):
+    """
+    n_reco depuis le body ou les query params (défaut: 5), borné par MAX_N_RECO
+    
+    Entier JSON ou chaîne d'entier, comme les identifiants : 5.9 ou true sont
+    refusés plutôt que servis comme 5 ou 1.
+    """
+    n_reco = req_body.get('n_reco') if req_body else None
+    if n_reco is None:
+        n_reco = req.params.get('n_reco', 5)
+    try:
+        n_reco = _parse_int_ids([n_reco])[0]
+    except ValueError:
+        raise ValueError(f"n_reco doit être un entier compris entre 1 et {MAX_N_RECO}")
+    if not 1 <= n_reco <= MAX_N_RECO:
+        raise ValueError(f"n_reco doit être compris entre 1 et {MAX_N_RECO}")
+    return n_reco
+
+
+def _parse_mode(req, req_body, recommender) -> str:
+    """Mode de recommandation depuis le body ou les query params (défaut: RECOMMENDATION_MODE ou 'als')"""
+    mode = (req_body.get('mode') if req_body else None) or req.params.get('mode')
+    mode = mode or os.environ.get('RECOMMENDATION_MODE', 'als')
+    if mode not in RECOMMENDATION_MODES:
+        raise ValueError(f"mode doit valoir {' ou '.join(RECOMMENDATION_MODES)}")
+    if mode == 'content' and recommender.content_index is None:
+        raise ValueError("mode 'content' indisponible : le bundle ne contient pas d'index content-based")
+    return mode
+
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _parse_int_ids(values) -> list:
+    """
+    Liste d'identifiants : entiers JSON ou chaînes d'entiers, dans l'intervalle int64
+    
+    Les flottants (1.5), booléens et valeurs hors int64 sont refusés plutôt que
+    tronqués ou convertis (ValueError).
+    """
+    ids = []
+    for value in values:
+        if isinstance(value, str) and value.strip().lstrip('+-').isdecimal():
+            value = int(value)
+        if type(value) is not int or not INT64_MIN <= value <= INT64_MAX:
+            raise ValueError(f"identifiant invalide: {value!r}")
+        ids.append(value)
+    return ids
+
+
+def _parse_article_ids(req, req_body):
+    """
+    Articles lus pendant la session (body: liste, query: "1,2,3"), ou None
+    
+    Bornés par MAX_SESSION_ARTICLES ; une répétition compte comme un clic de plus.
+    """
+    article_ids = req_body.get('article_ids') if req_body else None
+    if article_ids is None:
+        article_ids = req.params.get('article_ids')
+        if article_ids is None:
+            return None
+        article_ids = [article_id for article_id in str(article_ids).split(',') if article_id.strip()]
+    if not isinstance(article_ids, list):
+        raise ValueError("article_ids doit être une liste d'entiers")
+    if len(article_ids) > MAX_SESSION_ARTICLES:
+        raise ValueError(f"article_ids limité à {MAX_SESSION_ARTICLES} articles")
+    try:
+        return _parse_int_ids(article_ids)
+    except ValueError:
+        raise ValueError("article_ids doit être une liste d'entiers")
+
+
+def _wants_jsonl(req, req_body) -> bool:
+    """Format JSON lines demandé via body/query (format=jsonl) ou en-tête Accept"""
+    response_format = (req_body.get('format') if req_body else None) or req.params.get('format')
+    if response_format:
+        return response_format == 'jsonl'
+    headers = getattr(req, 'headers', None) or {}
+    return 'application/x-ndjson' in (headers.get('accept') or '')
+
+
+def batch_response(req, req_body, recommender, n_reco: int, mode: str = 'als'):
+    """
+    Mode batch : {"user_ids": [...], "n_reco": k} traité en une seule invocation
+    
+    Le scoring passe par Recommender.recommend_many (un produit matriciel par
+    bloc de BATCH_CHUNK_SIZE utilisateurs). Avec format=jsonl, la réponse est
+    écrite bloc par bloc en JSON lines, sans construire la liste complète des
+    résultats ; le modèle HTTP Python v1 d'Azure Functions impose toutefois un
+    body complet, la transmission reste donc en un seul envoi.
+    """
+    user_ids = req_body['user_ids']
+    if not isinstance(user_ids, list):
+        return _error_response('user_ids invalide', 'user_ids doit être une liste d\'entiers')
+    if len(user_ids) > MAX_BATCH_SIZE:
+        return _error_response(
+            'Batch trop grand',
+            f'{len(user_ids)} user_ids reçus, maximum {MAX_BATCH_SIZE} par requête',
+            status_code=413
+        )
+    try:
+        user_ids = _parse_int_ids(user_ids)
+    except ValueError:
+        return _error_response('user_ids invalide', 'user_ids doit être une liste d\'entiers')
+    
+    REQUEST_LOG.note(batch_size=len(user_ids))
+    
+    if _wants_jsonl(req, req_body):
+        return func.HttpResponse(
+            b''.join(iter_batch_jsonl(recommender, user_ids, n_reco, mode=mode)),
+            status_code=200,
+            mimetype='application/x-ndjson'
+        )
+    
+    results = [
+        {'user_id': user_id, 'recommendations': recommendations}
+        for user_id, recommendations in iter_batch_results(recommender, user_ids, n_reco, mode=mode)
+    ]
+    with _timer('serialization'):
+        body = json.dumps({'n_reco': n_reco, 'mode': mode, 'count': len(results), 'results': results})
+    return func.HttpResponse(
+        body,
+        status_code=200,
+        mimetype='application/json'
+    )
+
+
+def main(req):
     """
     Azure Function HTTP Trigger
     
     Args:
-        req: Requête HTTP contenant user_id
-        modelBlob: Blob du modèle ALS (input binding Azure)
-        metadataBlob: Blob des metadata (input binding Azure)
-        csrBlob: Blob de la matrice CSR (input binding Azure)
+        req: Requête HTTP contenant user_id (et optionnellement n_reco et mode
+            'als' / 'content'), ou un body {"user_ids": [...], "n_reco": k} pour le mode batch
     
     Returns:
-        JSON avec les recommandations
+        JSON avec les recommandations (JSON lines possible en mode batch), et
+        les durées par étape dans l'en-tête Server-Timing
     """
-    logging.info('='*60)
-    logging.info('Azure Function RecommendArticle déclenchée')
-    
-    # Les blobs peuvent être des InputStream, pas des bytes directement
-    # On ne peut pas utiliser len() sur un InputStream
-    def get_blob_info(blob, name):
-        if blob is None:
-            return f"{name}: None"
-        blob_type = type(blob).__name__
-        # Si c'est un InputStream, on ne peut pas obtenir la taille directement
-        if hasattr(blob, 'read'):
-            return f"{name}: {blob_type} (InputStream)"
-        elif hasattr(blob, '__len__'):
-            return f"{name}: {blob_type}, Taille: {len(blob)}"
-        else:
-            return f"{name}: {blob_type}"
-    
-    logging.info(get_blob_info(modelBlob, 'modelBlob'))
-    logging.info(get_blob_info(metadataBlob, 'metadataBlob'))
-    logging.info(get_blob_info(csrBlob, 'csrBlob'))
+    REQUEST_LOG.begin(req)
+    if not METRICS_ENABLED:
+        response = handle_request(req)
+        REQUEST_LOG.end(response.status_code, cache=response.headers.get('X-Cache'))
+        return response
     
+    METRICS.begin_request()
     try:
-        # Charger le recommandeur (une seule fois, puis mis en cache)
-        # Les blobs sont fournis automatiquement par Azure Functions via les input bindings
-        logging.info('Début du chargement du recommandeur...')
+        response = handle_request(req)
+    finally:
+        timings = METRICS.end_request()
+    METRICS.increment('requests')
+    if response.status_code >= 400:
+        METRICS.increment('errors')
+    cache = response.headers.get('X-Cache')
+    response.headers['Server-Timing'] = server_timing(timings, cache=cache)
+    REQUEST_LOG.end(response.status_code, timings, cache)
+    return response
+
+
+def handle_request(req):
+    """Traitement d'une requête RecommendArticle (voir main)"""
+    try:
+        # Charger le recommandeur (une seule fois par worker, puis mis en cache)
         try:
-            recommender = load_recommender(modelBlob, metadataBlob, csrBlob)
-            logging.info('✅ Recommandeur chargé avec succès')
+            recommender = load_recommender()
+            sync_overlay(recommender)
         except Exception as load_error:
-            # Capturer spécifiquement les erreurs de chargement
-            import traceback
-            error_trace = traceback.format_exc()
-            logging.error(f"❌ ERREUR CRITIQUE lors du chargement du modèle: {load_error}")
-            logging.error(f"❌ Type d'erreur: {type(load_error).__name__}")
-            logging.error(f"❌ Traceback complet:\n{error_trace}")
+            # Erreur de chargement : traceback joint à l'enregistrement de la requête
+            REQUEST_LOG.fail(load_error)
+            REQUEST_LOG.detail(stage='model_load')
             
             # Retourner une erreur détaillée
             return func.HttpResponse(
@@ -262,36 +497,61 @@ def main(req, modelBlob=None, metadataBlob=None, csrBlob=None):
             )
         
         # Récupérer le user_id depuis la requête
+        with _timer('parse'):
+            try:
+                req_body = req.get_json()
+            except ValueError as e:
+                if req.get_body():
+                    REQUEST_LOG.detail(body_error=str(e))
+                req_body = {}
+            REQUEST_LOG.detail(body=req_body)
+        if not isinstance(req_body, dict):
+            req_body = {}
+        
+        # Nombre de recommandations demandé (défaut: 5)
+        try:
+            n_reco = _parse_n_reco(req, req_body)
+        except (ValueError, TypeError) as e:
+            return _error_response('n_reco invalide', str(e))
+        
+        # Mode de recommandation : ALS (défaut) ou content-based
         try:
-            req_body = req.get_json()
-            logging.info(f'Body de la requête: {req_body}')
+            mode = _parse_mode(req, req_body, recommender)
         except ValueError as e:
-            logging.warning(f'Impossible de parser le body JSON: {e}')
-            req_body = {}
+            return _error_response('mode invalide', str(e))
+        
+        REQUEST_LOG.note(n_reco=n_reco, mode=mode)
+        
+        # Mode batch : plusieurs utilisateurs en une seule invocation
+        if 'user_ids' in req_body:
+            return batch_response(req, req_body, recommender, n_reco, mode)
+        
+        # Articles lus pendant la session (utilisateurs anonymes)
+        try:
+            article_ids = _parse_article_ids(req, req_body)
+        except ValueError as e:
+            return _error_response('article_ids invalide', str(e))
         
         # Support pour GET (query params) et POST (body)
         user_id = req_body.get('user_id') if req_body else None
         if user_id is None:
             user_id = req.params.get('user_id')
-            logging.info(f'user_id depuis query params: {user_id}')
         
-        if user_id is None:
-            logging.warning('user_id manquant dans la requête')
+        if user_id is None and article_ids is None:
             return func.HttpResponse(
                 json.dumps({
                     'error': 'user_id manquant',
-                    'message': 'Veuillez fournir un user_id dans les paramètres de requête ou le body JSON'
+                    'message': 'Veuillez fournir un user_id (ou des article_ids) dans les paramètres de requête ou le body JSON'
                 }),
                 status_code=400,
                 mimetype='application/json'
             )
         
-        # Convertir en int
+        # Entier JSON ou chaîne d'entier (1475.9 ou "1e3" sont refusés, pas tronqués)
         try:
-            user_id = int(user_id)
-            logging.info(f'user_id converti en int: {user_id}')
+            user_id = _parse_int_ids([user_id])[0] if user_id is not None else None
         except (ValueError, TypeError) as e:
-            logging.error(f'Erreur de conversion user_id: {e}')
+            REQUEST_LOG.detail(user_id_error=str(e))
             return func.HttpResponse(
                 json.dumps({
                     'error': 'user_id invalide',
@@ -301,34 +561,65 @@ def main(req, modelBlob=None, metadataBlob=None, csrBlob=None):
                 mimetype='application/json'
             )
         
-        # Obtenir les recommandations
-        logging.info(f'Génération des recommandations pour user_id={user_id}...')
-        recommendations = recommender.recommend(user_id, n_reco=5)
-        logging.info(f'Recommandations générées: {recommendations}')
+        REQUEST_LOG.note(user_id=user_id)
         
-        # Convertir les recommandations en types Python standard (pour éviter les problèmes avec numpy int64)
-        recommendations_list = [int(rec) for rec in recommendations]
-
-        # Retourner le JSON
-        response = {
-            'user_id': user_id,
-            'recommendations': recommendations_list,
-            'count': len(recommendations_list)
-        }
+        # Utilisateur absent du modèle avec un historique de session : facteur
+        # calculé à la volée, réponse propre à la session (non mise en cache)
+        if article_ids is not None and (user_id is None or user_id not in recommender.user_to_idx):
+            recommendations = recommender.recommend_from_articles(article_ids, n_reco=n_reco, mode=mode)
+            recommendations_list = [int(rec) for rec in recommendations]
+            REQUEST_LOG.note(session_articles=len(article_ids))
+            REQUEST_LOG.detail(recommendations=recommendations_list)
+            with _timer('serialization'):
+                body = json.dumps({
+                    'user_id': user_id,
+                    'recommendations': recommendations_list,
+                    'count': len(recommendations_list),
+                    'mode': mode
+                }, indent=2)
+            return func.HttpResponse(
+                body,
+                status_code=200,
+                mimetype='application/json',
+                headers={'X-Cache': 'BYPASS'}
+            )
         
-        logging.info(f"✅ Recommandations générées pour user_id={user_id}: {recommendations}")
+        def compute_response() -> bytes:
+            # Obtenir les recommandations
+            recommendations = recommender.recommend(user_id, n_reco=n_reco, mode=mode)
+            
+            # Convertir les recommandations en types Python standard (pour éviter les problèmes avec numpy int64)
+            with _timer('conversion'):
+                recommendations_list = [int(rec) for rec in recommendations]
+            REQUEST_LOG.detail(recommendations=recommendations_list)
+            
+            # Réponse JSON sérialisée une seule fois (mise en cache telle quelle)
+            response = {
+                'user_id': user_id,
+                'recommendations': recommendations_list,
+                'count': len(recommendations_list),
+                'mode': mode
+            }
+            with _timer('serialization'):
+                return json.dumps(response, indent=2).encode('utf-8')
+        
+        # Cache des réponses, vidé automatiquement si le modèle change
+        _response_cache.ensure_model_version(recommender.model_version)
+        body, cache_hit = _response_cache.get_or_compute(
+            (recommender.model_version, user_id, recommender.user_revision(user_id), n_reco, mode),
+            compute_response
+        )
+        METRICS.increment('cache_hits' if cache_hit else 'cache_misses')
         
         return func.HttpResponse(
-            json.dumps(response, indent=2),
+            body,
             status_code=200,
-            mimetype='application/json'
+            mimetype='application/json',
+            headers={'X-Cache': 'HIT' if cache_hit else 'MISS'}
         )
     
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        logging.error(f"❌ Erreur: {str(e)}")
-        logging.error(f"❌ Traceback complet:\n{error_details}")
+        REQUEST_LOG.fail(e)
         
         # Retourner une réponse avec plus de détails en mode développement
         error_response = {
@@ -338,7 +629,7 @@ def main(req, modelBlob=None, metadataBlob=None, csrBlob=None):
         }
         
         # Ne pas exposer le traceback complet en production pour des raisons de sécurité
-        # Mais le logger pour le diagnostic
+        # (il est joint à l'enregistrement de la requête, toujours émis en cas d'erreur)
         return func.HttpResponse(
             json.dumps(error_response),
             status_code=500,
@@ -0,0 +1,188 @@
+"""
+Récupération du bundle d'artefacts avec cache disque local
+
+Le bundle (manifest.json + fichiers .npy, voir serialize_artifacts.py) est lu
+depuis Azure Blob Storage ou depuis un simple dossier, puis copié dans un cache
+local indexé par la version (ETag) du manifest. Un redémarrage du worker sur le
+même hôte réutilise le cache sans retélécharger.
+
+Les scripts d'upload publient les .npy sous un préfixe propre à chaque bundle
+(manifest['files_prefix']) puis remplacent le manifest en dernier : un worker
+lit soit l'ancien bundle complet, soit le nouveau. La taille et le SHA-256 de
+chaque fichier notés dans le manifest sont en plus vérifiés avant la mise en
+cache (bundles publiés à plat, upload interrompu).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class BundleIntegrityError(RuntimeError):
+    """Fichier du bundle ne correspondant pas au manifest (upload en cours ou interrompu)"""
+
+
+class LocalDirectoryStore:
+    """Source d'artefacts sur le système de fichiers (développement local, tests)"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def get_version(self, name: str) -> str:
+        """Pseudo-ETag dérivé de la date de modification et de la taille du fichier"""
+        stat = (self.root / name).stat()
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def download(self, name: str, destination: Path):
+        shutil.copyfile(self.root / name, destination)
+
+    def describe(self) -> str:
+        return f"dossier {self.root}"
+
+
+class BlobStore:
+    """Source d'artefacts sur Azure Blob Storage (ou l'émulateur Azurite)"""
+
+    def __init__(self, connection_string: str, container: str = 'models', prefix: str = 'artifacts'):
+        # Import local : azure-storage-blob n'est nécessaire que pour cette source
+        from azure.storage.blob import BlobServiceClient
+
+        self.container = container
+        self.prefix = prefix.strip('/')
+        self._container_client = BlobServiceClient.from_connection_string(
+            connection_string
+        ).get_container_client(container)
+
+    def _blob_name(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def get_version(self, name: str) -> str:
+        properties = self._container_client.get_blob_client(self._blob_name(name)).get_blob_properties()
+        return properties.etag.strip('"')
+
+    def download(self, name: str, destination: Path):
+        blob_client = self._container_client.get_blob_client(self._blob_name(name))
+        with open(destination, 'wb') as f:
+            blob_client.download_blob(max_concurrency=4).readinto(f)
+
+    def describe(self) -> str:
+        return f"blob {self.container}/{self.prefix}"
+
+
+def store_from_environment():
+    """
+    Construit la source d'artefacts depuis les variables d'environnement
+
+    - ARTIFACTS_LOCAL_DIR: dossier contenant le bundle (prioritaire)
+    - ARTIFACTS_CONNECTION: nom du setting de connexion (défaut: AzureWebJobsStorage)
+    - ARTIFACTS_CONTAINER / ARTIFACTS_PREFIX: emplacement du bundle (défaut: models/artifacts)
+
+    Sans connexion configurée, le bundle 'artifacts/' à la racine du projet est utilisé.
+    """
+    local_dir = os.environ.get('ARTIFACTS_LOCAL_DIR')
+    if local_dir:
+        return LocalDirectoryStore(local_dir)
+
+    connection_string = os.environ.get(os.environ.get('ARTIFACTS_CONNECTION', 'AzureWebJobsStorage'))
+    if connection_string:
+        return BlobStore(
+            connection_string,
+            container=os.environ.get('ARTIFACTS_CONTAINER', 'models'),
+            prefix=os.environ.get('ARTIFACTS_PREFIX', 'artifacts')
+        )
+
+    project_root = Path(__file__).resolve().parent.parent.parent
+    return LocalDirectoryStore(project_root / 'artifacts')
+
+
+def default_cache_root() -> Path:
+    """Dossier du cache local (ARTIFACTS_CACHE_DIR ou dossier temporaire de l'hôte)"""
+    cache_dir = os.environ.get('ARTIFACTS_CACHE_DIR')
+    return Path(cache_dir) if cache_dir else Path(tempfile.gettempdir()) / 'recommender_artifacts'
+
+
+def fetch_bundle(store, cache_root: Optional[Path] = None) -> Path:
+    """
+    Retourne le dossier local du bundle courant, en le téléchargeant si besoin
+
+    Le cache est indexé par la version (ETag) du manifest : seul cet appel de
+    métadonnées touche le stockage quand le bundle est déjà en cache. Le
+    téléchargement se fait dans un dossier temporaire renommé atomiquement, de
+    sorte qu'un bundle partiel n'est jamais visible par un autre worker. Chaque
+    fichier est vérifié (taille, SHA-256) contre le manifest avant ce renommage.
+
+    Args:
+        store: Source d'artefacts (LocalDirectoryStore ou BlobStore)
+        cache_root: Dossier racine du cache (défaut: default_cache_root())
+
+    Returns:
+        Chemin du dossier local contenant le bundle complet
+
+    Raises:
+        BundleIntegrityError: Un fichier ne correspond pas au manifest ; rien
+            n'est mis en cache, l'appel suivant retente le téléchargement
+    """
+    cache_root = Path(cache_root or default_cache_root())
+    cache_root.mkdir(parents=True, exist_ok=True)
+
+    version = store.get_version(MANIFEST_NAME)
+    bundle_dir = cache_root / re.sub(r'[^A-Za-z0-9._-]', '_', version)
+    if (bundle_dir / MANIFEST_NAME).exists():
+        logging.info(f"Bundle {version} trouvé dans le cache local {bundle_dir}")
+        return bundle_dir
+
+    logging.info(f"Téléchargement du bundle {version} depuis {store.describe()}...")
+    staging_dir = Path(tempfile.mkdtemp(prefix='.staging-', dir=cache_root))
+    try:
+        store.download(MANIFEST_NAME, staging_dir / MANIFEST_NAME)
+        with open(staging_dir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+        files_prefix = manifest.get('files_prefix', '').strip('/')
+        for info in manifest['arrays'].values():
+            source = f"{files_prefix}/{info['file']}" if files_prefix else info['file']
+            store.download(source, staging_dir / info['file'])
+            _verify_file(staging_dir / info['file'], info, source)
+
+        try:
+            os.rename(staging_dir, bundle_dir)
+        except OSError:
+            # Un autre worker a publié la même version entre-temps
+            if not (bundle_dir / MANIFEST_NAME).exists():
+                raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    _remove_stale_versions(cache_root, keep=bundle_dir)
+    return bundle_dir
+
+
+def _verify_file(path: Path, info: dict, source: str):
+    """Compare un fichier téléchargé à la taille et au SHA-256 notés dans le manifest"""
+    expected_size = info.get('bytes')
+    if expected_size is not None and path.stat().st_size != expected_size:
+        raise BundleIntegrityError(
+            f"{source}: {path.stat().st_size} octets au lieu de {expected_size} (bundle en cours de publication ?)"
+        )
+    expected_digest = info.get('sha256')
+    if expected_digest is not None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != expected_digest:
+            raise BundleIntegrityError(f"{source}: SHA-256 différent du manifest (bundle en cours de publication ?)")
+
+
+def _remove_stale_versions(cache_root: Path, keep: Path):
+    """Supprime les anciennes versions du cache (les fichiers mappés restent valides sous Linux)"""
+    for entry in cache_root.iterdir():
+        if entry.is_dir() and entry != keep and not entry.name.startswith('.staging-'):
+            shutil.rmtree(entry, ignore_errors=True)
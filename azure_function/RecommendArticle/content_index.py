@@ -0,0 +1,154 @@
+"""
+Recommandation content-based sur les embeddings d'articles, en numpy pur
+
+Le profil d'un utilisateur est la moyenne (pondérée par le nombre de clics) des
+embeddings normalisés L2 des articles qu'il a lus ; les articles proches en
+cosinus de ce profil sont recommandés. Plutôt qu'un scan cosinus du catalogue
+entier à chaque requête, un graphe de voisinage article -> top-K articles est
+précalculé par produits matriciels par blocs : les lectures d'un utilisateur
+sont étendues en candidats par simple indexation, puis re-scorées.
+"""
+
+import numpy as np
+from typing import Optional
+
+
+def normalize_rows(embeddings) -> np.ndarray:
+    """Normalisation L2 ligne par ligne (les lignes nulles restent nulles)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def build_neighbour_graph(embeddings, k: int = 20, max_block_mb: int = 256):
+    """
+    Top-K voisins cosinus de chaque article, par blocs de lignes
+
+    La mémoire de travail est bornée par max_block_mb : chaque bloc calcule
+    block_size x n_articles similarités, jamais la matrice n x n complète.
+
+    Args:
+        embeddings: Embeddings normalisés L2 (n_articles, dim)
+        k: Nombre de voisins conservés par article
+        max_block_mb: Taille maximale d'un bloc de similarités (MB)
+
+    Returns:
+        Tuple (neighbours int32 (n, k), similarities float32 (n, k)), triés par
+        similarité décroissante, sans l'article lui-même
+    """
+    n_articles = len(embeddings)
+    k = max(1, min(k, n_articles - 1))
+    block_size = max(1, (max_block_mb * 1024 * 1024) // (4 * n_articles))
+
+    neighbours = np.empty((n_articles, k), dtype=np.int32)
+    similarities = np.empty((n_articles, k), dtype=np.float32)
+    for start in range(0, n_articles, block_size):
+        end = min(start + block_size, n_articles)
+        block_scores = embeddings[start:end] @ embeddings.T
+        # Exclure l'article lui-même
+        block_scores[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        top = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block_scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        neighbours[start:end] = np.take_along_axis(top, order, axis=1)
+        similarities[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbours, similarities
+
+
+class ContentIndex:
+    """Graphe de voisinage article -> article pour la recommandation content-based"""
+
+    def __init__(self, article_ids, neighbours, similarities, embeddings=None):
+        """
+        Args:
+            article_ids: article_id de chaque ligne d'embedding (n_articles,)
+            neighbours: Lignes des K voisins de chaque article (n_articles, k) int32
+            similarities: Similarités cosinus correspondantes (n_articles, k)
+            embeddings: Embeddings normalisés (optionnel) pour re-scorer
+                exactement les candidats contre le profil utilisateur
+        """
+        self.article_ids = article_ids
+        self.neighbours = neighbours
+        self.similarities = similarities
+        self.embeddings = embeddings
+
+    @property
+    def n_articles(self) -> int:
+        return len(self.neighbours)
+
+    @classmethod
+    def build(cls, embeddings, article_ids=None, k: int = 20, max_block_mb: int = 256,
+              keep_embeddings: bool = False) -> 'ContentIndex':
+        """
+        Construit le graphe de voisinage à partir des embeddings bruts
+
+        Args:
+            embeddings: Embeddings d'articles (originaux ou réduits par reduce_embeddings_pca.py)
+            article_ids: article_id de chaque ligne (défaut: l'index de la ligne)
+            k: Nombre de voisins par article
+            max_block_mb: Taille maximale d'un bloc de similarités (MB)
+            keep_embeddings: Garder les embeddings normalisés pour le re-scoring exact
+        """
+        embeddings = normalize_rows(embeddings)
+        if article_ids is None:
+            article_ids = np.arange(len(embeddings), dtype=np.int64)
+        neighbours, similarities = build_neighbour_graph(embeddings, k, max_block_mb)
+        return cls(np.asarray(article_ids), neighbours, similarities,
+                   embeddings if keep_embeddings else None)
+
+    def score_candidates(self, rows, weights=None):
+        """
+        Candidats (non triés) proches d'un historique de lecture
+
+        Les voisins des articles lus sont agrégés (somme des similarités pondérée
+        par le nombre de clics, proportionnelle au cosinus avec le profil moyen
+        restreint au graphe) ; avec les embeddings, les candidats sont re-scorés
+        exactement par cosinus avec le profil.
+
+        Args:
+            rows: Lignes des articles lus (n_read,)
+            weights: Poids de chaque lecture (défaut: 1)
+
+        Returns:
+            Tuple (rows, scores) des articles candidats non lus
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.ones(len(rows), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+
+        candidates = self.neighbours[rows].ravel()
+        candidate_scores = (self.similarities[rows] * weights[:, None]).ravel()
+        candidates, inverse = np.unique(candidates, return_inverse=True)
+        scores = np.bincount(inverse.ravel(), weights=candidate_scores, minlength=len(candidates))
+
+        # Masquer les articles déjà lus
+        unread = ~np.isin(candidates, rows)
+        candidates, scores = candidates[unread], scores[unread].astype(np.float32)
+
+        if self.embeddings is not None and len(candidates):
+            profile = weights @ self.embeddings[rows]
+            profile /= max(float(np.linalg.norm(profile)), 1e-12)
+            scores = self.embeddings[candidates] @ profile
+
+        return candidates, scores
+
+    def to_arrays(self) -> dict:
+        """Arrays à écrire dans le bundle d'artefacts"""
+        arrays = {
+            'content_article_ids': self.article_ids,
+            'content_neighbours': self.neighbours,
+            'content_similarities': self.similarities
+        }
+        if self.embeddings is not None:
+            arrays['content_embeddings'] = self.embeddings
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> Optional['ContentIndex']:
+        """Reconstruit l'index depuis les arrays du bundle (None s'il est absent)"""
+        if 'content_neighbours' not in arrays:
+            return None
+        return cls(arrays['content_article_ids'], arrays['content_neighbours'],
+                   arrays['content_similarities'], arrays.get('content_embeddings'))
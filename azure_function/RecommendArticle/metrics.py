@@ -0,0 +1,227 @@
+"""
+Métriques du worker : histogrammes de durée par étape et compteurs
+
+Chaque étape du traitement d'une requête (chargement du modèle, parsing du
+body, lookup des ID, scoring ALS, conversion des ID, sérialisation JSON) est
+chronométrée dans un histogramme à buckets fixes. Pendant une requête, les
+durées sont cumulées par étape (thread courant) puis observées une seule fois à
+sa fin : une étape chronométrée en plusieurs blocs (lecture de la table top-K
+puis scoring à la volée) compte pour une observation, leur somme. Ce cumul
+produit aussi l'en-tête Server-Timing.
+L'export suit le format texte de Prometheus (fonction Metrics, /api/metrics).
+
+Les valeurs sont propres au processus worker : un hôte à plusieurs workers
+expose une série par worker (label worker = pid).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Étapes chronométrées, dans l'ordre du traitement d'une requête
+STAGES = ('model_load', 'parse', 'lookup', 'scoring', 'conversion', 'serialization', 'total')
+
+# Bornes supérieures des buckets (secondes) : de 50 µs à 30 s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Compteurs exportés, avec leur description
+COUNTERS = {
+    'requests': "Requêtes traitées par RecommendArticle",
+    'errors': "Réponses d'erreur (4xx/5xx)",
+    'cold_starts': "Chargements du modèle au démarrage du worker",
+    'model_reloads': "Nouveaux modèles chargés en arrière-plan",
+    'popularity_fallback': "Utilisateurs inconnus servis par le fallback popularité",
+    'parse_error_fallback': "Erreurs de parsing des recommandations ALS (fallback popularité)",
+    'cache_hits': "Réponses servies depuis le cache",
+    'cache_misses': "Réponses calculées (absentes du cache)",
+    'cache_evictions': "Entrées évincées du cache (taille maximale atteinte)",
+    'cache_coalesced': "Requêtes identiques concurrentes servies par un seul calcul",
+}
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes (count, somme, max)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # dernier : au-delà de la dernière borne
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Borne supérieure du bucket contenant le quantile q (approximation)"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _StageTimer:
+    """Context manager chronométrant une étape (voir Metrics.timer)"""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Registre des métriques du worker, partagé par les fonctions du même processus
+
+    observe()/increment() sont appelés depuis les threads des requêtes : les
+    mises à jour passent par un verrou (quelques centaines de ns par appel).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.histograms = {stage: Histogram(buckets) for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.started_at = time.time()
+
+    def timer(self, stage: str) -> _StageTimer:
+        """Context manager ajoutant la durée du bloc à l'histogramme de stage"""
+        return _StageTimer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Ajoute une durée à l'étape stage
+
+        Pendant une requête (begin_request), la durée est cumulée avec les autres
+        blocs de la même étape et observée à end_request ; sinon (rechargement du
+        modèle en arrière-plan) elle va directement dans l'histogramme.
+        """
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+            return
+        self._observe_many({stage: seconds})
+
+    def _observe_many(self, timings: dict):
+        with self._lock:
+            for stage, seconds in timings.items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram()
+                histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def begin_request(self):
+        """Démarre le relevé des durées par étape de la requête du thread courant"""
+        self._local.timings = {}
+        self._local.start = time.perf_counter()
+
+    def end_request(self) -> dict:
+        """
+        Termine le relevé de la requête du thread courant
+
+        Chaque étape de la requête (durées cumulées) est observée une fois dans
+        son histogramme, 'total' compris.
+
+        Returns:
+            Dict étape -> secondes, 'total' compris
+        """
+        timings = getattr(self._local, 'timings', None) or {}
+        start = getattr(self._local, 'start', None)
+        self._local.timings = self._local.start = None
+        if start is not None:
+            timings['total'] = time.perf_counter() - start
+        self._observe_many(timings)
+        return timings
+
+    def snapshot(self) -> dict:
+        """Copie cohérente des compteurs et des histogrammes"""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {
+                    stage: {
+                        'buckets': histogram.buckets,
+                        'counts': list(histogram.counts),
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'max': histogram.max,
+                        'p50': histogram.quantile(0.5),
+                        'p99': histogram.quantile(0.99),
+                    }
+                    for stage, histogram in self.histograms.items()
+                },
+                'uptime_seconds': time.time() - self.started_at,
+            }
+
+    def render_prometheus(self, extra_counters: dict = None, prefix: str = 'recommender') -> str:
+        """
+        Export au format texte de Prometheus (version 0.0.4)
+
+        Args:
+            extra_counters: Compteurs supplémentaires {nom: valeur} (ex: statistiques du cache)
+            prefix: Préfixe des noms de métriques
+        """
+        snapshot = self.snapshot()
+        worker = f'worker="{os.getpid()}"'
+        lines = []
+
+        counters = dict(snapshot['counters'], **(extra_counters or {}))
+        for name, value in counters.items():
+            metric = f'{prefix}_{name}_total'
+            lines.append(f'# HELP {metric} {COUNTERS.get(name, name)}')
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{{{worker}}} {value}')
+
+        metric = f'{prefix}_stage_duration_seconds'
+        lines.append(f'# HELP {metric} Durée des étapes du traitement des requêtes')
+        lines.append(f'# TYPE {metric} histogram')
+        for stage, histogram in snapshot['histograms'].items():
+            labels = f'{worker},stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{metric}_sum{{{labels}}} {histogram["sum"]:.6f}')
+            lines.append(f'{metric}_count{{{labels}}} {histogram["count"]}')
+
+        metric = f'{prefix}_uptime_seconds'
+        lines.append(f'# TYPE {metric} gauge')
+        lines.append(f'{metric}{{{worker}}} {snapshot["uptime_seconds"]:.0f}')
+        return '\n'.join(lines) + '\n'
+
+
+def server_timing(timings: dict, cache: str = None) -> str:
+    """
+    Valeur de l'en-tête Server-Timing (durées en ms)
+
+    Exemple: "parse;dur=0.04, lookup;dur=0.01, scoring;dur=0.85, total;dur=1.20, cache;desc=MISS"
+    """
+    entries = [f'{stage};dur={seconds * 1000:.2f}' for stage, seconds in timings.items()]
+    if cache:
+        entries.append(f'cache;desc={cache}')
+    return ', '.join(entries)
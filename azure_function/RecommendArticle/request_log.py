@@ -0,0 +1,205 @@
+"""
+Journal des requêtes : un enregistrement structuré par requête, échantillonné
+
+Au lieu d'une dizaine de logging.info par invocation, les champs utiles sont
+notés pendant la requête puis émis en un seul enregistrement JSON à la fin.
+Les requêtes réussies sont échantillonnées ; les erreurs sont toujours émises,
+avec le détail de débogage (body, paramètres, recommandations, traceback).
+Ce détail est résumé à l'émission seulement (listes longues : taille + premiers
+éléments, chaînes tronquées) pour qu'un body de plusieurs milliers d'ID ne
+finisse pas en une seule ligne de journal.
+
+L'émission passe par une QueueHandler : le thread de la requête ne fait que
+déposer l'enregistrement dans une file, le formatage (JSON, traceback) et
+l'envoi vers les handlers du logger racine (Application Insights sur Azure)
+ont lieu dans le thread d'un QueueListener.
+
+Configuration (variables d'environnement):
+    REQUEST_LOG_VERBOSITY: 'errors', 'sampled' (défaut), 'all' ou 'debug' (détail toujours émis)
+    REQUEST_LOG_SAMPLE_RATE: Fraction des requêtes réussies journalisées en mode 'sampled' (défaut 0.01)
+    REQUEST_LOG_ASYNC: '0' pour émettre sur le thread de la requête (sans file)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+VERBOSITIES = ('errors', 'sampled', 'all', 'debug')
+
+# Bornes du détail de débogage (voir summarize)
+DETAIL_MAX_ITEMS = 10
+DETAIL_MAX_CHARS = 256
+DETAIL_MAX_DEPTH = 3
+
+
+def summarize(value, max_items: int = DETAIL_MAX_ITEMS, max_chars: int = DETAIL_MAX_CHARS,
+              depth: int = DETAIL_MAX_DEPTH):
+    """
+    Version bornée d'une valeur à journaliser
+
+    Les listes de plus de max_items éléments deviennent {'size', 'head'}, les
+    dicts gardent leurs max_items premières clés (+ '...': nombre omis) et les
+    chaînes sont coupées à max_chars caractères.
+    """
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f"{value[:max_chars]}... ({len(value)} caractères)"
+    if isinstance(value, (bytes, bytearray)):
+        return summarize(value.decode('utf-8', errors='replace'), max_items, max_chars, depth)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if depth <= 0:
+        return summarize(repr(value), max_items, max_chars, 0)
+    if isinstance(value, dict):
+        summary = {str(key): summarize(item, max_items, max_chars, depth - 1)
+                   for key, item in list(value.items())[:max_items]}
+        if len(value) > max_items:
+            summary['...'] = f"{len(value) - max_items} clés omises"
+        return summary
+    if isinstance(value, (list, tuple)):
+        items = [summarize(item, max_items, max_chars, depth - 1) for item in value[:max_items]]
+        return items if len(value) <= max_items else {'size': len(value), 'head': items}
+    return summarize(str(value), max_items, max_chars, 0)
+
+
+class _JsonMessage:
+    """Message sérialisé en JSON seulement au formatage (dans le thread du listener)"""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler qui transmet l'enregistrement tel quel (formatage laissé au listener)"""
+
+    def prepare(self, record):
+        return record
+
+
+class RequestLog:
+    """
+    Enregistrement par requête, propre au thread qui la traite
+
+    begin() ouvre l'enregistrement, note() y ajoute des champs toujours émis,
+    detail() des champs émis seulement en cas d'erreur (ou en mode 'debug'),
+    fail() l'exception à joindre, et end() décide de l'émission.
+    """
+
+    def __init__(self, name: str = 'recommender.requests', verbosity: str = None,
+                 sample_rate: float = None, use_queue: bool = None):
+        self.verbosity = verbosity or os.environ.get('REQUEST_LOG_VERBOSITY', 'sampled')
+        if self.verbosity not in VERBOSITIES:
+            raise ValueError(f"REQUEST_LOG_VERBOSITY doit valoir {', '.join(VERBOSITIES)}")
+        if sample_rate is None:
+            sample_rate = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', '0.01'))
+        self.sample_rate = {'errors': 0.0, 'sampled': sample_rate}.get(self.verbosity, 1.0)
+        if use_queue is None:
+            use_queue = os.environ.get('REQUEST_LOG_ASYNC', '1') != '0'
+        self.use_queue = use_queue
+        self.logger = logging.getLogger(name)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def begin(self, req=None, **fields):
+        """Ouvre l'enregistrement de la requête du thread courant"""
+        self._local.record = fields
+        self._local.detail = {}
+        self._local.request = req
+        self._local.exc_info = None
+
+    def note(self, **fields):
+        """Champs résumant la requête (toujours présents dans l'enregistrement émis)"""
+        record = getattr(self._local, 'record', None)
+        if record is not None:
+            record.update(fields)
+
+    def detail(self, **fields):
+        """
+        Champs de débogage, émis seulement en cas d'erreur (ou en mode 'debug')
+
+        Seule la référence est gardée : les valeurs ne sont résumées (summarize)
+        qu'à l'émission, donc pas du tout pour une requête réussie non émise.
+        """
+        detail = getattr(self._local, 'detail', None)
+        if detail is not None:
+            detail.update(fields)
+
+    def fail(self, error: BaseException):
+        """Exception à joindre à l'enregistrement (traceback formaté par le listener)"""
+        self._local.exc_info = (type(error), error, error.__traceback__)
+
+    def end(self, status_code: int, timings: dict = None, cache: str = None):
+        """
+        Ferme l'enregistrement et l'émet s'il est retenu
+
+        Args:
+            status_code: Statut HTTP de la réponse (>= 400 : toujours émis, avec le détail)
+            timings: Durées par étape en secondes (voir Metrics.end_request)
+            cache: Valeur de l'en-tête X-Cache
+        """
+        record = getattr(self._local, 'record', None)
+        if record is None:
+            return
+        detail, req, exc_info = self._local.detail, self._local.request, self._local.exc_info
+        self._local.record = self._local.detail = self._local.request = self._local.exc_info = None
+
+        failed = status_code >= 400 or exc_info is not None
+        if not failed and (self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate)):
+            return
+        level = logging.ERROR if status_code >= 500 else logging.WARNING if failed else logging.INFO
+        if not self.logger.isEnabledFor(level):
+            return
+
+        record['status'] = status_code
+        if cache:
+            record['cache'] = cache
+        if timings:
+            record['timings_ms'] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+        if failed or self.verbosity == 'debug':
+            detail = {name: summarize(value) for name, value in detail.items()}
+            if req is not None:
+                detail.update(method=req.method, params=summarize(dict(req.params)))
+            record['detail'] = detail
+        if not failed:
+            record['sample_rate'] = self.sample_rate
+
+        if self.use_queue:
+            self._ensure_listener()
+        self.logger.log(level, _JsonMessage(record), exc_info=exc_info)
+
+    def _ensure_listener(self):
+        """Branche le logger sur une file vidée par un QueueListener (au premier enregistrement)"""
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            # Handlers du logger racine au premier appel (celui du worker Azure, ou basicConfig en local)
+            handlers = logging.getLogger().handlers or [logging.StreamHandler()]
+            log_queue = queue.SimpleQueue()
+            self.logger.addHandler(_DeferredQueueHandler(log_queue))
+            self.logger.propagate = False
+            self._listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self._listener.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Vide la file et arrête le thread du listener"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+                for handler in list(self.logger.handlers):
+                    if isinstance(handler, _DeferredQueueHandler):
+                        self.logger.removeHandler(handler)
+                self.logger.propagate = True
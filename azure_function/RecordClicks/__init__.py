@@ -0,0 +1,96 @@
+"""
+Azure Function d'ajout de clics pour les utilisateurs connus
+
+Les clics sont intégrés à la surcouche du recommandeur partagé avec
+RecommendArticle (même worker) : le facteur ALS de chaque utilisateur concerné
+est recalculé seul, et les recommandations suivantes en tiennent compte sans
+attendre le prochain ré-entraînement.
+"""
+
+import logging
+import json
+import os
+import sys
+import azure.functions as func
+
+# Ajouter le chemin parent pour importer RecommendArticle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from ..RecommendArticle import _parse_int_ids, load_recommender
+    from ..RecommendArticle.recommender import validate_event
+except (ImportError, ValueError):
+    from RecommendArticle import _parse_int_ids, load_recommender
+    from RecommendArticle.recommender import validate_event
+
+# Nombre maximal d'événements par requête
+MAX_EVENTS = int(os.environ.get('MAX_CLICK_EVENTS', '10000'))
+
+
+def _error_response(error: str, message: str, status_code: int = 400):
+    return func.HttpResponse(
+        json.dumps({'error': error, 'message': message}),
+        status_code=status_code,
+        mimetype='application/json'
+    )
+
+
+def parse_events(req_body):
+    """
+    Événements du body {"events": [{"user_id": 1, "article_id": 2, "count": 1}, ...]}
+    
+    IDs entiers (ou chaînes d'entiers) dans l'intervalle int64 ; count nombre
+    fini dans ]0, MAX_EVENT_COUNT] (NaN, infini, négatif ou 7.9 comme ID : ValueError)
+    
+    Returns:
+        Liste de tuples (user_id, article_id, count) ; count vaut 1 par défaut
+    """
+    events = req_body.get('events') if isinstance(req_body, dict) else None
+    if not isinstance(events, list):
+        raise ValueError("Le body doit contenir une liste 'events'")
+    if len(events) > MAX_EVENTS:
+        raise ValueError(f"{len(events)} événements reçus, maximum {MAX_EVENTS} par requête")
+    parsed = []
+    for position, event in enumerate(events):
+        try:
+            user_id, article_id = _parse_int_ids([event['user_id'], event['article_id']])
+            parsed.append(validate_event(user_id, article_id, event.get('count', 1)))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Événement {position}: user_id et article_id entiers requis, "
+                             f"count optionnel fini et positif ({e})")
+    return parsed
+
+
+def main(req):
+    """
+    Azure Function HTTP Trigger (POST)
+    
+    Args:
+        req: Requête HTTP dont le body contient la liste 'events'
+    
+    Returns:
+        JSON avec le nombre d'événements reçus et d'utilisateurs mis à jour
+    """
+    try:
+        req_body = req.get_json()
+    except ValueError:
+        req_body = None
+    
+    try:
+        events = parse_events(req_body)
+    except ValueError as e:
+        return _error_response('events invalide', str(e))
+    
+    try:
+        recommender = load_recommender()
+        updated_users = recommender.add_events(events)
+    except Exception as e:
+        logging.error(f"❌ Erreur lors de l'ajout des clics: {e}", exc_info=True)
+        return _error_response('Erreur interne', str(e), status_code=500)
+    
+    logging.info(f"✅ {len(events)} clics ajoutés, {updated_users} utilisateurs mis à jour")
+    return func.HttpResponse(
+        json.dumps({'received': len(events), 'updated_users': updated_users}),
+        status_code=200,
+        mimetype='application/json'
+    )
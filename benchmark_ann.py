@@ -0,0 +1,163 @@
+"""
+Benchmark du scoring approximatif : courbe rappel@5 / latence
+
+Compare, pour un échantillon d'utilisateurs connus, le top-N obtenu via l'index
+IVF (pour plusieurs valeurs de n_probe) et, pour un bundle à facteurs quantifiés
+(float16 / int8), via le scoring quantifié + re-ranking, au top-N exact
+(als_model.recommend si le modèle implicit est chargé, scoring exact sur les
+facteurs float32 sinon, ou bundle float32 de référence passé par --reference).
+
+Usage:
+    python benchmark_ann.py --artifacts artifacts --n-users 1000 --n-probe 1 2 4 8 16 32
+    python benchmark_ann.py --artifacts artifacts_int8 --reference artifacts
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+from ann_index import IVFIndex
+from recommender import QuantizedFactors, Recommender
+
+
+def exact_top_n(recommender, user_idx: int, n_reco: int) -> np.ndarray:
+    """Top-N de référence (exact) pour un utilisateur"""
+    if recommender.als_model is not None:
+        ids, _ = recommender.als_model.recommend(
+            user_idx, recommender.csr_train[user_idx], N=n_reco, filter_already_liked_items=True
+        )
+        return np.asarray(ids)
+    item_indices, _ = recommender.score_users([user_idx], n_reco, exact=True)
+    return item_indices[0][item_indices[0] >= 0]
+
+
+def timed_queries(fn, user_indices):
+    """Exécute fn(user_idx) pour chaque utilisateur et mesure la latence (ms)"""
+    results, latencies = [], []
+    for user_idx in user_indices:
+        start = time.perf_counter()
+        results.append(fn(int(user_idx)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def recall_at_n(approx_results, exact_results) -> float:
+    """Fraction moyenne du top-N exact retrouvée par le top-N approximatif"""
+    recalls = [
+        len(np.intersect1d(approx[approx >= 0], exact)) / len(exact)
+        for approx, exact in zip(approx_results, exact_results) if len(exact) > 0
+    ]
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def factor_memory_mb(recommender, exact: bool = False) -> float:
+    """Taille des facteurs utilisateurs + articles (servis pour le scoring, ou float32 si exact) en MB"""
+    factors = recommender._rerank_factors() if exact else (recommender.user_factors, recommender.item_factors)
+    return sum(getattr(f, 'nbytes', 0) for f in factors) / (1024 * 1024)
+
+
+def run_benchmark(artifacts='artifacts', n_users=1000, n_reco=5, n_probes=(1, 2, 4, 8, 16, 32),
+                  n_lists=None, seed=42, reference=None):
+    """
+    Mesure rappel@n_reco et latence par requête pour chaque n_probe
+
+    Args:
+        reference: Bundle float32 servant de référence exacte (défaut: le bundle
+            mesuré lui-même, via ses facteurs float32)
+
+    Returns:
+        Liste de dicts (une ligne par configuration, la première est la référence exacte)
+    """
+    recommender = Recommender(artifacts, use_topk_table=False)
+    reference_recommender = Recommender(reference, use_topk_table=False) if reference else recommender
+    if recommender.ann_index is None or n_lists is not None:
+        print(f"Construction de l'index IVF en mémoire ({n_lists or 'auto'} listes)...")
+        start = time.perf_counter()
+        _, item_factors = recommender._rerank_factors()
+        recommender.ann_index = IVFIndex.build(item_factors[:], n_lists=n_lists, seed=seed)
+        print(f"   ✅ {recommender.ann_index.n_lists} listes en {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(seed)
+    n_total = recommender.user_factors.shape[0]
+    user_indices = rng.choice(n_total, min(n_users, n_total), replace=False)
+
+    exact_results, exact_latencies = timed_queries(
+        lambda user_idx: exact_top_n(reference_recommender, user_idx, n_reco), user_indices
+    )
+    recall_key = f'recall@{n_reco}'
+    rows = [{
+        'mode': 'exact',
+        'n_probe': None,
+        recall_key: 1.0,
+        'p50_ms': float(np.percentile(exact_latencies, 50)),
+        'p95_ms': float(np.percentile(exact_latencies, 95)),
+        'mean_candidates': float(recommender.item_factors.shape[0]),
+        'factor_mb': factor_memory_mb(reference_recommender, exact=True)
+    }]
+
+    if isinstance(recommender.item_factors, QuantizedFactors):
+        # Scoring complet en précision réduite + re-ranking exact (sans index IVF)
+        ann_n_probe, recommender.ann_n_probe = recommender.ann_n_probe, 0
+        quantized_results, latencies = timed_queries(
+            lambda user_idx: recommender.score_users([user_idx], n_reco)[0][0], user_indices
+        )
+        recommender.ann_n_probe = ann_n_probe
+        rows.append({
+            'mode': recommender.manifest.get('factor_dtype', 'quant'),
+            'n_probe': None,
+            recall_key: recall_at_n(quantized_results, exact_results),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'mean_candidates': float(recommender.item_factors.shape[0]),
+            'factor_mb': factor_memory_mb(recommender)
+        })
+
+    list_sizes = np.diff(recommender.ann_index.list_offsets)
+    for n_probe in n_probes:
+        recommender.ann_n_probe = n_probe
+        approx_results, latencies = timed_queries(
+            lambda user_idx: recommender.score_users([user_idx], n_reco)[0][0], user_indices
+        )
+        rows.append({
+            'mode': 'ivf',
+            'n_probe': n_probe,
+            recall_key: recall_at_n(approx_results, exact_results),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'mean_candidates': float(n_probe * list_sizes.mean()),
+            'factor_mb': factor_memory_mb(recommender)
+        })
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rappel / latence de l'index IVF")
+    parser.add_argument('--artifacts', default='artifacts', help="Bundle d'artefacts (ou artifacts.pkl)")
+    parser.add_argument('--n-users', type=int, default=1000, help="Utilisateurs échantillonnés")
+    parser.add_argument('--n-reco', type=int, default=5)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--n-lists', type=int, default=None,
+                        help="Reconstruire l'index avec ce nombre de listes")
+    parser.add_argument('--reference', default=None,
+                        help="Bundle float32 de référence (mesure la perte de rappel d'un bundle quantifié)")
+    parser.add_argument('--output', default=None, help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    print("=== BENCHMARK SCORING APPROXIMATIF (IVF / FACTEURS QUANTIFIÉS) ===")
+    rows = run_benchmark(args.artifacts, args.n_users, args.n_reco, args.n_probe, args.n_lists,
+                         reference=args.reference)
+
+    recall_key = f'recall@{args.n_reco}'
+    print(f"\n{'mode':<8} {'n_probe':>8} {recall_key:>10} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+          f"{'candidats':>10} {'facteurs (MB)':>14}")
+    for row in rows:
+        n_probe = '-' if row['n_probe'] is None else row['n_probe']
+        print(f"{row['mode']:<8} {n_probe:>8} {row[recall_key]:>10.3f} {row['p50_ms']:>10.3f} "
+              f"{row['p95_ms']:>10.3f} {row['mean_candidates']:>10.0f} {row['factor_mb']:>14.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n✅ Résultats sauvegardés dans '{args.output}'")
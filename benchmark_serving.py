@@ -0,0 +1,322 @@
+"""
+Benchmark reproductible du chemin de service (chargement, mémoire, latence)
+
+Mesure, en local et sans Azure :
+- le temps de chargement du Recommender par composant du bundle
+- la mémoire (RSS) avant / après chargement et le pic de RSS
+- la latence p50 / p95 / p99 de recommend() pour des utilisateurs connus,
+  inconnus (fallback popularité) et « lourds » (plus longs historiques)
+- le temps de bout en bout de main() (RecommendArticle) avec une requête HTTP factice
+
+Les résultats sont écrits en JSON ; --compare les confronte à une référence
+enregistrée et signale les régressions (code de sortie 1).
+
+Usage:
+    python benchmark_serving.py --artifacts artifacts --output bench.json
+    python benchmark_serving.py --artifacts artifacts --compare bench_baseline.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import sys
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+
+from recommender import BUNDLE_MANIFEST, Recommender
+
+# Étapes du chargement instrumentées (méthodes appelées par load_bundle)
+LOAD_COMPONENTS = ('_init_mappings', '_init_topk_table', '_init_content', '_init_gram_matrix')
+
+
+def rss_mb() -> float:
+    """RSS courant du processus (MB)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Pic de RSS du processus (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en KB sous Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def latency_summary(latencies_ms) -> dict:
+    latencies_ms = np.asarray(latencies_ms)
+    return {
+        'n': int(len(latencies_ms)),
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99))
+    }
+
+
+def timed_calls(fn, args, warmup: int = 10) -> dict:
+    """Latence de fn(arg) pour chaque argument, après quelques appels de chauffe"""
+    for arg in args[:warmup]:
+        fn(arg)
+    latencies = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+
+def measure_load(artifacts: str, use_topk_table: bool = True) -> tuple:
+    """
+    Charge le bundle en chronométrant chaque composant
+
+    Returns:
+        Tuple (recommender, dict des temps en ms)
+    """
+    timings = {}
+    if Path(artifacts).is_dir():
+        with open(Path(artifacts) / BUNDLE_MANIFEST, 'r') as f:
+            manifest = json.load(f)
+        # Ouverture (memory-mapping) de chaque array, sans le reste du chargement
+        for name, info in manifest['arrays'].items():
+            start = time.perf_counter()
+            np.load(Path(artifacts) / info['file'], mmap_mode='r', allow_pickle=False)
+            timings[f'open_{name}'] = (time.perf_counter() - start) * 1000
+
+    recommender = Recommender(use_topk_table=use_topk_table)
+    for component in LOAD_COMPONENTS:
+        method = getattr(recommender, component)
+
+        def timed(*args, _method=method, _component=component, **kwargs):
+            start = time.perf_counter()
+            result = _method(*args, **kwargs)
+            timings[_component] = timings.get(_component, 0.0) + (time.perf_counter() - start) * 1000
+            return result
+
+        setattr(recommender, component, timed)
+
+    start = time.perf_counter()
+    recommender.load_artifacts(artifacts)
+    timings['total'] = (time.perf_counter() - start) * 1000
+    for component in LOAD_COMPONENTS:
+        delattr(recommender, component)
+    return recommender, timings
+
+
+def sample_users(recommender, n_users: int, seed: int = 42) -> dict:
+    """ID utilisateurs connus (aléatoires), lourds (plus longs historiques) et inconnus"""
+    rng = np.random.default_rng(seed)
+    unique_users = recommender.unique_users
+    n_total = len(unique_users)
+    known = unique_users[rng.choice(n_total, min(n_users, n_total), replace=False)]
+
+    history = np.diff(recommender.csr_train.indptr)
+    heavy_rows = np.argsort(-history, kind='stable')[:min(n_users, n_total)]
+    unknown = int(unique_users.max()) + 1 + np.arange(n_users)
+    return {
+        'known': [int(u) for u in known],
+        'heavy': [int(u) for u in unique_users[heavy_rows]],
+        'unknown': [int(u) for u in unknown],
+        'heavy_min_history': int(history[heavy_rows].min()) if len(heavy_rows) else 0
+    }
+
+
+def measure_end_to_end(artifacts: str, users: dict, n_reco: int) -> dict:
+    """Temps de main() (RecommendArticle) avec des requêtes HTTP factices, sans Azure"""
+    from local_functions import load_function, make_request, use_local_artifacts
+
+    cache_dir = tempfile.mkdtemp(prefix='bench_artifacts_')
+    use_local_artifacts(artifacts, cache_dir=cache_dir)
+
+    start = time.perf_counter()
+    function = load_function('RecommendArticle')
+    import_ms = (time.perf_counter() - start) * 1000
+
+    def call(params):
+        response = function.main(make_request(params=params))
+        if response.status_code != 200:
+            raise RuntimeError(f"main() a répondu {response.status_code}: {response.get_body()[:200]}")
+        return response
+
+    # Premier appel : chargement du bundle (cold start)
+    start = time.perf_counter()
+    call({'user_id': str(users['known'][0]), 'n_reco': str(n_reco)})
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    known = [{'user_id': str(u), 'n_reco': str(n_reco)} for u in users['known']]
+    results = {
+        'import_ms': import_ms,
+        'cold_start_ms': cold_ms,
+        # Cache de réponses : premier passage (miss) puis répétition (hit)
+        'known_cache_miss': timed_calls(call, known, warmup=0),
+        'known_cache_hit': timed_calls(call, known, warmup=0),
+        'unknown': timed_calls(call, [{'user_id': str(u), 'n_reco': str(n_reco)} for u in users['unknown']])
+    }
+    batch_size = min(100, len(users['known']))
+    batch = {'user_ids': users['known'][:batch_size], 'n_reco': n_reco}
+    results[f'batch_{batch_size}'] = timed_calls(
+        lambda _: function.main(make_request(method='POST', body=batch)), list(range(20)), warmup=2
+    )
+    return results
+
+
+def run_benchmark(artifacts='artifacts', n_users: int = 1000, n_reco: int = 5, seed: int = 42,
+                  use_topk_table: bool = True, end_to_end: bool = True) -> dict:
+    """
+    Exécute la suite complète
+
+    Returns:
+        Résultats (dict sérialisable en JSON)
+    """
+    rss_before = rss_mb()
+    recommender, load_timings = measure_load(artifacts, use_topk_table)
+    memory = {'rss_before_load_mb': rss_before, 'rss_after_load_mb': rss_mb()}
+
+    users = sample_users(recommender, n_users, seed)
+    latency = {
+        group: timed_calls(lambda user_id: recommender.recommend(user_id, n_reco), users[group])
+        for group in ('known', 'heavy', 'unknown')
+    }
+    # Scoring ALS à la volée (sans la table top-K)
+    if recommender.topk_table is not None:
+        recommender.use_topk_table = False
+        latency['known_live'] = timed_calls(lambda user_id: recommender.recommend(user_id, n_reco), users['known'])
+        latency['heavy_live'] = timed_calls(lambda user_id: recommender.recommend(user_id, n_reco), users['heavy'])
+        recommender.use_topk_table = use_topk_table
+    if recommender.content_index is not None:
+        latency['known_content'] = timed_calls(
+            lambda user_id: recommender.recommend(user_id, n_reco, mode='content'), users['known']
+        )
+    memory['rss_after_queries_mb'] = rss_mb()
+
+    results = {
+        'meta': {
+            'artifacts': str(artifacts),
+            'model_version': recommender.model_version,
+            'n_users': int(len(recommender.unique_users)),
+            'n_items': int(len(recommender.unique_items)),
+            'n_reco': n_reco,
+            'n_sampled_users': n_users,
+            'heavy_min_history': users['heavy_min_history'],
+            'seed': seed,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform()
+        },
+        'load_ms': load_timings,
+        'memory': memory,
+        'latency': latency
+    }
+    if end_to_end:
+        results['end_to_end'] = measure_end_to_end(artifacts, users, n_reco)
+    results['memory']['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def flatten_metrics(results: dict, prefix: str = '') -> dict:
+    """Métriques numériques (temps et mémoire, plus bas = mieux) à plat : 'latency.known.p95_ms' -> valeur"""
+    metrics = {}
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and (name.endswith(('_ms', '_mb')) or name.startswith('load_ms.')):
+            metrics[name] = float(value)
+    return metrics
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 0.1,
+            min_delta_load_ms: float = 5.0, min_delta_mb: float = 5.0) -> list:
+    """
+    Régressions par rapport à une référence
+
+    Une métrique régresse si elle dépasse la référence de plus de tolerance
+    (relatif) et de plus du seuil absolu (bruit des petites valeurs) : min_delta_ms
+    pour les latences par requête, min_delta_load_ms pour les temps de chargement
+    (mesurés une seule fois), min_delta_mb pour la mémoire.
+
+    Returns:
+        Liste de dicts (metric, baseline, current, ratio), triée par ratio décroissant
+    """
+    current, reference = flatten_metrics(results), flatten_metrics(baseline)
+    regressions = []
+    for metric, value in current.items():
+        base = reference.get(metric)
+        if base is None:
+            continue
+        if metric.endswith('_mb'):
+            min_delta = min_delta_mb
+        elif metric.startswith('load_ms.') or metric.endswith(('import_ms', 'cold_start_ms')):
+            min_delta = min_delta_load_ms
+        else:
+            min_delta = min_delta_ms
+        if value > base * (1 + tolerance) and value - base > min_delta:
+            regressions.append({'metric': metric, 'baseline': base, 'current': value,
+                                'ratio': value / base if base > 0 else float('inf')})
+    return sorted(regressions, key=lambda row: -row['ratio'])
+
+
+def print_report(results: dict):
+    print("\nChargement (ms):")
+    for component, value in results['load_ms'].items():
+        print(f"   {component:<28} {value:>10.2f}")
+    print("\nMémoire (MB):")
+    for name, value in results['memory'].items():
+        print(f"   {name:<28} {value:>10.1f}")
+    sections = [('recommend()', results['latency'])]
+    if 'end_to_end' in results:
+        sections.append(('main()', {key: value for key, value in results['end_to_end'].items()
+                                    if isinstance(value, dict)}))
+    for title, groups in sections:
+        print(f"\nLatence {title}:")
+        print(f"   {'groupe':<20} {'n':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+        for group, row in groups.items():
+            print(f"   {group:<20} {row['n']:>6} {row['p50_ms']:>10.3f} {row['p95_ms']:>10.3f} {row['p99_ms']:>10.3f}")
+    if 'end_to_end' in results:
+        print(f"\n   import de la fonction: {results['end_to_end']['import_ms']:.1f} ms, "
+              f"cold start: {results['end_to_end']['cold_start_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du chemin de service (chargement, mémoire, latence)")
+    parser.add_argument('--artifacts', default='artifacts', help="Bundle d'artefacts (ou artifacts.pkl)")
+    parser.add_argument('--n-users', type=int, default=1000, help="Utilisateurs échantillonnés par groupe")
+    parser.add_argument('--n-reco', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-topk', action='store_true', help="Scoring à la volée (sans la table top-K)")
+    parser.add_argument('--no-end-to-end', action='store_true', help="Ne pas mesurer main()")
+    parser.add_argument('--log-level', default='ERROR', help="Niveau de logging pendant les mesures de main()")
+    parser.add_argument('--output', default=None, help="Fichier JSON des résultats")
+    parser.add_argument('--compare', default=None, help="JSON de référence : signale les régressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Régression relative tolérée (0.2 = +20%%)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    print("=== BENCHMARK DU CHEMIN DE SERVICE ===")
+    results = run_benchmark(args.artifacts, args.n_users, args.n_reco, args.seed,
+                            use_topk_table=not args.no_topk, end_to_end=not args.no_end_to_end)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Résultats sauvegardés dans '{args.output}'")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) par rapport à '{args.compare}' (tolérance {args.tolerance:.0%}):")
+            for row in regressions:
+                print(f"   {row['metric']:<40} {row['baseline']:>10.3f} -> {row['current']:>10.3f} (x{row['ratio']:.2f})")
+            sys.exit(1)
+        print(f"\n✅ Aucune régression par rapport à '{args.compare}' (tolérance {args.tolerance:.0%})")
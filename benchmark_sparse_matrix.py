@@ -0,0 +1,110 @@
+"""
+Micro-benchmark de create_sparse_matrix : version vectorisée vs version historique
+
+La version historique (dicts ID -> index et list comprehensions sur chaque
+interaction) est reproduite ici comme référence. Le script vérifie que les deux
+matrices CSR et les arrays d'IDs sont identiques, puis affiche le gain.
+
+Usage:
+    python benchmark_sparse_matrix.py --n-interactions 3000000
+    python benchmark_sparse_matrix.py --from-data   # interactions réelles (clicks/)
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from ingest_clicks import load_interactions
+from serialize_artifacts import create_sparse_matrix
+
+
+def create_sparse_matrix_legacy(interactions_df):
+    """Version historique (notebook / serialize_artifacts.py) : dicts et boucles Python"""
+    unique_users = sorted(interactions_df['user_id'].unique())
+    unique_items = sorted(interactions_df['article_id'].unique())
+    
+    user_to_idx = {uid: idx for idx, uid in enumerate(unique_users)}
+    item_to_idx = {iid: idx for idx, iid in enumerate(unique_items)}
+    
+    user_indices = [user_to_idx[uid] for uid in interactions_df['user_id']]
+    item_indices = [item_to_idx[iid] for iid in interactions_df['article_id']]
+    values = interactions_df['count'].values.astype(np.float32)
+    
+    csr_matrix_train = csr_matrix((values, (user_indices, item_indices)), 
+                                   shape=(len(unique_users), len(unique_items)))
+    
+    return csr_matrix_train, user_to_idx, item_to_idx, unique_users, unique_items
+
+
+def synthetic_interactions(n_interactions: int, n_users: int, n_items: int, seed: int = 42) -> pd.DataFrame:
+    """Interactions (user_id, article_id, count) uniques, IDs non consécutifs"""
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(n_users * 3, n_users, replace=False)
+    item_ids = rng.choice(n_items * 3, n_items, replace=False)
+    pairs = pd.DataFrame({
+        'user_id': user_ids[rng.integers(0, n_users, n_interactions)],
+        'article_id': item_ids[(rng.zipf(1.3, n_interactions) - 1) % n_items]
+    })
+    return pairs.groupby(['user_id', 'article_id']).size().reset_index(name='count')
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def same_output(legacy, vectorized) -> bool:
+    """Matrices CSR (structure, valeurs, dtype) et arrays d'IDs identiques"""
+    legacy_csr, _, _, legacy_users, legacy_items = legacy
+    csr, _, _, unique_users, unique_items = vectorized
+    return (
+        legacy_csr.shape == csr.shape
+        and legacy_csr.dtype == csr.dtype
+        and np.array_equal(legacy_csr.indptr, csr.indptr)
+        and np.array_equal(legacy_csr.indices, csr.indices)
+        and np.array_equal(legacy_csr.data, csr.data)
+        and np.array_equal(np.asarray(legacy_users), unique_users)
+        and np.array_equal(np.asarray(legacy_items), unique_items)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de create_sparse_matrix")
+    parser.add_argument('--n-interactions', type=int, default=3000000)
+    parser.add_argument('--n-users', type=int, default=300000)
+    parser.add_argument('--n-items', type=int, default=40000)
+    parser.add_argument('--from-data', action='store_true', help="Utiliser les clics réels (clicks/)")
+    parser.add_argument('--output', default=None, help="Fichier JSON des résultats")
+    args = parser.parse_args()
+    
+    print("=== BENCHMARK CREATE_SPARSE_MATRIX ===")
+    if args.from_data:
+        interactions = load_interactions('clicks')
+    else:
+        interactions = synthetic_interactions(args.n_interactions, args.n_users, args.n_items)
+    print(f"Interactions: {len(interactions):,}")
+    
+    legacy, legacy_seconds = timed(create_sparse_matrix_legacy, interactions)
+    vectorized, vectorized_seconds = timed(create_sparse_matrix, interactions)
+    identical = same_output(legacy, vectorized)
+    
+    results = {
+        'n_interactions': len(interactions),
+        'legacy_seconds': legacy_seconds,
+        'vectorized_seconds': vectorized_seconds,
+        'speedup': legacy_seconds / vectorized_seconds,
+        'identical': identical
+    }
+    print(f"   Version historique : {legacy_seconds:.2f}s")
+    print(f"   Version vectorisée : {vectorized_seconds:.2f}s")
+    print(f"   Gain               : x{results['speedup']:.1f}")
+    print(f"   {'✅ Résultats identiques' if identical else '❌ Résultats différents'}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Résultats sauvegardés dans '{args.output}'")
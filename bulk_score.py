@@ -0,0 +1,190 @@
+"""
+Scoring hors ligne de tous les utilisateurs connus (newsletters, notifications push)
+
+Les utilisateurs sont découpés en blocs scorés par un pool de processus ; chaque
+worker charge le bundle une seule fois (memory-mapping, pages partagées entre
+processus) et écrit ses lignes directement dans les fichiers de sortie :
+
+    <output>/user_ids.npy          int32 ou int64 (n_users,)
+    <output>/recommendations.npy   int32 ou int64 (n_users, K) article_id, -1 = case vide
+    <output>/scores.npy            float32 (n_users, K)
+    <output>/progress.json         blocs terminés (reprise après interruption)
+
+Les .npy se relisent en memory-mapping : np.load(path, mmap_mode='r'). Un job
+interrompu reprend aux blocs non terminés s'il est relancé avec le même bundle
+et les mêmes paramètres. Les IDs gardent le dtype du bundle (int32 si toutes
+les valeurs y tiennent, int64 sinon, voir compact_ids) : jamais de troncature.
+
+Usage:
+    python bulk_score.py --artifacts artifacts --output recommendations --k 20 --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+from recommender import Recommender
+
+PROGRESS_FILE = 'progress.json'
+
+_worker_recommender = None
+
+
+def _init_worker(artifacts_path: str):
+    """Charge le bundle une fois par processus"""
+    global _worker_recommender
+    _worker_recommender = Recommender(artifacts_path, use_topk_table=False)
+
+
+def score_chunk(chunk_id: int, start: int, end: int, output_dir: str, k: int,
+                block_size: int = 256, exact: bool = False) -> int:
+    """
+    Score les utilisateurs [start, end) et écrit leurs lignes dans les fichiers de sortie
+
+    Returns:
+        chunk_id (pour le suivi de progression)
+    """
+    recommender = _worker_recommender
+    item_indices, scores = recommender.score_users(np.arange(start, end), k, block_size, exact=exact)
+
+    article_ids = np.full(item_indices.shape, -1, dtype=recommender.unique_items.dtype)
+    valid = item_indices >= 0
+    article_ids[valid] = recommender.unique_items[item_indices[valid]]
+
+    output_dir = Path(output_dir)
+    for name, values in (('recommendations', article_ids), ('scores', scores)):
+        out = np.load(output_dir / f"{name}.npy", mmap_mode='r+')
+        out[start:end] = values
+        out.flush()
+        del out
+    return chunk_id
+
+
+def _job_signature(recommender, k: int, chunk_size: int, exact: bool) -> dict:
+    return {
+        'model_version': recommender.model_version,
+        'n_users': int(len(recommender.unique_users)),
+        'k': int(k),
+        'chunk_size': int(chunk_size),
+        'exact': bool(exact),
+        'id_dtype': str(recommender.unique_items.dtype)
+    }
+
+
+def _write_progress(output_dir: Path, signature: dict, done):
+    """Enregistre les blocs terminés (écriture atomique)"""
+    tmp_path = output_dir / f"{PROGRESS_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(signature, done=sorted(done)), f)
+    os.replace(tmp_path, output_dir / PROGRESS_FILE)
+
+
+def _prepare_output(output_dir: Path, recommender, signature: dict, k: int) -> set:
+    """
+    Crée les fichiers de sortie, ou reprend un job interrompu compatible
+
+    Returns:
+        Ensemble des blocs déjà terminés
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(output_dir / PROGRESS_FILE, 'r') as f:
+            progress = json.load(f)
+        if {key: progress.get(key) for key in signature} == signature:
+            return set(progress['done'])
+        print("   ⚠️  Sortie existante d'un autre job (modèle ou paramètres différents) : recalcul complet")
+    except (OSError, ValueError):
+        pass
+
+    n_users = signature['n_users']
+    # Dtype des IDs du bundle (compact_ids) : int64 conservé si un ID dépasse int32
+    np.save(output_dir / 'user_ids.npy', np.asarray(recommender.unique_users))
+    recommendations = np.lib.format.open_memmap(output_dir / 'recommendations.npy', mode='w+',
+                                                dtype=recommender.unique_items.dtype, shape=(n_users, k))
+    recommendations[:] = -1
+    scores = np.lib.format.open_memmap(output_dir / 'scores.npy', mode='w+',
+                                       dtype=np.float32, shape=(n_users, k))
+    scores[:] = -np.inf
+    del recommendations, scores
+    _write_progress(output_dir, signature, set())
+    return set()
+
+
+def bulk_score(artifacts='artifacts', output_dir='recommendations', k: int = 20, chunk_size: int = 8192,
+               n_workers: Optional[int] = None, block_size: int = 256, exact: bool = False) -> dict:
+    """
+    Score tous les utilisateurs connus du bundle et écrit leur top-K sur disque
+
+    Args:
+        artifacts: Bundle d'artefacts (ou artifacts.pkl)
+        output_dir: Dossier de sortie (voir l'en-tête du module)
+        k: Recommandations par utilisateur
+        chunk_size: Utilisateurs par bloc (unité de reprise)
+        n_workers: Processus de scoring (défaut: nombre de CPU)
+        block_size: Utilisateurs par produit matriciel dans un bloc
+        exact: Scoring exact (sans index IVF ni facteurs quantifiés)
+
+    Returns:
+        Statistiques du job (utilisateurs scorés, durée, utilisateurs/s)
+    """
+    output_dir = Path(output_dir)
+    recommender = Recommender(artifacts, use_topk_table=False)
+    signature = _job_signature(recommender, k, chunk_size, exact)
+    n_users = signature['n_users']
+    n_workers = n_workers or os.cpu_count() or 1
+    done = _prepare_output(output_dir, recommender, signature, k)
+    del recommender
+
+    chunks = [(chunk_id, start, min(start + chunk_size, n_users))
+              for chunk_id, start in enumerate(range(0, n_users, chunk_size)) if chunk_id not in done]
+    if done:
+        print(f"   Reprise: {len(done)} blocs déjà terminés, {len(chunks)} restants")
+    n_pending = sum(end - start for _, start, end in chunks)
+
+    start_time = time.perf_counter()
+    scored = 0
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(str(artifacts),)) as executor:
+        futures = {
+            executor.submit(score_chunk, chunk_id, start, end, str(output_dir), k, block_size, exact): end - start
+            for chunk_id, start, end in chunks
+        }
+        for future in as_completed(futures):
+            done.add(future.result())
+            _write_progress(output_dir, signature, done)
+            scored += futures[future]
+            elapsed = time.perf_counter() - start_time
+            rate = scored / elapsed if elapsed > 0 else 0.0
+            eta = (n_pending - scored) / rate if rate > 0 else 0.0
+            print(f"   [{scored:,}/{n_pending:,}] {rate:,.0f} utilisateurs/s, reste ~{eta:.0f}s", flush=True)
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        'n_users': n_users,
+        'scored': scored,
+        'seconds': elapsed,
+        'users_per_second': scored / elapsed if elapsed > 0 else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring hors ligne de tous les utilisateurs connus")
+    parser.add_argument('--artifacts', default='artifacts', help="Bundle d'artefacts (ou artifacts.pkl)")
+    parser.add_argument('--output', default='recommendations', help="Dossier de sortie")
+    parser.add_argument('--k', type=int, default=20, help="Recommandations par utilisateur")
+    parser.add_argument('--chunk-size', type=int, default=8192, help="Utilisateurs par bloc (unité de reprise)")
+    parser.add_argument('--workers', type=int, default=None, help="Processus de scoring (défaut: nb de CPU)")
+    parser.add_argument('--exact', action='store_true', help="Scoring exact (sans index IVF)")
+    args = parser.parse_args()
+
+    print("=== SCORING HORS LIGNE DE TOUS LES UTILISATEURS ===")
+    stats = bulk_score(args.artifacts, args.output, args.k, args.chunk_size, args.workers, exact=args.exact)
+    print(f"\n✅ {stats['scored']:,} utilisateurs scorés en {stats['seconds']:.1f}s "
+          f"({stats['users_per_second']:,.0f} utilisateurs/s)")
+    print(f"Sortie: {args.output}/recommendations.npy, scores.npy, user_ids.npy "
+          f"(np.load(..., mmap_mode='r'))")
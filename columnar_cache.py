@@ -0,0 +1,205 @@
+"""
+Cache disque en colonnes des données brutes (clicks/*.csv, articles_metadata.csv)
+
+Les CSV sont convertis une seule fois en un fichier binaire typé par colonne
+(lu en memory-mapping), accompagné d'un manifest JSON qui liste les fichiers
+sources avec leur date de modification et leur taille : toute modification
+d'une source invalide le cache, reconstruit au chargement suivant.
+
+Usage:
+    python columnar_cache.py            # (re)construit le cache des clics et des articles
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_NAME = 'manifest.json'
+CACHE_FORMAT_VERSION = 1
+
+# Types des colonnes du jeu Globo (le plus étroit couvrant les valeurs observées)
+CLICK_DTYPES = {
+    'user_id': np.int32,
+    'session_id': np.int64,
+    'session_start': np.int64,
+    'session_size': np.int16,
+    'click_article_id': np.int32,
+    'click_timestamp': np.int64,
+    'click_environment': np.int8,
+    'click_deviceGroup': np.int8,
+    'click_os': np.int8,
+    'click_country': np.int8,
+    'click_region': np.int8,
+    'click_referrer_type': np.int8
+}
+ARTICLE_DTYPES = {
+    'article_id': np.int32,
+    'category_id': np.int16,
+    'created_at_ts': np.int64,
+    'publisher_id': np.int16,
+    'words_count': np.int32
+}
+
+
+def default_cache_dir() -> Path:
+    """Dossier du cache (DATA_CACHE_DIR, défaut: .data_cache/)"""
+    return Path(os.environ.get('DATA_CACHE_DIR') or '.data_cache')
+
+
+def source_signature(paths) -> list:
+    """Nom, date de modification et taille de chaque fichier source"""
+    signature = []
+    for path in paths:
+        stat = Path(path).stat()
+        signature.append([Path(path).name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _checked_cast(values, dtype, column: str) -> np.ndarray:
+    """Conversion vers le type du schéma, en refusant toute valeur hors bornes"""
+    values = np.asarray(values)
+    dtype = np.dtype(dtype)
+    if len(values) and dtype.kind == 'i':
+        info = np.iinfo(dtype)
+        if values.min() < info.min or values.max() > info.max:
+            raise ValueError(f"Colonne '{column}' : valeurs hors bornes pour {dtype.name}")
+    return values.astype(dtype, copy=False)
+
+
+def read_table(name: str, sources, cache_dir=None, columns=None) -> Optional[dict]:
+    """
+    Colonnes en cache (arrays memory-mappés), ou None si le cache est absent ou périmé
+
+    Args:
+        name: Nom de la table ('clicks', 'articles_metadata')
+        sources: Fichiers sources dont la signature doit correspondre
+        cache_dir: Dossier du cache (défaut: default_cache_dir())
+        columns: Colonnes à ouvrir (défaut: toutes)
+    """
+    table_dir = Path(cache_dir or default_cache_dir()) / name
+    try:
+        with open(table_dir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get('format_version') != CACHE_FORMAT_VERSION
+            or manifest.get('sources') != source_signature(sources)):
+        return None
+
+    arrays = {}
+    for column, dtype in manifest['columns'].items():
+        if columns is not None and column not in columns:
+            continue
+        if manifest['n_rows'] == 0:
+            arrays[column] = np.empty(0, dtype=dtype)
+        else:
+            arrays[column] = np.memmap(table_dir / f"{column}.bin", dtype=dtype, mode='r',
+                                       shape=(manifest['n_rows'],))
+    return arrays
+
+
+def write_table(name: str, sources, chunks, dtypes: dict, cache_dir=None) -> Path:
+    """
+    Écrit une table en cache, bloc par bloc (la mémoire reste bornée par un bloc)
+
+    Le cache est écrit dans un dossier temporaire renommé à la fin : une
+    conversion interrompue ne laisse jamais de cache partiel.
+
+    Args:
+        name: Nom de la table
+        sources: Fichiers sources (signature enregistrée dans le manifest)
+        chunks: Itérable de DataFrames à concaténer
+        dtypes: Type de chaque colonne (les colonnes absentes sont stockées en int64)
+    """
+    cache_root = Path(cache_dir or default_cache_dir())
+    cache_root.mkdir(parents=True, exist_ok=True)
+    signature = source_signature(sources)
+
+    staging_dir = Path(tempfile.mkdtemp(prefix=f'.{name}-', dir=cache_root))
+    try:
+        files, columns, n_rows = {}, None, 0
+        for chunk in chunks:
+            if columns is None:
+                columns = {column: np.dtype(dtypes.get(column, np.int64)).name for column in chunk.columns}
+                files = {column: open(staging_dir / f"{column}.bin", 'wb') for column in columns}
+            for column, dtype in columns.items():
+                files[column].write(_checked_cast(chunk[column].values, dtype, column).tobytes())
+            n_rows += len(chunk)
+        for f in files.values():
+            f.close()
+
+        with open(staging_dir / MANIFEST_NAME, 'w') as f:
+            json.dump({
+                'format_version': CACHE_FORMAT_VERSION,
+                'sources': signature,
+                'n_rows': n_rows,
+                'columns': columns or {}
+            }, f, indent=2)
+
+        table_dir = cache_root / name
+        shutil.rmtree(table_dir, ignore_errors=True)
+        os.rename(staging_dir, table_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return table_dir
+
+
+def _click_files(clicks_dir) -> list:
+    files = sorted(Path(clicks_dir).glob("*.csv"))
+    if not files:
+        raise FileNotFoundError(f"Aucun fichier de clics dans '{clicks_dir}'")
+    return files
+
+
+def click_columns(clicks_dir='clicks', columns=None, cache_dir=None, build: bool = True) -> Optional[dict]:
+    """
+    Colonnes des clics depuis le cache, construit depuis les CSV si besoin
+
+    Args:
+        clicks_dir: Dossier des fichiers clicks/*.csv
+        columns: Colonnes à ouvrir (défaut: toutes)
+        build: Construire le cache s'il est absent ou périmé (sinon retourne None)
+
+    Returns:
+        Dict colonne -> array memory-mappé (lignes dans l'ordre des fichiers triés)
+    """
+    files = _click_files(clicks_dir)
+    arrays = read_table('clicks', files, cache_dir, columns)
+    if arrays is None and build:
+        print(f"Construction du cache en colonnes des clics ({len(files)} fichiers)...")
+        chunks = (pd.read_csv(path) for path in files)
+        write_table('clicks', files, chunks, CLICK_DTYPES, cache_dir)
+        arrays = read_table('clicks', files, cache_dir, columns)
+    return arrays
+
+
+def load_clicks(clicks_dir='clicks', cache_dir=None) -> pd.DataFrame:
+    """Tous les clics (toutes colonnes, types étroits), via le cache"""
+    return pd.DataFrame({
+        column: np.asarray(values) for column, values in click_columns(clicks_dir, cache_dir=cache_dir).items()
+    })
+
+
+def load_articles_metadata(path='articles_metadata.csv', cache_dir=None) -> pd.DataFrame:
+    """Métadonnées des articles (types étroits), via le cache"""
+    arrays = read_table('articles_metadata', [path], cache_dir)
+    if arrays is None:
+        write_table('articles_metadata', [path], [pd.read_csv(path)], ARTICLE_DTYPES, cache_dir)
+        arrays = read_table('articles_metadata', [path], cache_dir)
+    return pd.DataFrame({column: np.asarray(values) for column, values in arrays.items()})
+
+
+if __name__ == "__main__":
+    print("=== CACHE EN COLONNES DES DONNÉES ===")
+    for label, load in (("Articles", load_articles_metadata), ("Clics", load_clicks)):
+        start = time.perf_counter()
+        frame = load()
+        print(f"   ✅ {label}: {len(frame):,} lignes en {time.perf_counter() - start:.2f}s "
+              f"({frame.memory_usage(index=False).sum() / (1024 * 1024):.1f} MB)")
+    print(f"\nCache: {default_cache_dir()}/ (reconstruit automatiquement si une source change)")
@@ -74,7 +74,7 @@ check_prerequisites() {
     
     # Vérifier les fichiers de modèle
     print_info "Vérification des fichiers de modèle..."
-    REQUIRED_FILES=("als_model.pkl" "metadata.pkl" "csr_train.pkl")
+    REQUIRED_FILES=("artifacts/manifest.json")
     for file in "${REQUIRED_FILES[@]}"; do
         if [ -f "$file" ]; then
             size=$(du -h "$file" | cut -f1)
@@ -446,24 +446,44 @@ upload_artifacts() {
     
     print_info "Upload des fichiers vers le conteneur 'models'..."
     
-    # Uploader chaque fichier
-    FILES=("als_model.pkl" "metadata.pkl" "csr_train.pkl")
-    for file in "${FILES[@]}"; do
-        if [ -f "$file" ]; then
-            print_info "Upload de $file..."
-            az storage blob upload \
-                --container-name models \
-                --name "$file" \
-                --file "$file" \
-                --account-name "$STORAGE_ACCOUNT" \
-                --account-key "$STORAGE_KEY" \
-                --overwrite
-            print_success "$file uploadé"
-        else
-            print_error "$file non trouvé"
+    # Les .npy vont sous un préfixe propre au bundle (jamais réécrits en place) ;
+    # le manifest, qui pointe vers ce préfixe, est remplacé en dernier : son ETag
+    # identifie la version et un worker ne voit jamais un bundle à moitié publié
+    BUNDLE_ID=$(sha256sum artifacts/manifest.json | cut -c1-16)
+    BUNDLE_PREFIX="bundles/$BUNDLE_ID"
+    PUBLISHED_MANIFEST=$(mktemp)
+    python3 -c 'import json, sys; m = json.load(open(sys.argv[1])); m["files_prefix"] = sys.argv[2]; json.dump(m, open(sys.argv[3], "w"), indent=2)' \
+        artifacts/manifest.json "$BUNDLE_PREFIX" "$PUBLISHED_MANIFEST"
+    print_info "Bundle $BUNDLE_ID (artifacts/$BUNDLE_PREFIX/)"
+    
+    for file in artifacts/*.npy; do
+        print_info "Upload de $file..."
+        if ! az storage blob upload \
+            --container-name models \
+            --name "artifacts/$BUNDLE_PREFIX/$(basename "$file")" \
+            --file "$file" \
+            --account-name "$STORAGE_ACCOUNT" \
+            --account-key "$STORAGE_KEY" \
+            --overwrite; then
+            print_error "Erreur lors de l'upload de $file (manifest inchangé)"
+            rm -f "$PUBLISHED_MANIFEST"
+            exit 1
         fi
+        print_success "$file uploadé"
     done
     
+    print_info "Publication de artifacts/manifest.json..."
+    az storage blob upload \
+        --container-name models \
+        --name "artifacts/manifest.json" \
+        --file "$PUBLISHED_MANIFEST" \
+        --account-name "$STORAGE_ACCOUNT" \
+        --account-key "$STORAGE_KEY" \
+        --content-type "application/json" \
+        --overwrite
+    rm -f "$PUBLISHED_MANIFEST"
+    print_success "Manifest publié (les anciens préfixes artifacts/bundles/ peuvent être supprimés une fois les workers rechargés)"
+    
     print_success "Étape 2 terminée!"
 }
 
@@ -0,0 +1,256 @@
+"""
+Évaluation hors ligne vectorisée : precision / recall / MAP / hit rate @k
+
+Reprend les définitions des fonctions du notebook (precision_at_k, recall_at_k,
+ap_at_k, map_at_k, hit_rate_at_k, evaluate_model), mais calculées pour tous les
+utilisateurs à la fois : les recommandations sont une matrice (n_users, k)
+d'indices d'articles (-1 = case vide) et la vérité terrain une matrice CSR
+(n_users, n_items) alignée ligne à ligne. Les hits sont obtenus par une seule
+recherche dichotomique des paires (ligne, article) dans les clés triées du CSR.
+
+Usage:
+    python evaluation.py --artifacts artifacts --split random --k 5 --bootstrap 1000
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from typing import Optional
+
+METRICS = ('precision@k', 'recall@k', 'map@k', 'hit_rate@k')
+
+
+def relevance_matrix(interactions: pd.DataFrame, user_to_idx, item_to_idx, n_items: Optional[int] = None):
+    """
+    Vérité terrain CSR (utilisateurs, articles) alignée sur les mappings du modèle
+
+    Les interactions d'utilisateurs inconnus du modèle sont ignorées (pas de
+    ligne). Les articles absents du train restent pertinents, comme dans le
+    notebook : chacun reçoit une colonne au-delà de n_items, qu'aucune
+    recommandation ne peut atteindre, et compte donc dans les dénominateurs
+    du recall et de l'AP (voir unseen_interactions pour les proportions).
+
+    Args:
+        interactions: Interactions de test (user_id, article_id)
+        user_to_idx: IdMapping des utilisateurs (Recommender.user_to_idx)
+        item_to_idx: IdMapping des articles (Recommender.item_to_idx)
+        n_items: Nombre d'articles du modèle (défaut: len(item_to_idx))
+
+    Returns:
+        Matrice CSR binaire (len(user_to_idx), n_items + nombre d'articles inconnus du modèle)
+    """
+    n_items = len(item_to_idx) if n_items is None else n_items
+    article_ids = interactions['article_id'].values
+    rows = user_to_idx.lookup(interactions['user_id'].values)
+    cols = item_to_idx.lookup(article_ids)
+    unseen = cols < 0
+    unseen_ids, unseen_cols = np.unique(article_ids[unseen], return_inverse=True)
+    cols[unseen] = n_items + unseen_cols
+    known = rows >= 0
+    relevance = csr_matrix((np.ones(int(known.sum()), dtype=np.float32), (rows[known], cols[known])),
+                           shape=(len(user_to_idx), n_items + len(unseen_ids)))
+    relevance.data[:] = 1.0  # doublons additionnés par le constructeur
+    return relevance
+
+
+def unseen_interactions(interactions: pd.DataFrame, user_to_idx, item_to_idx) -> dict:
+    """
+    Interactions de test hors du modèle
+
+    Returns:
+        Dict n_interactions, unknown_users (lignes ignorées par relevance_matrix)
+        et unseen_items (lignes d'utilisateurs connus sur des articles absents du
+        train : pertinentes mais jamais recommandables)
+    """
+    unknown_users = user_to_idx.lookup(interactions['user_id'].values) < 0
+    unseen_items = item_to_idx.lookup(interactions['article_id'].values) < 0
+    return {
+        'n_interactions': int(len(interactions)),
+        'unknown_users': int(unknown_users.sum()),
+        'unseen_items': int((unseen_items & ~unknown_users).sum())
+    }
+
+
+def hit_matrix(recommendations, relevance, k: int = 5) -> np.ndarray:
+    """
+    Hits des k premières recommandations de chaque utilisateur
+
+    Args:
+        recommendations: Indices d'articles (n_users, >= k), -1 pour une case vide
+        relevance: Vérité terrain CSR (n_users, n_items)
+
+    Returns:
+        Masque booléen (n_users, k)
+    """
+    recommendations = np.asarray(recommendations, dtype=np.int64)[:, :k]
+    relevance = csr_matrix(relevance)
+    n_users, n_items = relevance.shape
+
+    # Clés (ligne, article) des éléments pertinents, triées
+    nonzero = relevance.data != 0
+    truth_rows = np.repeat(np.arange(n_users, dtype=np.int64), np.diff(relevance.indptr))
+    truth_keys = np.sort(truth_rows[nonzero] * n_items + relevance.indices[nonzero])
+    if len(truth_keys) == 0:
+        return np.zeros(recommendations.shape, dtype=bool)
+
+    rec_keys = np.arange(n_users, dtype=np.int64)[:, None] * n_items + recommendations
+    positions = np.minimum(np.searchsorted(truth_keys, rec_keys), len(truth_keys) - 1)
+    return (truth_keys[positions] == rec_keys) & (recommendations >= 0)
+
+
+def per_user_metrics(recommendations, relevance, k: int = 5, user_ids=None) -> pd.DataFrame:
+    """
+    Métriques @k de chaque utilisateur (mêmes définitions que le notebook)
+
+    - precision = hits / min(k, nombre de recommandations)
+    - recall    = hits / nombre d'articles pertinents
+    - ap        = somme des précisions aux rangs des hits / min(nombre pertinents, k)
+    - hit       = au moins un hit
+
+    Args:
+        recommendations: Indices d'articles (n_users, >= k), -1 pour une case vide
+        relevance: Vérité terrain CSR (n_users, n_items)
+        k: Nombre de recommandations considérées
+        user_ids: Index du DataFrame (défaut: la ligne)
+
+    Returns:
+        DataFrame (precision, recall, ap, hit, n_relevant, n_recommended), une ligne par utilisateur
+    """
+    recommendations = np.asarray(recommendations)
+    hits = hit_matrix(recommendations, relevance, k)
+    n_hits = hits.sum(axis=1)
+    n_relevant = np.diff(csr_matrix(relevance).indptr)
+    n_recommended = (recommendations >= 0).sum(axis=1)
+
+    ranks = np.arange(1, hits.shape[1] + 1)
+    ap_sum = (np.cumsum(hits, axis=1) / ranks * hits).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(n_recommended > 0, n_hits / np.minimum(k, n_recommended), 0.0)
+        recall = np.where(n_relevant > 0, n_hits / n_relevant, 0.0)
+        ap = np.where(n_relevant > 0, ap_sum / np.minimum(n_relevant, k), 0.0)
+
+    return pd.DataFrame({
+        'precision': precision,
+        'recall': recall,
+        'ap': ap,
+        'hit': (n_hits > 0).astype(np.float64),
+        'n_relevant': n_relevant,
+        'n_recommended': n_recommended
+    }, index=user_ids)
+
+
+def bootstrap_ci(per_user: pd.DataFrame, n_bootstrap: int = 1000, confidence: float = 0.95,
+                 seed: int = 42, max_block: int = 4 * 1024 * 1024) -> dict:
+    """
+    Intervalles de confiance bootstrap (percentiles) des moyennes des métriques
+
+    Les ré-échantillonnages d'utilisateurs sont tirés par blocs de
+    max_block indices au plus, pour borner la mémoire.
+
+    Returns:
+        Dict métrique -> (borne basse, borne haute)
+    """
+    columns = ['precision', 'recall', 'ap', 'hit']
+    values = per_user[columns].to_numpy(dtype=np.float64)
+    n_users = len(values)
+    if n_users == 0 or n_bootstrap <= 0:
+        return {}
+
+    rng = np.random.default_rng(seed)
+    block = max(1, max_block // n_users)
+    means = np.empty((n_bootstrap, len(columns)))
+    for start in range(0, n_bootstrap, block):
+        end = min(start + block, n_bootstrap)
+        samples = rng.integers(0, n_users, size=(end - start, n_users))
+        means[start:end] = values[samples].mean(axis=1)
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha], axis=0)
+    return {metric: (float(lo), float(hi)) for metric, lo, hi in zip(METRICS, low, high)}
+
+
+def evaluate_model(recommendations, relevance, k: int = 5, n_bootstrap: int = 0,
+                   confidence: float = 0.95, seed: int = 42) -> dict:
+    """
+    Évalue un modèle de recommandation
+
+    Seuls les utilisateurs ayant au moins un article pertinent sont évalués
+    (équivalent aux utilisateurs communs du evaluate_model du notebook).
+
+    Args:
+        recommendations: Indices d'articles (n_users, >= k), -1 pour une case vide
+        relevance: Vérité terrain CSR (n_users, n_items) alignée sur recommendations
+        k: Nombre de recommandations considérées
+        n_bootstrap: Ré-échantillonnages pour les intervalles de confiance (0 = aucun)
+        confidence: Niveau des intervalles de confiance
+
+    Returns:
+        dict avec les métriques (et 'ci' si n_bootstrap > 0)
+    """
+    per_user = per_user_metrics(recommendations, relevance, k)
+    per_user = per_user[per_user['n_relevant'] > 0]
+    if len(per_user) == 0:
+        return dict({metric: 0.0 for metric in METRICS}, n_users=0)
+
+    results = {
+        'precision@k': float(per_user['precision'].mean()),
+        'recall@k': float(per_user['recall'].mean()),
+        'map@k': float(per_user['ap'].mean()),
+        'hit_rate@k': float(per_user['hit'].mean()),
+        'n_users': len(per_user)
+    }
+    if n_bootstrap:
+        results['ci'] = bootstrap_ci(per_user, n_bootstrap, confidence, seed)
+    return results
+
+
+if __name__ == "__main__":
+    from ingest_clicks import load_interactions
+    from recommender import Recommender
+    from split_interactions import SPLIT_STRATEGIES, split_interactions
+
+    parser = argparse.ArgumentParser(description="Évaluation hors ligne d'un bundle sur le split de test")
+    parser.add_argument('--artifacts', default='artifacts', help="Bundle d'artefacts (ou artifacts.pkl)")
+    parser.add_argument('--clicks-dir', default='clicks')
+    parser.add_argument('--split', choices=SPLIT_STRATEGIES, default='random',
+                        help="Même séparation que serialize_artifacts.py --split")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--bootstrap', type=int, default=0, help="Ré-échantillonnages bootstrap (0 = aucun)")
+    parser.add_argument('--exact', action='store_true', help="Scoring exact (sans index IVF)")
+    parser.add_argument('--per-user', default=None, help="Fichier CSV des métriques par utilisateur")
+    args = parser.parse_args()
+
+    print("=== ÉVALUATION HORS LIGNE ===")
+    interactions = load_interactions(args.clicks_dir, with_timestamps=args.split == 'time')
+    _, test_interactions = split_interactions(interactions, test_size=0.2, strategy=args.split, seed=42)
+
+    recommender = Recommender(args.artifacts, use_topk_table=False)
+    relevance = relevance_matrix(test_interactions, recommender.user_to_idx, recommender.item_to_idx,
+                                 recommender.item_factors.shape[0])
+    test_users = np.flatnonzero(np.diff(relevance.indptr))
+    unseen = unseen_interactions(test_interactions, recommender.user_to_idx, recommender.item_to_idx)
+    print(f"   {len(test_users):,} utilisateurs de test connus du modèle")
+    print(f"   Interactions de test hors modèle: {unseen['unknown_users']:,} d'utilisateurs inconnus (ignorées), "
+          f"{unseen['unseen_items']:,} sur des articles absents du train (pertinentes, jamais recommandées) "
+          f"sur {unseen['n_interactions']:,}")
+
+    start = time.perf_counter()
+    recommendations, _ = recommender.score_users(test_users, args.k, exact=args.exact)
+    scoring_time = time.perf_counter() - start
+    start = time.perf_counter()
+    results = evaluate_model(recommendations, relevance[test_users], args.k, n_bootstrap=args.bootstrap)
+    print(f"   Scoring: {scoring_time:.1f}s, métriques: {time.perf_counter() - start:.2f}s")
+
+    for metric in METRICS:
+        ci = results.get('ci', {}).get(metric)
+        interval = f"  [{ci[0]:.4f}, {ci[1]:.4f}]" if ci else ""
+        print(f"   {metric.replace('@k', f'@{args.k}'):<14} {results[metric]:.4f}{interval}")
+
+    if args.per_user:
+        per_user = per_user_metrics(recommendations, relevance[test_users], args.k,
+                                    user_ids=pd.Index(recommender.unique_users[test_users], name='user_id'))
+        per_user.to_csv(args.per_user)
+        print(f"\n✅ Métriques par utilisateur sauvegardées dans '{args.per_user}'")
@@ -0,0 +1,274 @@
+"""
+Générateur de données synthétiques au schéma Globo (tests de montée en charge)
+
+Produit, dans un dossier de sortie :
+- clicks/clicks_hour_XXX.csv  : un fichier par heure, colonnes du jeu réel
+- articles_metadata.csv        : article_id, category_id, created_at_ts, publisher_id, words_count
+- articles_embeddings.pickle   : array float32 (n_articles, dim), lignes dans l'ordre des articles
+
+La popularité des articles et l'activité des utilisateurs suivent des lois de
+puissance (poids rang^-exposant sur un ordre aléatoire), les clics sont groupés
+en sessions (même utilisateur, même contexte, timestamps croissants). Chaque
+heure est générée de façon vectorisée avec sa propre graine dérivée de --seed,
+puis écrite sur disque : la mémoire est bornée par un fichier horaire, les
+heures peuvent être produites en parallèle et le résultat est reproductible.
+
+Usage:
+    python generate_synthetic_data.py --output synthetic_data --users 3200000 --articles 3600000 --clicks 30000000
+    python ingest_clicks.py --clicks-dir synthetic_data/clicks
+"""
+
+import argparse
+import os
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+# Ordres de grandeur du jeu public (heure 0 = 1er octobre 2017)
+START_TIMESTAMP_MS = 1506826800000
+HOUR_MS = 3600 * 1000
+N_CATEGORIES = 461
+
+# Distributions des colonnes de contexte (valeur -> probabilité), proches du jeu public
+CONTEXT_DISTRIBUTIONS = {
+    'click_environment': {4: 0.97, 2: 0.02, 1: 0.01},
+    'click_deviceGroup': {1: 0.60, 3: 0.33, 4: 0.06, 5: 0.01},
+    'click_os': {17: 0.38, 20: 0.26, 2: 0.20, 12: 0.10, 19: 0.04, 13: 0.02},
+    'click_country': {1: 0.96, **{country: 0.004 for country in range(2, 12)}},
+    'click_region': {region: weight for region, weight in zip(range(1, 29), np.arange(1, 29, dtype=float) ** -1.0)},
+    'click_referrer_type': {2: 0.55, 1: 0.28, 5: 0.09, 4: 0.04, 7: 0.02, 3: 0.01, 6: 0.01}
+}
+
+
+def power_law_cdf(n: int, exponent: float, rng) -> np.ndarray:
+    """
+    CDF d'une loi de puissance sur n éléments (poids rang^-exposant, rangs mélangés)
+
+    Un tirage est np.searchsorted(cdf, rng.random(size)) : O(log n) par tirage,
+    sans reconstruire la table à chaque appel comme rng.choice(p=...).
+    """
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -exponent
+    weights = weights[rng.permutation(n)]
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def sample_cdf(cdf, size: int, rng) -> np.ndarray:
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1)
+
+
+def sample_categorical(distribution: dict, size: int, rng) -> np.ndarray:
+    values = np.fromiter(distribution.keys(), dtype=np.int64)
+    weights = np.fromiter(distribution.values(), dtype=np.float64)
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def hourly_click_counts(n_clicks: int, n_hours: int) -> np.ndarray:
+    """Répartition des clics par heure avec un cycle jour / nuit (total exact)"""
+    hours = np.arange(n_hours)
+    weights = 1.0 + 0.6 * np.sin(2 * np.pi * (hours % 24 - 9) / 24)
+    counts = np.floor(weights / weights.sum() * n_clicks).astype(np.int64)
+    counts[:n_clicks - counts.sum()] += 1
+    return counts
+
+
+def generate_articles(n_articles: int, n_hours: int, seed: int = 42) -> pd.DataFrame:
+    """Métadonnées des articles (publiés jusqu'à 30 jours avant la période, et pendant)"""
+    rng = np.random.default_rng([seed, 0])
+    category_cdf = power_law_cdf(N_CATEGORIES, 1.1, rng)
+    span_ms = 30 * 24 * HOUR_MS + n_hours * HOUR_MS
+    created_at = START_TIMESTAMP_MS - 30 * 24 * HOUR_MS + np.sort(rng.integers(0, span_ms, n_articles))
+    return pd.DataFrame({
+        'article_id': np.arange(n_articles, dtype=np.int32),
+        'category_id': sample_cdf(category_cdf, n_articles, rng).astype(np.int16),
+        'created_at_ts': created_at.astype(np.int64),
+        'publisher_id': np.zeros(n_articles, dtype=np.int16),
+        'words_count': np.clip(rng.lognormal(5.3, 0.5, n_articles), 0, 6000).astype(np.int32)
+    })
+
+
+def generate_embeddings(categories, dim: int = 250, seed: int = 42, block_size: int = 65536) -> np.ndarray:
+    """Embeddings float32 : centre de la catégorie + bruit (articles d'une catégorie proches en cosinus)"""
+    rng = np.random.default_rng([seed, 1])
+    centroids = rng.standard_normal((N_CATEGORIES, dim)).astype(np.float32)
+    embeddings = np.empty((len(categories), dim), dtype=np.float32)
+    for start in range(0, len(categories), block_size):
+        end = min(start + block_size, len(categories))
+        noise = rng.standard_normal((end - start, dim), dtype=np.float32)
+        embeddings[start:end] = centroids[categories[start:end]] + 0.8 * noise
+    return embeddings
+
+
+def generate_hour(hour: int, n_clicks: int, user_cdf, article_cdf, created_at, seed: int = 42,
+                  mean_session_size: float = 3.0) -> pd.DataFrame:
+    """
+    Clics d'une heure, groupés en sessions
+
+    Args:
+        hour: Index de l'heure (graine dérivée : résultat indépendant des autres heures)
+        n_clicks: Nombre exact de clics de l'heure
+        user_cdf: CDF de l'activité des utilisateurs (power_law_cdf)
+        article_cdf: CDF de la popularité des articles (power_law_cdf)
+        created_at: created_at_ts de chaque article (les articles pas encore publiés
+            sont remplacés par un article déjà publié)
+        mean_session_size: Nombre moyen de clics par session (minimum 2, comme le jeu public)
+    """
+    rng = np.random.default_rng([seed, 2, hour])
+    if n_clicks <= 0:
+        return pd.DataFrame({column: [] for column in (
+            'user_id', 'session_id', 'session_start', 'session_size', 'click_article_id', 'click_timestamp',
+            *CONTEXT_DISTRIBUTIONS)})
+
+    # Sessions : tailles 2 + géométrique, la dernière est tronquée au total de l'heure
+    n_sessions = int(n_clicks / mean_session_size * 1.2) + 1
+    sizes = 2 + rng.geometric(1.0 / max(mean_session_size - 1.0, 1.0), n_sessions) - 1
+    ends = np.cumsum(sizes)
+    n_sessions = int(np.searchsorted(ends, n_clicks)) + 1
+    while n_sessions > len(sizes):
+        sizes = np.concatenate([sizes, 2 + rng.geometric(1.0 / max(mean_session_size - 1.0, 1.0), len(sizes)) - 1])
+        ends = np.cumsum(sizes)
+        n_sessions = int(np.searchsorted(ends, n_clicks)) + 1
+    sizes = sizes[:n_sessions].copy()
+    sizes[-1] -= ends[n_sessions - 1] - n_clicks
+
+    hour_start = START_TIMESTAMP_MS + hour * HOUR_MS
+    session_start = hour_start + np.sort(rng.integers(0, HOUR_MS, n_sessions))
+    session_index = np.repeat(np.arange(n_sessions), sizes)
+    position = np.arange(n_clicks) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    # Timestamps croissants dans la session (écarts exponentiels, ~2 min), premier clic au début
+    gaps = rng.exponential(120000.0, n_clicks).astype(np.int64)
+    gaps[position == 0] = 0
+    offsets = np.cumsum(gaps)
+    offsets -= np.repeat(offsets[np.cumsum(sizes) - sizes], sizes)
+
+    articles = sample_cdf(article_cdf, n_clicks, rng)
+    click_timestamp = session_start[session_index] + offsets
+    unpublished = created_at[articles] > click_timestamp
+    if unpublished.any():
+        # Un article ne peut être lu avant sa publication : repli sur les articles déjà publiés
+        published = int(np.searchsorted(created_at, hour_start, side='right'))
+        articles[unpublished] = rng.integers(0, max(published, 1), int(unpublished.sum()))
+
+    users = sample_cdf(user_cdf, n_sessions, rng)
+    session_seq = np.arange(n_sessions, dtype=np.int64) + hour * 10_000_000
+    frame = {
+        'user_id': users[session_index].astype(np.int32),
+        'session_id': (session_start * 1000 + session_seq % 1000)[session_index],
+        'session_start': session_start[session_index],
+        'session_size': sizes[session_index].astype(np.int16),
+        'click_article_id': articles.astype(np.int32),
+        'click_timestamp': click_timestamp
+    }
+    for column, distribution in CONTEXT_DISTRIBUTIONS.items():
+        frame[column] = sample_categorical(distribution, n_sessions, rng).astype(np.int8)[session_index]
+    return pd.DataFrame(frame)
+
+
+def _write_hour(args) -> int:
+    (hour, n_clicks, user_cdf, article_cdf, created_at, seed, mean_session_size, clicks_dir) = args
+    clicks = generate_hour(hour, n_clicks, user_cdf, article_cdf, created_at, seed, mean_session_size)
+    clicks.to_csv(Path(clicks_dir) / f"clicks_hour_{hour:03d}.csv", index=False)
+    return len(clicks)
+
+
+def generate_dataset(output_dir='synthetic_data', n_users: int = 322897, n_articles: int = 364047,
+                     n_clicks: int = 2988181, n_hours: int = 385, user_exponent: float = 0.5,
+                     article_exponent: float = 1.0, mean_session_size: float = 3.0,
+                     embedding_dim: int = 250, seed: int = 42, n_workers: Optional[int] = 1) -> dict:
+    """
+    Génère un jeu de données complet (valeurs par défaut : taille du jeu public)
+
+    Args:
+        output_dir: Dossier de sortie (clicks/, articles_metadata.csv, articles_embeddings.pickle)
+        n_users, n_articles, n_clicks: Volumes à générer
+        n_hours: Nombre de fichiers horaires
+        user_exponent: Exposant de la loi de puissance de l'activité des utilisateurs
+        article_exponent: Exposant de la loi de puissance de la popularité des articles
+        mean_session_size: Nombre moyen de clics par session
+        embedding_dim: Dimension des embeddings (0 pour ne pas les générer)
+        seed: Graine (même graine = mêmes fichiers, quel que soit n_workers)
+        n_workers: Processus d'écriture des fichiers horaires (défaut: 1, None = nombre de CPU)
+
+    Returns:
+        Statistiques de la génération
+    """
+    output_dir = Path(output_dir)
+    clicks_dir = output_dir / 'clicks'
+    clicks_dir.mkdir(parents=True, exist_ok=True)
+    stats = {}
+
+    print(f"1. Métadonnées de {n_articles:,} articles...")
+    start = time.perf_counter()
+    articles = generate_articles(n_articles, n_hours, seed)
+    articles.to_csv(output_dir / 'articles_metadata.csv', index=False)
+    stats['articles_s'] = time.perf_counter() - start
+    print(f"   ✅ articles_metadata.csv ({stats['articles_s']:.1f}s)")
+
+    if embedding_dim:
+        print(f"2. Embeddings ({n_articles:,} x {embedding_dim})...")
+        start = time.perf_counter()
+        embeddings = generate_embeddings(articles['category_id'].values, embedding_dim, seed)
+        with open(output_dir / 'articles_embeddings.pickle', 'wb') as f:
+            pickle.dump(embeddings, f, protocol=pickle.HIGHEST_PROTOCOL)
+        stats['embeddings_s'] = time.perf_counter() - start
+        print(f"   ✅ articles_embeddings.pickle ({embeddings.nbytes / (1024 * 1024):.0f} MB, "
+              f"{stats['embeddings_s']:.1f}s)")
+        del embeddings
+
+    print(f"3. {n_clicks:,} clics sur {n_hours} fichiers horaires...")
+    start = time.perf_counter()
+    rng = np.random.default_rng([seed, 3])
+    user_cdf = power_law_cdf(n_users, user_exponent, rng)
+    article_cdf = power_law_cdf(n_articles, article_exponent, rng)
+    created_at = articles['created_at_ts'].values
+    tasks = [
+        (hour, int(count), user_cdf, article_cdf, created_at, seed, mean_session_size, str(clicks_dir))
+        for hour, count in enumerate(hourly_click_counts(n_clicks, n_hours))
+    ]
+
+    written = 0
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        results = map(_write_hour, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        results = executor.map(_write_hour, tasks)
+    try:
+        for hour, n_rows in enumerate(results, 1):
+            written += n_rows
+            if hour % 24 == 0 or hour == n_hours:
+                elapsed = time.perf_counter() - start
+                print(f"   [{hour}/{n_hours}] {written:,} clics ({written / elapsed:,.0f} clics/s)", flush=True)
+    finally:
+        if n_workers != 1:
+            executor.shutdown()
+    stats['clicks_s'] = time.perf_counter() - start
+    stats['n_clicks'] = written
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générateur de données synthétiques au schéma Globo")
+    parser.add_argument('--output', default='synthetic_data', help="Dossier de sortie")
+    parser.add_argument('--users', type=int, default=322897)
+    parser.add_argument('--articles', type=int, default=364047)
+    parser.add_argument('--clicks', type=int, default=2988181)
+    parser.add_argument('--hours', type=int, default=385, help="Nombre de fichiers horaires")
+    parser.add_argument('--user-exponent', type=float, default=0.5, help="Loi de puissance de l'activité")
+    parser.add_argument('--article-exponent', type=float, default=1.0, help="Loi de puissance de la popularité")
+    parser.add_argument('--session-size', type=float, default=3.0, help="Clics moyens par session")
+    parser.add_argument('--embedding-dim', type=int, default=250, help="Dimension des embeddings (0 = aucun)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=1, help="Processus d'écriture (0 = nb de CPU)")
+    args = parser.parse_args()
+
+    print("=== GÉNÉRATION DE DONNÉES SYNTHÉTIQUES ===")
+    stats = generate_dataset(args.output, args.users, args.articles, args.clicks, args.hours,
+                             args.user_exponent, args.article_exponent, args.session_size,
+                             args.embedding_dim, args.seed, args.workers or None)
+    print(f"\n✅ {stats['n_clicks']:,} clics générés en {stats['clicks_s']:.1f}s dans '{args.output}/'")
@@ -0,0 +1,191 @@
+"""
+Ingestion parallèle et en flux des clics (clicks/*.csv)
+
+Chaque fichier horaire est lu par un processus avec les seules colonnes utiles
+et des types étroits, puis réduit à ses agrégats partiels (user_id, article_id,
+count, et optionnellement le dernier click_timestamp de la paire). Les partiels sont fusionnés au fil de l'eau : la mémoire est bornée par
+le nombre de paires (utilisateur, article) distinctes, pas par le volume brut
+de clics.
+
+Usage:
+    python ingest_clicks.py --clicks-dir clicks --workers 4
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from columnar_cache import click_columns
+
+# Colonnes lues dans les fichiers de clics, avec des types étroits
+CLICK_COLUMNS = {'user_id': np.int32, 'click_article_id': np.int32}
+TIMESTAMP_COLUMN = 'click_timestamp'
+
+
+def _pair_keys(user_ids, article_ids) -> np.ndarray:
+    """Encode chaque paire (user_id, article_id) en une clé int64 unique"""
+    return (user_ids.astype(np.int64) << 32) | article_ids.astype(np.int64)
+
+
+def _aggregate_keys(keys, counts, timestamps=None):
+    """
+    Somme des counts par clé de paire (index trié)
+
+    Avec timestamps, retourne un DataFrame (count, last_click_timestamp) où
+    last_click_timestamp est le maximum des timestamps de la paire.
+    """
+    if timestamps is None:
+        return pd.Series(counts, copy=False).groupby(keys, sort=True).sum()
+    frame = pd.DataFrame({'count': counts, 'last_click_timestamp': timestamps}, copy=False)
+    return frame.groupby(keys, sort=True).agg({'count': 'sum', 'last_click_timestamp': 'max'})
+
+
+def _empty_partial(with_timestamps: bool):
+    if not with_timestamps:
+        return pd.Series([], dtype=np.int32)
+    return pd.DataFrame({'count': np.empty(0, dtype=np.int32),
+                         'last_click_timestamp': np.empty(0, dtype=np.int64)})
+
+
+def aggregate_click_file(path, chunksize: Optional[int] = None, with_timestamps: bool = False):
+    """
+    Réduit un fichier de clics à ses agrégats partiels
+
+    Args:
+        path: Fichier CSV de clics
+        chunksize: Lecture par blocs de lignes (None = fichier entier)
+        with_timestamps: Garder aussi le dernier click_timestamp de chaque paire
+
+    Returns:
+        Series count (int32) indexée par la clé de paire (voir _pair_keys), ou
+        DataFrame (count, last_click_timestamp) avec with_timestamps
+    """
+    columns = dict(CLICK_COLUMNS, **({TIMESTAMP_COLUMN: np.int64} if with_timestamps else {}))
+    reader = pd.read_csv(path, usecols=list(columns), dtype=columns, chunksize=chunksize)
+    chunks = [reader] if chunksize is None else reader
+
+    partials = []
+    for chunk in chunks:
+        keys = _pair_keys(chunk['user_id'].values, chunk['click_article_id'].values)
+        timestamps = chunk[TIMESTAMP_COLUMN].values if with_timestamps else None
+        partials.append(_aggregate_keys(keys, np.ones(len(keys), dtype=np.int32), timestamps))
+        if len(partials) >= 2:
+            partials = [merge_partials(partials)]
+    if not partials:
+        return _empty_partial(with_timestamps)
+    return partials[0]
+
+
+def merge_partials(partials):
+    """Fusionne des agrégats partiels (clés communes additionnées, dernier timestamp conservé)"""
+    keys = np.concatenate([partial.index.values for partial in partials])
+    if isinstance(partials[0], pd.DataFrame):
+        merged = _aggregate_keys(keys, np.concatenate([partial['count'].values for partial in partials]),
+                                 np.concatenate([partial['last_click_timestamp'].values for partial in partials]))
+        return merged.astype({'count': np.int32, 'last_click_timestamp': np.int64})
+    counts = np.concatenate([partial.values for partial in partials])
+    return _aggregate_keys(keys, counts).astype(np.int32)
+
+
+def aggregate_cached_columns(user_ids, article_ids, timestamps=None, chunksize: int = 5000000):
+    """Agrégats des colonnes memory-mappées du cache, par blocs de lignes"""
+    partials = []
+    for start in range(0, len(user_ids), chunksize):
+        keys = _pair_keys(user_ids[start:start + chunksize], article_ids[start:start + chunksize])
+        block_timestamps = None if timestamps is None else np.asarray(timestamps[start:start + chunksize])
+        partials.append(_aggregate_keys(keys, np.ones(len(keys), dtype=np.int32), block_timestamps))
+        if len(partials) >= 2:
+            partials = [merge_partials(partials)]
+    return merge_partials(partials) if partials else _empty_partial(timestamps is not None)
+
+
+def load_interactions(clicks_dir='clicks', n_workers: Optional[int] = None,
+                      merge_every: int = 32, chunksize: Optional[int] = None,
+                      use_cache: bool = True, with_timestamps: bool = False) -> pd.DataFrame:
+    """
+    Table des interactions (user_id, article_id, count) de tous les fichiers de clics
+
+    Équivalent à pd.concat(read_csv(...)).groupby(['user_id', 'article_id']).size(),
+    sans jamais matérialiser l'ensemble des clics bruts.
+
+    Args:
+        clicks_dir: Dossier des fichiers clicks/*.csv
+        n_workers: Processus de lecture (défaut: nombre de CPU ; 1 = dans ce processus)
+        merge_every: Nombre de partiels accumulés avant une fusion intermédiaire
+        chunksize: Lecture de chaque fichier par blocs de lignes (gros fichiers)
+        use_cache: Agréger depuis le cache en colonnes (columnar_cache.py) s'il
+            est à jour, plutôt que de relire les CSV
+        with_timestamps: Ajouter la colonne last_click_timestamp (int64, dernier
+            clic de la paire), utilisée par le split chronologique
+
+    Returns:
+        DataFrame trié par (user_id, article_id), colonnes int32 (+ last_click_timestamp)
+    """
+    files = sorted(Path(clicks_dir).glob("*.csv"))
+    if not files:
+        raise FileNotFoundError(f"Aucun fichier de clics dans '{clicks_dir}'")
+    n_workers = n_workers or os.cpu_count() or 1
+
+    cached = ['user_id', 'click_article_id'] + ([TIMESTAMP_COLUMN] if with_timestamps else [])
+    columns = click_columns(clicks_dir, cached, build=False) if use_cache else None
+    if columns is not None:
+        merged = aggregate_cached_columns(columns['user_id'], columns['click_article_id'],
+                                          columns.get(TIMESTAMP_COLUMN))
+        return _interactions_frame(merged)
+
+    merged, pending = None, []
+
+    def accumulate(partial):
+        nonlocal merged, pending
+        pending.append(partial)
+        if len(pending) >= merge_every:
+            merged = merge_partials(([merged] if merged is not None else []) + pending)
+            pending = []
+
+    if n_workers == 1:
+        for path in files:
+            accumulate(aggregate_click_file(path, chunksize, with_timestamps))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for partial in executor.map(aggregate_click_file, files, [chunksize] * len(files),
+                                        [with_timestamps] * len(files)):
+                accumulate(partial)
+
+    return _interactions_frame(merge_partials(([merged] if merged is not None else []) + pending))
+
+
+def _interactions_frame(merged) -> pd.DataFrame:
+    """Table (user_id, article_id, count) depuis les agrégats par clé de paire"""
+    keys = merged.index.values
+    if isinstance(merged, pd.DataFrame):
+        return pd.DataFrame({
+            'user_id': (keys >> 32).astype(np.int32),
+            'article_id': (keys & 0xFFFFFFFF).astype(np.int32),
+            'count': merged['count'].values.astype(np.int32),
+            'last_click_timestamp': merged['last_click_timestamp'].values.astype(np.int64)
+        })
+    return pd.DataFrame({
+        'user_id': (keys >> 32).astype(np.int32),
+        'article_id': (keys & 0xFFFFFFFF).astype(np.int32),
+        'count': merged.values.astype(np.int32)
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrégation parallèle des fichiers de clics")
+    parser.add_argument('--clicks-dir', default='clicks')
+    parser.add_argument('--workers', type=int, default=None, help="Processus de lecture (défaut: nb de CPU)")
+    parser.add_argument('--chunksize', type=int, default=None, help="Lecture par blocs de lignes")
+    args = parser.parse_args()
+
+    print("=== AGRÉGATION DES CLICS ===")
+    start = time.perf_counter()
+    interactions = load_interactions(args.clicks_dir, args.workers, chunksize=args.chunksize)
+    print(f"   ✅ {len(interactions):,} paires (utilisateur, article), "
+          f"{int(interactions['count'].sum()):,} clics en {time.perf_counter() - start:.1f}s")
+    print(f"   Mémoire de la table: {interactions.memory_usage(index=False).sum() / (1024 * 1024):.2f} MB")
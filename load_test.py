@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Générateur de charge asyncio pour l'API RecommendArticle (locale ou déployée)
+
+Les requêtes GET ?user_id=... sont envoyées sur des connexions HTTP/1.1
+keep-alive ouvertes directement avec asyncio (aucune dépendance externe), soit :
+- à débit fixe (--rps) : les requêtes partent à intervalles réguliers, quelle
+  que soit la latence (boucle ouverte, mesure réaliste des files d'attente)
+- à concurrence fixe (--concurrency) : N clients enchaînent les requêtes
+
+Les user_id viennent d'un fichier (JSON lines avec un champ user_id, ou un ID
+par ligne) ou d'une loi de Zipf sur --zipf-users utilisateurs. Le rapport donne
+le débit, le taux d'erreur, les latences p50/p90/p99/max et les valeurs
+aberrantes de type cold start, et peut être écrit en JSON.
+
+Usage:
+    python load_test.py --url http://localhost:7071/api/recommendarticle --rps 200 --duration 30
+    python load_test.py --url https://<app>.azurewebsites.net/api/recommendarticle --function-key <clé> \\
+        --users-file user_ids.txt --concurrency 32 --requests 5000 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import time
+import numpy as np
+from typing import List, Optional
+from urllib.parse import urlencode, urlsplit
+
+
+class HttpConnection:
+    """Connexion HTTP/1.1 keep-alive minimale (Content-Length ou chunked)"""
+
+    def __init__(self, host: str, port: int, use_ssl: bool, timeout: float):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.n_requests = 0
+
+    async def open(self):
+        context = None
+        if self.use_ssl:
+            context = ssl.create_default_context()
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context), self.timeout
+        )
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def get(self, path: str) -> tuple:
+        """Envoie GET path, retourne (status, headers, body)"""
+        if self.writer is None:
+            await self.open()
+        request = (f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                   f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n")
+        self.writer.write(request.encode('ascii'))
+        await self.writer.drain()
+        status, headers, body = await asyncio.wait_for(self._read_response(), self.timeout)
+        self.n_requests += 1
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, body
+
+    async def _read_response(self) -> tuple:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connexion fermée par le serveur")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            return status, headers, b''.join(chunks)
+        if 'content-length' not in headers:
+            # Ni longueur ni chunked : le corps s'arrête à la fermeture de la connexion
+            headers['connection'] = 'close'
+            return status, headers, await self.reader.read()
+        length = int(headers['content-length'])
+        return status, headers, (await self.reader.readexactly(length)) if length else b''
+
+
+class ConnectionPool:
+    """Connexions keep-alive réutilisées entre requêtes (ouvertes à la demande)"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.use_ssl = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.use_ssl else 80)
+        self.timeout = timeout
+        self._idle = []
+        self.n_opened = 0
+
+    def acquire(self) -> HttpConnection:
+        if self._idle:
+            return self._idle.pop()
+        self.n_opened += 1
+        return HttpConnection(self.host, self.port, self.use_ssl, self.timeout)
+
+    def release(self, connection: HttpConnection, healthy: bool = True):
+        if healthy and connection.writer is not None:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        for connection in self._idle:
+            connection.close()
+        self._idle = []
+
+
+def load_user_ids(path: str) -> List[int]:
+    """user_id d'un fichier JSON lines (champ user_id, éventuellement dans params) ou un ID par ligne"""
+    user_ids = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                user_id = record.get('user_id', record.get('params', {}).get('user_id'))
+                if user_id is not None:
+                    user_ids.append(int(user_id))
+            else:
+                user_ids.append(int(line.split(',')[0]))
+    if not user_ids:
+        raise ValueError(f"Aucun user_id dans '{path}'")
+    return user_ids
+
+
+def zipf_user_ids(n_users: int, n_requests: int, exponent: float = 1.1, seed: int = 42) -> List[int]:
+    """user_id tirés selon une loi de Zipf bornée à n_users (rang 1 = utilisateur 0)"""
+    rng = np.random.default_rng(seed)
+    cdf = np.cumsum(np.arange(1, n_users + 1, dtype=np.float64) ** -exponent)
+    return np.searchsorted(cdf / cdf[-1], rng.random(n_requests), side='right').tolist()
+
+
+class LoadTest:
+    """Exécution d'un test de charge et collecte des mesures par requête"""
+
+    def __init__(self, url: str, user_ids: List[int], n_reco: int = 5, function_key: Optional[str] = None,
+                 timeout: float = 30.0):
+        self.base_path = urlsplit(url).path or '/'
+        self.pool = ConnectionPool(url, timeout)
+        self.user_ids = user_ids
+        self.extra_params = {'n_reco': n_reco, **({'code': function_key} if function_key else {})}
+        self.results = []  # (départ s, latence ms, status, erreur, première requête de la connexion, X-Cache)
+        self._start = None
+
+    async def _one(self, index: int):
+        user_id = self.user_ids[index % len(self.user_ids)]
+        path = f"{self.base_path}?{urlencode({'user_id': user_id, **self.extra_params})}"
+        connection = self.pool.acquire()
+        first = connection.n_requests == 0
+        started = time.perf_counter()
+        status, error, cache = 0, None, None
+        try:
+            status, headers, _ = await connection.get(path)
+            cache = headers.get('x-cache')
+        except Exception as e:
+            error = type(e).__name__
+        latency = (time.perf_counter() - started) * 1000
+        self.pool.release(connection, healthy=error is None)
+        self.results.append((started - self._start, latency, status, error, first, cache))
+
+    async def run_fixed_rps(self, rps: float, n_requests: int):
+        """Boucle ouverte : une requête toutes les 1/rps secondes"""
+        self._start = time.perf_counter()
+        tasks = []
+        for index in range(n_requests):
+            delay = self._start + index / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(self._one(index)))
+        await asyncio.gather(*tasks)
+        self.pool.close()
+
+    async def run_fixed_concurrency(self, concurrency: int, n_requests: int):
+        """Boucle fermée : concurrency clients enchaînent les requêtes"""
+        self._start = time.perf_counter()
+        counter = iter(range(n_requests))
+
+        async def client():
+            for index in counter:
+                await self._one(index)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        self.pool.close()
+
+    def report(self, cold_start_factor: float = 10.0) -> dict:
+        """
+        Synthèse des mesures
+
+        Les valeurs aberrantes de type cold start sont les requêtes plus lentes
+        que cold_start_factor x la médiane ; leur position (début du test,
+        première requête d'une connexion) aide à distinguer un chargement de
+        modèle d'un pic ponctuel.
+        """
+        starts = np.array([r[0] for r in self.results])
+        latencies = np.array([r[1] for r in self.results])
+        ok = np.array([r[3] is None and 200 <= r[2] < 300 for r in self.results])
+        duration = float((starts + latencies / 1000).max()) if len(starts) else 0.0
+
+        status_counts, error_counts, cache_counts = {}, {}, {}
+        for _, _, status, error, _, cache in self.results:
+            if error:
+                error_counts[error] = error_counts.get(error, 0) + 1
+            else:
+                status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+            if cache:
+                cache_counts[cache] = cache_counts.get(cache, 0) + 1
+
+        report = {
+            'requests': len(self.results),
+            'duration_s': duration,
+            'throughput_rps': len(self.results) / duration if duration > 0 else 0.0,
+            'error_rate': float(1 - ok.mean()) if len(ok) else 0.0,
+            'status': status_counts,
+            'errors': error_counts,
+            'x_cache': cache_counts,
+            'connections_opened': self.pool.n_opened
+        }
+        if ok.any():
+            ok_latencies = latencies[ok]
+            report['latency_ms'] = {
+                'mean': float(ok_latencies.mean()),
+                'p50': float(np.percentile(ok_latencies, 50)),
+                'p90': float(np.percentile(ok_latencies, 90)),
+                'p99': float(np.percentile(ok_latencies, 99)),
+                'max': float(ok_latencies.max())
+            }
+            threshold = cold_start_factor * report['latency_ms']['p50']
+            outliers = [
+                {'start_s': round(r[0], 3), 'latency_ms': round(r[1], 2), 'first_on_connection': r[4]}
+                for r, is_ok in zip(self.results, ok) if is_ok and r[1] > threshold
+            ]
+            report['cold_start_outliers'] = {
+                'threshold_ms': threshold,
+                'count': len(outliers),
+                'slowest': sorted(outliers, key=lambda o: -o['latency_ms'])[:20]
+            }
+        return report
+
+
+def print_report(report: dict):
+    print(f"\nRequêtes: {report['requests']:,} en {report['duration_s']:.1f}s "
+          f"({report['throughput_rps']:,.1f} req/s), {report['connections_opened']} connexions")
+    print(f"Taux d'erreur: {report['error_rate']:.2%}  statuts: {report['status']}  erreurs: {report['errors']}")
+    if report['x_cache']:
+        print(f"X-Cache: {report['x_cache']}")
+    if 'latency_ms' in report:
+        latency = report['latency_ms']
+        print(f"Latence (ms): p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+              f"p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+        outliers = report['cold_start_outliers']
+        print(f"Valeurs aberrantes (> {outliers['threshold_ms']:.1f} ms): {outliers['count']}")
+        for outlier in outliers['slowest'][:5]:
+            origin = "1re requête de la connexion" if outlier['first_on_connection'] else "connexion réutilisée"
+            print(f"   t={outlier['start_s']:.2f}s  {outlier['latency_ms']:.1f} ms  ({origin})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générateur de charge asyncio pour RecommendArticle")
+    parser.add_argument('--url', default='http://localhost:7071/api/recommendarticle', help="URL de la fonction")
+    parser.add_argument('--function-key', default=os.environ.get('FUNCTION_KEY'),
+                        help="Clé de fonction Azure (paramètre code, défaut: $FUNCTION_KEY)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--users-file', default=None, help="user_id à rejouer (JSON lines ou un ID par ligne)")
+    source.add_argument('--zipf-users', type=int, default=100000, help="user_id tirés par Zipf sur [0, N)")
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--rps', type=float, default=None, help="Débit fixe (requêtes/s, boucle ouverte)")
+    mode.add_argument('--concurrency', type=int, default=None, help="Concurrence fixe (clients simultanés)")
+    parser.add_argument('--requests', type=int, default=None, help="Nombre de requêtes")
+    parser.add_argument('--duration', type=float, default=30.0, help="Durée (s) avec --rps si --requests est absent")
+    parser.add_argument('--n-reco', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--cold-start-factor', type=float, default=10.0,
+                        help="Requête aberrante si latence > facteur x p50")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    rps = args.rps if args.rps or args.concurrency else 50.0
+    n_requests = args.requests or (int(rps * args.duration) if rps and not args.concurrency else 1000)
+    if args.users_file:
+        user_ids = load_user_ids(args.users_file)
+    else:
+        user_ids = zipf_user_ids(args.zipf_users, n_requests, args.zipf_exponent, args.seed)
+
+    print("=== TEST DE CHARGE ===")
+    load_mode = f"concurrence {args.concurrency}" if args.concurrency else f"{rps:g} req/s"
+    print(f"{args.url} : {n_requests:,} requêtes, {load_mode}")
+    test = LoadTest(args.url, user_ids, args.n_reco, args.function_key, args.timeout)
+    if args.concurrency:
+        asyncio.run(test.run_fixed_concurrency(args.concurrency, n_requests))
+    else:
+        asyncio.run(test.run_fixed_rps(rps, n_requests))
+
+    report = test.report(args.cold_start_factor)
+    report['config'] = {
+        'url': args.url,
+        'mode': 'concurrency' if args.concurrency else 'rps',
+        'rps': None if args.concurrency else rps,
+        'concurrency': args.concurrency,
+        'users': args.users_file or f"zipf({args.zipf_users}, {args.zipf_exponent})",
+        'n_reco': args.n_reco
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Résultats sauvegardés dans '{args.output}'")
@@ -0,0 +1,125 @@
+"""
+Exécution locale des Azure Functions, sans le runtime Azure
+
+Importe les fonctions de azure_function/ comme des modules Python et construit
+des requêtes HTTP factices pour appeler directement leur main(). Si le package
+azure-functions n'est pas installé, un équivalent minimal de HttpRequest /
+HttpResponse (les seuls types utilisés par les fonctions) est enregistré sous
+le nom azure.functions.
+"""
+
+import importlib
+import json
+import os
+import sys
+import types
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+
+FUNCTION_ROOT = Path(__file__).resolve().parent / 'azure_function'
+
+
+class LocalHttpRequest:
+    """Sous-ensemble de azure.functions.HttpRequest utilisé par les fonctions"""
+
+    def __init__(self, method: str, url: str, headers: Optional[dict] = None, params: Optional[dict] = None,
+                 route_params: Optional[dict] = None, body: bytes = b''):
+        self.method = method.upper()
+        self.url = url
+        self.headers = {key.lower(): value for key, value in (headers or {}).items()}
+        self.params = dict(params or {})
+        self.route_params = dict(route_params or {})
+        self._body = body or b''
+
+    def get_body(self) -> bytes:
+        return self._body
+
+    def get_json(self):
+        if not self._body:
+            raise ValueError('HTTP request does not contain valid JSON data')
+        return json.loads(self._body)
+
+
+class LocalHttpResponse:
+    """Sous-ensemble de azure.functions.HttpResponse utilisé par les fonctions"""
+
+    def __init__(self, body=None, status_code: int = 200, headers: Optional[dict] = None,
+                 mimetype: Optional[str] = None, charset: str = 'utf-8'):
+        if isinstance(body, str):
+            body = body.encode(charset)
+        self._body = body or b''
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        self.mimetype = mimetype
+        self.charset = charset
+
+    def get_body(self) -> bytes:
+        return self._body
+
+
+def ensure_azure_functions():
+    """Module azure.functions réel, ou l'équivalent local s'il n'est pas installé"""
+    try:
+        import azure.functions as func
+        return func
+    except ImportError:
+        func = types.ModuleType('azure.functions')
+        func.HttpRequest = LocalHttpRequest
+        func.HttpResponse = LocalHttpResponse
+        azure = sys.modules.get('azure') or types.ModuleType('azure')
+        azure.functions = func
+        sys.modules.setdefault('azure', azure)
+        sys.modules['azure.functions'] = func
+        return func
+
+
+def load_function(name: str = 'RecommendArticle', function_root=None):
+    """
+    Importe le module d'une fonction (azure_function/<name>/__init__.py)
+
+    Les variables d'environnement (ARTIFACTS_LOCAL_DIR, ARTIFACTS_CACHE_DIR...)
+    doivent être positionnées avant l'import.
+    """
+    ensure_azure_functions()
+    function_root = str(Path(function_root or FUNCTION_ROOT).resolve())
+    if function_root not in sys.path:
+        sys.path.insert(0, function_root)
+    return importlib.import_module(name)
+
+
+def make_request(method: str = 'GET', params: Optional[dict] = None, body=None, headers: Optional[dict] = None,
+                 route: str = 'recommendarticle', host: str = 'http://localhost:7071'):
+    """
+    Construit une requête HTTP pour main()
+
+    Args:
+        method: Méthode HTTP
+        params: Paramètres de query string
+        body: Body (dict/list sérialisé en JSON, ou bytes)
+        headers: En-têtes HTTP
+        route: Route de la fonction (/api/<route>)
+    """
+    func = ensure_azure_functions()
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+        headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+    url = f"{host}/api/{route}" + (f"?{urlencode(params)}" if params else '')
+    return func.HttpRequest(method=method, url=url, headers=headers or {}, params=params or {},
+                            route_params={}, body=body or b'')
+
+
+def use_local_artifacts(artifacts_path, cache_dir=None, overlay_log: Optional[str] = ''):
+    """
+    Configure l'environnement des fonctions pour servir un bundle local
+
+    Args:
+        artifacts_path: Bundle d'artefacts local (ARTIFACTS_LOCAL_DIR)
+        cache_dir: Cache local des bundles (ARTIFACTS_CACHE_DIR, défaut: celui d'artifact_store)
+        overlay_log: Journal de la surcouche (OVERLAY_LOG_PATH ; '' = en mémoire, None = défaut)
+    """
+    os.environ['ARTIFACTS_LOCAL_DIR'] = str(Path(artifacts_path).resolve())
+    if cache_dir is not None:
+        os.environ['ARTIFACTS_CACHE_DIR'] = str(cache_dir)
+    if overlay_log is not None:
+        os.environ['OVERLAY_LOG_PATH'] = overlay_log
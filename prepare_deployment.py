@@ -17,6 +17,9 @@ def prepare_deployment():
     # Fichiers à copier
     files_to_copy = {
         'recommender.py': recommend_article_dir / 'recommender.py',
+        'ann_index.py': recommend_article_dir / 'ann_index.py',
+        'content_index.py': recommend_article_dir / 'content_index.py',
+        'user_overlay.py': recommend_article_dir / 'user_overlay.py',
     }
     
     # Vérifier que les fichiers source existent
@@ -38,6 +41,12 @@ def prepare_deployment():
     
     # Vérifier les artefacts
     print("\n3. Vérification des artefacts...")
+    bundle_manifest = base_dir / 'artifacts' / 'manifest.json'
+    if bundle_manifest.exists():
+        bundle_size_mb = sum(f.stat().st_size for f in bundle_manifest.parent.iterdir()) / (1024 * 1024)
+        print(f"   ✅ artifacts/ (bundle, {bundle_size_mb:.2f} MB)")
+    else:
+        print("   ⚠️  artifacts/ manquant - Exécutez d'abord serialize_artifacts.py")
     artifacts = ['als_model.pkl', 'metadata.pkl', 'csr_train.pkl']
     for artifact in artifacts:
         artifact_path = base_dir / artifact
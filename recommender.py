@@ -2,23 +2,481 @@
 Module de recommandation - Fonction pure pour la production
 """
 
+import hashlib
+import json
+import numbers
 import pickle
+from contextlib import nullcontext
 import numpy as np
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional
 from scipy.sparse import csr_matrix
 from implicit.als import AlternatingLeastSquares
 
+try:
+    from .ann_index import IVFIndex
+    from .content_index import ContentIndex
+    from .user_overlay import UserOverlay
+except ImportError:
+    from ann_index import IVFIndex
+    from content_index import ContentIndex
+    from user_overlay import UserOverlay
+
+# Modes de recommandation servables : filtrage collaboratif (ALS) ou content-based (embeddings)
+RECOMMENDATION_MODES = ('als', 'content')
+
+# Étape non chronométrée (aucun registre de métriques attaché)
+_NO_TIMER = nullcontext()
+
+# Poids maximal d'un événement de clic (add_events) : un seul événement ne doit
+# pas écraser tout l'historique de l'utilisateur
+MAX_EVENT_COUNT = 1000.0
+
+
+def validate_event(user_id, article_id, count) -> tuple:
+    """
+    Vérifie un événement de clic avant son ajout à la surcouche
+    
+    Les IDs doivent être des entiers (Python ou numpy, bool exclu) dans
+    l'intervalle int64, et count un nombre fini dans ]0, MAX_EVENT_COUNT] : un
+    NaN ou un infini propagé au fold-in rendrait le facteur de l'utilisateur
+    inutilisable (ValueError sinon).
+    
+    Returns:
+        Tuple (user_id, article_id, count) en (int, int, float)
+    """
+    for value in (user_id, article_id):
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral) or not -2 ** 63 <= value < 2 ** 63:
+            raise ValueError(f"identifiant invalide: {value!r}")
+    if isinstance(count, bool) or not isinstance(count, numbers.Real) or not 0 < count <= MAX_EVENT_COUNT:
+        raise ValueError(f"count invalide: {count!r} (nombre fini dans ]0, {MAX_EVENT_COUNT:g}])")
+    return int(user_id), int(article_id), float(count)
+
+
+def compact_ids(ids) -> np.ndarray:
+    """Convertit une séquence d'IDs en array int32 si possible, int64 sinon"""
+    ids = np.asarray(ids)
+    if ids.dtype == np.int32:
+        # Déjà compact (évite une copie des arrays memory-mappés)
+        return ids
+    ids = ids.astype(np.int64)
+    if len(ids) == 0 or (ids.min() >= np.iinfo(np.int32).min and ids.max() <= np.iinfo(np.int32).max):
+        return ids.astype(np.int32)
+    return ids
+
+
+def integer_ids(ids):
+    """
+    IDs en array int64, avec le masque des éléments réellement entiers
+    
+    Même règle que IdMapping.get : les flottants (1475.9), booléens et chaînes
+    ("1475") ne sont ni tronqués ni convertis, leur masque vaut False. Un array
+    d'entiers (cas courant) est converti sans parcours élément par élément.
+    
+    Returns:
+        Tuple (array int64, masque bool) de même forme que ids
+    """
+    array = np.asarray(ids)
+    if array.dtype.kind == 'i' or (array.dtype.kind == 'u' and array.dtype.itemsize < 8):
+        return array.astype(np.int64, copy=False), np.ones(array.shape, dtype=bool)
+    values = array.astype(object) if isinstance(ids, np.ndarray) else np.asarray(ids, dtype=object)
+    valid = np.array([
+        isinstance(value, numbers.Integral) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+        for value in values.ravel()
+    ], dtype=bool).reshape(values.shape)
+    result = np.zeros(values.shape, dtype=np.int64)
+    result[valid] = [int(value) for value in values[valid]]
+    return result, valid
+
+
+def _is_valid_event(event) -> bool:
+    try:
+        validate_event(*event)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class IdMapping:
+    """
+    Correspondance ID externe -> index compact, adossée à un array numpy trié
+    
+    Remplace les dict {id: idx} : indexation directe quand les IDs sont denses
+    (table de correspondance int32), recherche dichotomique (searchsorted) sinon.
+    Expose la même interface que le dict pour `in`, `[]`, `get` et `len`.
+    Comme pour un dict de clés int, seuls les entiers sont trouvés : 1475.9 ou
+    "1475" ne correspondent à aucun ID (pas de troncature ni de conversion).
+    """
+    
+    # Au-delà de ce ratio (étendue des IDs / nombre d'IDs), searchsorted est préféré
+    DENSE_MAX_RATIO = 2
+    
+    def __init__(self, ids):
+        """
+        Args:
+            ids: IDs uniques triés par ordre croissant (position = index)
+        """
+        self.ids = compact_ids(ids)
+        if len(self.ids) > 1 and np.any(np.diff(self.ids) <= 0):
+            raise ValueError("Les IDs doivent être uniques et triés par ordre croissant")
+        
+        self._offset = 0
+        self._table = None
+        if len(self.ids) > 0:
+            span = int(self.ids[-1]) - int(self.ids[0]) + 1
+            if span <= self.DENSE_MAX_RATIO * len(self.ids):
+                self._offset = int(self.ids[0])
+                self._table = np.full(span, -1, dtype=np.int32)
+                self._table[self.ids.astype(np.int64) - self._offset] = np.arange(len(self.ids), dtype=np.int32)
+    
+    def lookup(self, ids) -> np.ndarray:
+        """Convertit un array d'IDs en indices (-1 pour les IDs inconnus ou non entiers, comme get)"""
+        ids, is_integer = integer_ids(ids)
+        indices = np.full(ids.shape, -1, dtype=np.int64)
+        if len(self.ids) == 0:
+            return indices
+        
+        if self._table is not None:
+            positions = ids - self._offset
+            valid = (positions >= 0) & (positions < len(self._table))
+            indices[valid] = self._table[positions[valid]]
+        else:
+            positions = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+            found = self.ids[positions] == ids
+            indices[found] = positions[found]
+        indices[~is_integer] = -1
+        return indices
+    
+    def get(self, key, default=None):
+        # Entiers Python ou numpy uniquement (bool exclu)
+        if isinstance(key, bool) or not isinstance(key, numbers.Integral):
+            return default
+        key = int(key)
+        if len(self.ids) == 0 or not int(self.ids[0]) <= key <= int(self.ids[-1]):
+            return default
+        
+        if self._table is not None:
+            position = key - self._offset
+            if 0 <= position < len(self._table) and self._table[position] >= 0:
+                return int(self._table[position])
+            return default
+        
+        position = int(np.searchsorted(self.ids, key))
+        if position < len(self.ids) and self.ids[position] == key:
+            return position
+        return default
+    
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+    
+    def __getitem__(self, key) -> int:
+        idx = self.get(key)
+        if idx is None:
+            raise KeyError(key)
+        return idx
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def model_fingerprint(user_factors, item_factors) -> str:
+    """
+    Empreinte courte des facteurs ALS
+    
+    Sert à détecter une table top-K périmée (calculée pour un autre modèle).
+    Seul un échantillon de lignes est haché pour rester rapide au chargement.
+    """
+    digest = hashlib.sha1()
+    for factors in (user_factors, item_factors):
+        step = max(1, len(factors) // 1024)
+        digest.update(str(tuple(factors.shape)).encode())
+        digest.update(np.ascontiguousarray(factors[::step], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+FACTOR_DTYPES = ('float32', 'float16', 'int8')
+
+
+def quantize_factors(factors, factor_dtype: str):
+    """
+    Quantifie des facteurs ALS pour le stockage
+    
+    Args:
+        factors: Facteurs float32 (n, factors)
+        factor_dtype: 'float16', ou 'int8' (échelle par ligne : max |valeur| -> 127)
+    
+    Returns:
+        Tuple (values, scales) ; scales vaut None sauf en int8
+    """
+    factors = np.asarray(factors, dtype=np.float32)
+    if factor_dtype == 'float16':
+        return factors.astype(np.float16), None
+    if factor_dtype == 'int8':
+        scales = np.abs(factors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        values = np.clip(np.rint(factors / scales[:, None]), -127, 127).astype(np.int8)
+        return values, scales.astype(np.float32)
+    raise ValueError(f"Type de facteurs non supporté: {factor_dtype} (attendu: {', '.join(FACTOR_DTYPES)})")
+
+
+class QuantizedFactors:
+    """
+    Facteurs ALS quantifiés (float16 ou int8 avec échelle par ligne)
+    
+    L'indexation retourne des lignes déquantifiées en float32 ; scores() calcule
+    vectors @ factors.T par blocs d'articles, sans déquantifier toute la matrice.
+    """
+    
+    def __init__(self, values, scales=None, block_size: int = 16384):
+        self.values = values
+        self.scales = scales
+        self.block_size = block_size
+    
+    @property
+    def shape(self):
+        return self.values.shape
+    
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __getitem__(self, rows) -> np.ndarray:
+        dequantized = self.values[rows].astype(np.float32)
+        if self.scales is not None:
+            dequantized *= np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return dequantized
+    
+    def scores(self, vectors) -> np.ndarray:
+        """Produit vectors (b, factors) @ facteurs.T -> (b, n)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scores = np.empty((len(vectors), len(self.values)), dtype=np.float32)
+        for start in range(0, len(self.values), self.block_size):
+            end = start + self.block_size
+            block_scores = vectors @ self.values[start:end].astype(np.float32).T
+            if self.scales is not None:
+                block_scores *= self.scales[start:end]
+            scores[:, start:end] = block_scores
+        return scores
+
+
+def score_matrix(user_vectors, item_factors) -> np.ndarray:
+    """Scores user_vectors @ item_factors.T (facteurs float32 ou QuantizedFactors)"""
+    if isinstance(item_factors, QuantizedFactors):
+        return item_factors.scores(user_vectors)
+    return user_vectors @ item_factors.T
+
+
+def top_n_items(user_factors, item_factors, csr_train, user_indices, n_reco: int = 5, block_size: int = 256):
+    """
+    Calcule le top-N filtré pour un ensemble d'utilisateurs connus
+    
+    Les scores d'un bloc d'utilisateurs sont obtenus par un seul produit
+    matriciel user_factors @ item_factors.T, les articles déjà vus sont
+    masqués directement depuis csr_train et le top-N est extrait par tri partiel.
+    
+    Args:
+        user_factors: Facteurs utilisateurs ALS (n_users, factors)
+        item_factors: Facteurs articles ALS (n_items, factors)
+        csr_train: Matrice CSR (utilisateurs, articles) des interactions
+        user_indices: Indices (lignes de csr_train) des utilisateurs
+        n_reco: Nombre de recommandations par utilisateur
+        block_size: Nombre d'utilisateurs scorés par produit matriciel
+    
+    Returns:
+        Tuple (item_indices, scores) de shape (n_users, n_reco). Les cases sans
+        article disponible valent -1 (indice) et -inf (score).
+    """
+    user_indices = np.asarray(user_indices, dtype=np.int64)
+    n_users = len(user_indices)
+    n_items = item_factors.shape[0]
+    top_n = min(n_reco, n_items)
+    
+    item_indices = np.full((n_users, n_reco), -1, dtype=np.int64)
+    scores = np.full((n_users, n_reco), -np.inf, dtype=np.float32)
+    if top_n <= 0 or n_users == 0:
+        return item_indices, scores
+    
+    for start in range(0, n_users, block_size):
+        rows = user_indices[start:start + block_size]
+        block_scores = score_matrix(user_factors[rows], item_factors)
+        
+        # Masquer les articles déjà vus (filter_already_liked_items)
+        liked = csr_train[rows]
+        liked_rows = np.repeat(np.arange(len(rows)), np.diff(liked.indptr))
+        block_scores[liked_rows, liked.indices] = -np.inf
+        
+        # Top-N par tri partiel puis tri des N candidats seulement
+        top = np.argpartition(-block_scores, top_n - 1, axis=1)[:, :top_n]
+        top_scores = np.take_along_axis(block_scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        top[np.isneginf(top_scores)] = -1
+        
+        item_indices[start:start + len(rows), :top_n] = top
+        scores[start:start + len(rows), :top_n] = top_scores
+    
+    return item_indices, scores
+
+
+def top_n_candidates(candidates, scores, n_reco: int = 5):
+    """
+    Top-N parmi un ensemble de candidats déjà scorés (re-ranking exact)
+    
+    Returns:
+        Tuple (item_indices, scores) de taille n_reco, complété par -1 / -inf
+    """
+    item_indices = np.full(n_reco, -1, dtype=np.int64)
+    top_scores = np.full(n_reco, -np.inf, dtype=np.float32)
+    top_n = min(n_reco, len(candidates))
+    if top_n <= 0:
+        return item_indices, top_scores
+    
+    top = np.argpartition(-scores, top_n - 1)[:top_n]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    item_indices[:top_n] = candidates[top]
+    top_scores[:top_n] = scores[top]
+    return item_indices, top_scores
+
+
+def compute_topk_table(user_factors, item_factors, csr_train, k: int = 50, block_size: int = 256) -> np.ndarray:
+    """
+    Précalcule le top-K filtré de tous les utilisateurs connus
+    
+    Returns:
+        Array int32 (n_users, k) d'indices d'articles, indexé par user_idx (-1 = vide)
+    """
+    item_indices, _ = top_n_items(
+        user_factors, item_factors, csr_train,
+        np.arange(user_factors.shape[0]), n_reco=k, block_size=block_size
+    )
+    return item_indices.astype(np.int32)
+
+
+# Format du bundle d'artefacts : un .npy par array + manifest JSON
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MANIFEST = 'manifest.json'
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """Empreinte SHA-256 (hex) d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_bundle(output_dir, user_factors, item_factors, csr_train, unique_users, unique_items,
+                 popularity_recommendations, arrays: Optional[dict] = None, metadata: Optional[dict] = None,
+                 factor_dtype: str = 'float32', keep_exact_factors: bool = False) -> dict:
+    """
+    Écrit un bundle d'artefacts sans pickle, chargeable par memory-mapping
+    
+    Chaque array est écrit en .npy brut ; le manifest JSON (écrit en dernier,
+    sa présence marque un bundle complet) décrit les fichiers et les scalaires.
+    La taille et le SHA-256 de chaque fichier y sont notés : fetch_bundle les
+    vérifie pour ne jamais mettre en cache un bundle mélangeant deux uploads.
+    
+    Args:
+        output_dir: Dossier du bundle (créé si besoin)
+        user_factors, item_factors: Facteurs ALS
+        csr_train: Matrice CSR (utilisateurs, articles) des interactions
+        unique_users, unique_items: IDs triés (position = index)
+        popularity_recommendations: Articles du fallback popularité
+        arrays: Arrays optionnels supplémentaires {nom: array} (ex: topk_table)
+        metadata: Entrées supplémentaires du manifest (doivent être sérialisables en JSON)
+        factor_dtype: Stockage des facteurs : 'float32', 'float16' ou 'int8'
+        keep_exact_factors: Avec des facteurs quantifiés, écrire aussi les facteurs
+            float32 (*_factors_exact.npy) pour le re-ranking exact des candidats.
+            Désactivé par défaut : cette copie rend le bundle plus gros qu'un bundle
+            float32 (+50 % avec float16, +25 % avec int8) ; sans
+            elle, les candidats sont re-scorés sur les lignes déquantifiées
+    
+    Returns:
+        Le manifest écrit
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    manifest_path = output_dir / BUNDLE_MANIFEST
+    if manifest_path.exists():
+        manifest_path.unlink()
+    
+    csr_train = csr_matrix(csr_train)
+    csr_train.sort_indices()
+    user_factors = np.ascontiguousarray(user_factors, dtype=np.float32)
+    item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+    
+    factor_arrays = {'user_factors': user_factors, 'item_factors': item_factors}
+    if factor_dtype != 'float32':
+        factor_arrays = {}
+        for name, factors in (('user', user_factors), ('item', item_factors)):
+            values, scales = quantize_factors(factors, factor_dtype)
+            factor_arrays[f'{name}_factors'] = values
+            if scales is not None:
+                factor_arrays[f'{name}_factor_scales'] = scales
+            if keep_exact_factors:
+                factor_arrays[f'{name}_factors_exact'] = factors
+    
+    bundle_arrays = {
+        **factor_arrays,
+        # YtY (factors x factors) pour le fold-in : évite de relire tous les facteurs au chargement
+        'item_gram': item_factors.T.astype(np.float64) @ item_factors.astype(np.float64),
+        'csr_indptr': csr_train.indptr,
+        'csr_indices': csr_train.indices,
+        'csr_data': csr_train.data.astype(np.float32),
+        'unique_users': compact_ids(unique_users),
+        'unique_items': compact_ids(unique_items),
+        **(arrays or {})
+    }
+    
+    files = {}
+    for name, array in bundle_arrays.items():
+        array = np.ascontiguousarray(array)
+        path = output_dir / f"{name}.npy"
+        np.save(path, array, allow_pickle=False)
+        files[name] = {'file': f"{name}.npy", 'dtype': str(array.dtype), 'shape': list(array.shape),
+                       'bytes': path.stat().st_size, 'sha256': file_sha256(path)}
+    
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'model_version': model_fingerprint(user_factors, item_factors),
+        'n_users': int(csr_train.shape[0]),
+        'n_items': int(csr_train.shape[1]),
+        'factors': int(user_factors.shape[1]),
+        'factor_dtype': factor_dtype,
+        'popularity_recommendations': [int(iid) for iid in popularity_recommendations],
+        **(metadata or {}),
+        'arrays': files
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    return manifest
+
 
 class Recommender:
     """Classe pour gérer le système de recommandation"""
     
-    def __init__(self, artifacts_path: Optional[str] = None):
+    def __init__(self, artifacts_path: Optional[str] = None, use_topk_table: bool = True,
+                 ann_n_probe: int = 8, rerank_factor: int = 4):
         """
         Initialise le recommandeur
         
         Args:
-            artifacts_path: Chemin vers le fichier artifacts.pkl (optionnel)
+            artifacts_path: Chemin vers le bundle d'artefacts ou un fichier artifacts.pkl (optionnel)
+            use_topk_table: Servir les utilisateurs connus depuis la table top-K
+                précalculée quand elle est présente (sinon scoring ALS à la volée)
+            ann_n_probe: Listes IVF parcourues quand le bundle contient un index
+                approximatif (plus = meilleur rappel, plus lent ; 0 = scoring exact)
+            rerank_factor: Avec des facteurs quantifiés, nombre de candidats
+                re-scorés exactement = rerank_factor * n_reco
         """
         self.als_model = None
         self.csr_train = None
@@ -27,22 +485,45 @@ class Recommender:
         self.unique_users = None
         self.unique_items = None
         self.popularity_recommendations = None
+        self.user_factors = None
+        self.item_factors = None
+        self.topk_table = None
+        self.use_topk_table = use_topk_table
+        self.ann_index = None
+        self.ann_n_probe = ann_n_probe
+        self.exact_user_factors = None
+        self.exact_item_factors = None
+        self.rerank_factor = rerank_factor
+        self.content_index = None
+        self.item_content_rows = None
+        self.content_rows = None
+        self.gram_matrix = None
+        self.regularization = 0.01
+        self.alpha = 1.0
+        self.overlay = None
+        self.model_version = None
+        self.manifest = None
+        # Registre de métriques optionnel (timer(stage) / increment(name), voir metrics.py)
+        self.metrics = None
         
         if artifacts_path:
             self.load_artifacts(artifacts_path)
     
     def load_artifacts(self, artifacts_path: str):
-        """Charge les artefacts depuis un fichier pickle"""
+        """Charge les artefacts depuis un fichier pickle ou un dossier bundle"""
+        if Path(artifacts_path).is_dir():
+            self.load_bundle(artifacts_path)
+            return
+        
         with open(artifacts_path, 'rb') as f:
             artifacts = pickle.load(f)
         
         self.als_model = artifacts['als_model']
         self.csr_train = artifacts['csr_train']
-        self.user_to_idx = artifacts['user_to_idx']
-        self.item_to_idx = artifacts['item_to_idx']
-        self.unique_users = artifacts['unique_users']
-        self.unique_items = artifacts['unique_items']
         self.popularity_recommendations = artifacts['popularity_recommendations']
+        self._init_mappings(artifacts)
+        self._init_factors()
+        self._init_topk_table(artifacts)
     
     def load_from_separate_files(self, model_path: str, metadata_path: str, csr_path: str):
         """Charge les artefacts depuis des fichiers séparés (utile pour Azure)"""
@@ -54,97 +535,629 @@ class Recommender:
         with open(metadata_path, 'rb') as f:
             metadata = pickle.load(f)
         
-        self.user_to_idx = metadata['user_to_idx']
-        self.item_to_idx = metadata['item_to_idx']
-        self.unique_users = metadata['unique_users']
-        self.unique_items = metadata['unique_items']
         self.popularity_recommendations = metadata['popularity_recommendations']
+        self._init_mappings(metadata)
         
         # Charger la matrice CSR
         with open(csr_path, 'rb') as f:
             self.csr_train = pickle.load(f)
+        self._init_factors()
+        self._init_topk_table(metadata)
     
-    def recommend(self, user_id: int, n_reco: int = 5) -> List[int]:
+    def load_bundle(self, bundle_dir: str, mmap: bool = True):
+        """
+        Charge un bundle écrit par write_bundle()
+        
+        Avec mmap=True, les .npy sont ouverts en memory-mapping lecture seule :
+        le chargement est quasi instantané et les pages sont partagées par l'OS
+        entre les workers. Aucun objet implicit n'est désérialisé (als_model
+        reste None), le scoring se fait directement sur les facteurs.
+        
+        Args:
+            bundle_dir: Dossier contenant manifest.json et les fichiers .npy
+            mmap: Ouvrir les arrays en memory-mapping (sinon lecture complète)
+        """
+        bundle_dir = Path(bundle_dir)
+        with open(bundle_dir / BUNDLE_MANIFEST, 'r') as f:
+            manifest = json.load(f)
+        
+        if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Format de bundle non supporté: {manifest.get('format_version')} "
+                             f"(max {BUNDLE_FORMAT_VERSION})")
+        
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(bundle_dir / info['file'], mmap_mode=mmap_mode, allow_pickle=False)
+            for name, info in manifest['arrays'].items()
+        }
+        
+        self.manifest = manifest
+        self.als_model = None
+        self.user_factors = arrays['user_factors']
+        self.item_factors = arrays['item_factors']
+        self.exact_user_factors = None
+        self.exact_item_factors = None
+        if manifest.get('factor_dtype', 'float32') != 'float32':
+            # Facteurs quantifiés pour le scoring, float32 (si présents) pour le re-ranking
+            self.user_factors = QuantizedFactors(self.user_factors, arrays.get('user_factor_scales'))
+            self.item_factors = QuantizedFactors(self.item_factors, arrays.get('item_factor_scales'))
+            self.exact_user_factors = arrays.get('user_factors_exact')
+            self.exact_item_factors = arrays.get('item_factors_exact')
+        self.csr_train = csr_matrix(
+            (arrays['csr_data'], arrays['csr_indices'], arrays['csr_indptr']),
+            shape=(manifest['n_users'], manifest['n_items']),
+            copy=False
+        )
+        self.popularity_recommendations = manifest['popularity_recommendations']
+        self._init_mappings(arrays)
+        # Empreinte calculée à l'écriture sur les facteurs float32 (indépendante de la quantification)
+        self.model_version = manifest['model_version']
+        self._init_topk_table({
+            'topk_table': arrays.get('topk_table'),
+            'topk_fingerprint': manifest.get('topk_fingerprint')
+        })
+        self.ann_index = IVFIndex.from_arrays(arrays)
+        self._init_content(ContentIndex.from_arrays(arrays))
+        als_params = manifest.get('als_params', {})
+        self._init_gram_matrix(als_params.get('regularization', 0.01), als_params.get('alpha', 1.0),
+                               arrays.get('item_gram'))
+    
+    def _init_mappings(self, metadata: dict):
+        """
+        Construit les correspondances ID -> index depuis les arrays d'IDs triés
+        
+        Les anciens metadata (dicts et listes de scalaires numpy) restent lisibles :
+        seuls unique_users et unique_items sont utilisés.
+        """
+        self.user_to_idx = IdMapping(metadata['unique_users'])
+        self.item_to_idx = IdMapping(metadata['unique_items'])
+        self.unique_users = self.user_to_idx.ids
+        self.unique_items = self.item_to_idx.ids
+    
+    def _init_factors(self):
+        """Extrait les facteurs ALS en arrays numpy pour le scoring vectorisé"""
+        def to_numpy(factors):
+            # Les modèles GPU d'implicit exposent to_numpy()
+            if hasattr(factors, 'to_numpy'):
+                factors = factors.to_numpy()
+            return np.ascontiguousarray(factors, dtype=np.float32)
+        
+        self.user_factors = to_numpy(self.als_model.user_factors)
+        self.item_factors = to_numpy(self.als_model.item_factors)
+        self.model_version = model_fingerprint(self.user_factors, self.item_factors)
+        self._init_gram_matrix(getattr(self.als_model, 'regularization', 0.01),
+                               getattr(self.als_model, 'alpha', 1.0))
+    
+    def _init_gram_matrix(self, regularization: float, alpha: float, item_gram=None, block_size: int = 65536):
+        """
+        Précalcule YtY + λI sur les facteurs articles, pour le fold-in des
+        utilisateurs anonymes
+        
+        YtY est lu dans le bundle (item_gram) s'il y figure ; sinon il est
+        calculé par blocs d'articles, sans déquantifier toute la matrice.
+        """
+        self.regularization = float(regularization)
+        self.alpha = float(alpha)
+        if item_gram is None:
+            _, item_factors = self._rerank_factors()
+            item_gram = np.zeros((item_factors.shape[1], item_factors.shape[1]))
+            for start in range(0, len(item_factors), block_size):
+                block = np.asarray(item_factors[start:start + block_size], dtype=np.float64)
+                item_gram += block.T @ block
+        item_gram = np.asarray(item_gram, dtype=np.float64)
+        self.gram_matrix = item_gram + self.regularization * np.eye(item_gram.shape[0])
+    
+    def _init_content(self, content_index: Optional[ContentIndex]):
+        """Active le mode content-based et relie les articles ALS aux lignes d'embeddings"""
+        self.content_index = content_index
+        self.item_content_rows = None
+        self.content_rows = None
+        if content_index is not None:
+            self.content_rows = IdMapping(content_index.article_ids)
+            self.item_content_rows = self.content_rows.lookup(self.unique_items)
+    
+    def _check_mode(self, mode: str):
+        """Vérifie qu'un mode de recommandation est connu et disponible"""
+        if mode not in RECOMMENDATION_MODES:
+            raise ValueError(f"Mode de recommandation inconnu: {mode} (attendu: {', '.join(RECOMMENDATION_MODES)})")
+        if mode == 'content' and self.content_index is None:
+            raise ValueError("Mode 'content' indisponible : le bundle ne contient pas d'index content-based")
+    
+    def _recommend_content(self, user_idx: int, n_reco: int) -> List[int]:
+        """
+        Recommandations content-based d'un utilisateur connu
+        
+        Les articles lus (pondérés par le nombre de clics) sont étendus en
+        candidats via le graphe de voisinage précalculé, sans scan du catalogue.
+        """
+        start, end = self.csr_train.indptr[user_idx], self.csr_train.indptr[user_idx + 1]
+        rows = self.item_content_rows[self.csr_train.indices[start:end]]
+        return self._recommend_content_rows(rows, self.csr_train.data[start:end], n_reco)
+    
+    def _recommend_content_rows(self, rows, weights, n_reco: int) -> List[int]:
+        """Top-N content-based à partir de lignes d'embeddings lues (-1 = sans embedding)"""
+        has_embedding = rows >= 0
+        candidates, scores = self.content_index.score_candidates(rows[has_embedding], weights[has_embedding])
+        top_rows, _ = top_n_candidates(candidates, scores, n_reco)
+        return self.content_index.article_ids[top_rows[top_rows >= 0]].tolist()
+    
+    def _init_topk_table(self, metadata: dict):
+        """Active la table top-K si elle a été calculée pour le modèle chargé"""
+        self.topk_table = None
+        topk_table = metadata.get('topk_table')
+        if topk_table is None:
+            return
+        
+        if metadata.get('topk_fingerprint') != self.model_version:
+            print("Warning: Table top-K périmée (autre modèle), scoring ALS à la volée")
+            return
+        
+        self.topk_table = topk_table
+    
+    def _stage(self, stage: str):
+        """Chronomètre une étape (lookup, scoring, conversion) si un registre est attaché"""
+        return _NO_TIMER if self.metrics is None else self.metrics.timer(stage)
+    
+    def _count(self, name: str, value: int = 1):
+        if self.metrics is not None and value:
+            self.metrics.increment(name, value)
+    
+    def _topk_rows(self, user_indices, n_reco: int):
+        """Lignes de la table top-K, ou None si elle ne peut pas servir la requête"""
+        if not self.use_topk_table or self.topk_table is None or n_reco > self.topk_table.shape[1]:
+            return None
+        return self.topk_table[user_indices, :n_reco]
+    
+    def recommend(self, user_id: int, n_reco: int = 5, mode: str = 'als') -> List[int]:
         """
         Fonction pure de recommandation
         
         Args:
             user_id: ID de l'utilisateur
             n_reco: Nombre de recommandations (défaut: 5)
+            mode: 'als' (filtrage collaboratif) ou 'content' (embeddings d'articles)
         
         Returns:
             Liste de article_id recommandés
         """
-        if self.als_model is None:
+        if self.item_factors is None:
             raise ValueError("Le modèle n'a pas été chargé. Appelez load_artifacts() d'abord.")
+        self._check_mode(mode)
         
-        # Si l'utilisateur n'est pas dans le train, retourner popularité
-        if user_id not in self.user_to_idx:
+        # Index de l'utilisateur (None s'il n'est pas dans le train : popularité)
+        with self._stage('lookup'):
+            user_idx = self.user_to_idx.get(user_id)
+        if user_idx is None:
+            self._count('popularity_fallback')
             return self.popularity_recommendations[:n_reco]
         
-        # Obtenir l'index de l'utilisateur et son vecteur
-        user_idx = self.user_to_idx[user_id]
+        # Utilisateur mis à jour depuis l'entraînement : ligne et facteur de la surcouche
+        if self.overlay is not None and user_idx in self.overlay:
+            with self._stage('scoring'):
+                return self._recommend_overlay(user_idx, n_reco, mode)
+        
+        if mode == 'content':
+            with self._stage('scoring'):
+                recommended_item_ids = self._recommend_content(user_idx, n_reco)
+            self._pad_with_popularity(recommended_item_ids, n_reco)
+            return recommended_item_ids
+        
+        # Table top-K précalculée : simple lecture, pas de scoring ALS
+        with self._stage('scoring'):
+            topk_row = self._topk_rows(user_idx, n_reco)
+        if topk_row is not None:
+            with self._stage('conversion'):
+                recommended_item_ids = self.unique_items[topk_row[topk_row >= 0]].tolist()
+            self._pad_with_popularity(recommended_item_ids, n_reco)
+            return recommended_item_ids
+        
+        # Vecteur d'interactions de l'utilisateur
         user_vector = self.csr_train[user_idx]
         
         # Obtenir les recommandations
-        recommendations = self.als_model.recommend(
-            user_idx, 
-            user_vector, 
-            N=n_reco, 
-            filter_already_liked_items=True
-        )
+        with self._stage('scoring'):
+            if self.als_model is None or self._ann_enabled():
+                # Bundle memory-mappé ou index approximatif : scoring numpy direct sur les facteurs
+                item_indices, _ = self.score_users([user_idx], n_reco)
+                recommendations = item_indices[0][item_indices[0] >= 0]
+            else:
+                recommendations = self.als_model.recommend(
+                    user_idx, 
+                    user_vector, 
+                    N=n_reco, 
+                    filter_already_liked_items=True
+                )
         
         # Convertir les indices d'articles en article_id
-        try:
-            if isinstance(recommendations, np.ndarray):
-                if recommendations.ndim == 2 and recommendations.shape[1] == 2:
-                    # Array de shape (n, 2) : colonne 0 = item_idx, colonne 1 = score
-                    recommended_item_ids = [self.unique_items[int(item_idx)] for item_idx in recommendations[:, 0]]
-                elif recommendations.ndim == 1:
-                    # Array 1D : ce sont directement les indices
-                    recommended_item_ids = [self.unique_items[int(item_idx)] for item_idx in recommendations]
-                else:
-                    raise ValueError(f"Format d'array non reconnu: shape {recommendations.shape}")
-            elif isinstance(recommendations, (list, tuple)):
-                if len(recommendations) > 0:
-                    first_rec = recommendations[0]
-                    if isinstance(first_rec, (tuple, list, np.ndarray)) and len(first_rec) >= 2:
-                        recommended_item_ids = [self.unique_items[int(rec[0])] for rec in recommendations]
-                    elif isinstance(first_rec, (int, np.integer)):
-                        recommended_item_ids = [self.unique_items[int(rec)] for rec in recommendations]
+        with self._stage('conversion'):
+            try:
+                if (isinstance(recommendations, tuple) and len(recommendations) == 2
+                        and isinstance(recommendations[0], np.ndarray) and recommendations[0].ndim == 1):
+                    # implicit >= 0.5 : tuple (item_indices, scores)
+                    item_indices = recommendations[0]
+                elif isinstance(recommendations, np.ndarray):
+                    if recommendations.ndim == 2 and recommendations.shape[1] == 2:
+                        # Array de shape (n, 2) : colonne 0 = item_idx, colonne 1 = score
+                        item_indices = recommendations[:, 0]
+                    elif recommendations.ndim == 1:
+                        # Array 1D : ce sont directement les indices
+                        item_indices = recommendations
                     else:
-                        raise ValueError(f"Format de liste non reconnu: {type(first_rec)}")
+                        raise ValueError(f"Format d'array non reconnu: shape {recommendations.shape}")
+                elif isinstance(recommendations, (list, tuple)):
+                    if len(recommendations) > 0:
+                        first_rec = recommendations[0]
+                        if isinstance(first_rec, (tuple, list, np.ndarray)) and len(first_rec) >= 2:
+                            item_indices = [rec[0] for rec in recommendations]
+                        elif isinstance(first_rec, (int, np.integer)):
+                            item_indices = recommendations
+                        else:
+                            raise ValueError(f"Format de liste non reconnu: {type(first_rec)}")
+                    else:
+                        item_indices = []
                 else:
-                    recommended_item_ids = []
-            else:
-                raise ValueError(f"Type de retour non reconnu: {type(recommendations)}")
-        except Exception as e:
-            # En cas d'erreur, utiliser popularité
-            print(f"Warning: Erreur lors du parsing des recommandations ALS: {e}")
-            recommended_item_ids = self.popularity_recommendations[:n_reco]
+                    raise ValueError(f"Type de retour non reconnu: {type(recommendations)}")
+                
+                # Une seule indexation vectorisée item_idx -> article_id
+                recommended_item_ids = self.unique_items[np.asarray(item_indices, dtype=np.int64)].tolist()
+            except Exception as e:
+                # En cas d'erreur, utiliser popularité
+                print(f"Warning: Erreur lors du parsing des recommandations ALS: {e}")
+                self._count('parse_error_fallback')
+                recommended_item_ids = self.popularity_recommendations[:n_reco]
         
         # S'assurer d'avoir exactement n_reco recommandations
-        if len(recommended_item_ids) < n_reco:
-            recommended_item_ids.extend(self.popularity_recommendations[:n_reco - len(recommended_item_ids)])
+        self._pad_with_popularity(recommended_item_ids, n_reco)
         
         return recommended_item_ids[:n_reco]
+    
+    def _pad_with_popularity(self, recommended_item_ids: List[int], n_reco: int) -> List[int]:
+        """Complète la liste jusqu'à n_reco avec les articles populaires qu'elle ne contient pas déjà"""
+        if len(recommended_item_ids) < n_reco:
+            present = set(recommended_item_ids)
+            for item_id in self.popularity_recommendations:
+                if len(recommended_item_ids) >= n_reco:
+                    break
+                if item_id not in present:
+                    recommended_item_ids.append(item_id)
+                    present.add(item_id)
+        return recommended_item_ids
+    
+    def _ann_enabled(self) -> bool:
+        return self.ann_index is not None and self.ann_n_probe > 0
+    
+    def _rerank_factors(self):
+        """Facteurs utilisés pour re-scorer les candidats (float32 exacts si disponibles)"""
+        if self.exact_item_factors is not None and self.exact_user_factors is not None:
+            return self.exact_user_factors, self.exact_item_factors
+        return self.user_factors, self.item_factors
+    
+    def _score_user_ann(self, user_idx: int, n_reco: int):
+        """Top-N d'un utilisateur : candidats de l'index IVF puis re-ranking exact"""
+        # Articles déjà vus masqués ; l'index parcourt des listes supplémentaires
+        # tant qu'il reste moins de rerank_factor * n_reco candidats
+        liked = self.csr_train.indices[self.csr_train.indptr[user_idx]:self.csr_train.indptr[user_idx + 1]]
+        candidates = self.ann_index.search(self.user_factors[user_idx], self.ann_n_probe,
+                                           min_candidates=n_reco * max(1, self.rerank_factor), exclude=liked)
+        
+        rerank_users, rerank_items = self._rerank_factors()
+        return top_n_candidates(candidates, rerank_items[candidates] @ rerank_users[user_idx], n_reco)
+    
+    def _score_users_quantized(self, user_indices, n_reco: int, block_size: int):
+        """
+        Top-N avec facteurs quantifiés : sur-sélection de rerank_factor * n_reco
+        candidats par scores approchés, puis re-ranking exact en float32
+        
+        Sans facteurs float32 dans le bundle, les scores calculés sur les
+        valeurs déquantifiées sont déjà définitifs : pas de sur-sélection.
+        """
+        if self.exact_item_factors is None or self.exact_user_factors is None:
+            return top_n_items(self.user_factors, self.item_factors, self.csr_train, user_indices, n_reco, block_size)
+        
+        candidates, scores = top_n_items(
+            self.user_factors, self.item_factors, self.csr_train, user_indices,
+            n_reco * max(1, self.rerank_factor), block_size
+        )
+        
+        user_vectors = self.exact_user_factors[np.asarray(user_indices, dtype=np.int64)]
+        exact_scores = np.einsum(
+            'ucf,uf->uc', self.exact_item_factors[np.maximum(candidates, 0)], user_vectors
+        ).astype(np.float32)
+        exact_scores[candidates < 0] = -np.inf
+        
+        order = np.argsort(-exact_scores, axis=1, kind='stable')[:, :n_reco]
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(exact_scores, order, axis=1)
+    
+    def score_users(self, user_indices, n_reco: int = 5, block_size: int = 256, exact: bool = False):
+        """
+        Calcule le top-N filtré pour un ensemble d'utilisateurs connus
+        
+        Voir top_n_items(). Si le bundle contient un index approximatif (et que
+        exact=False), les candidats viennent de l'index IVF et sont re-scorés exactement.
+        Avec des facteurs quantifiés, le scoring complet se fait en précision réduite
+        et seuls les meilleurs candidats sont re-scorés en float32.
+        
+        Returns:
+            Tuple (item_indices, scores) de shape (n_users, n_reco)
+        """
+        if self.item_factors is None:
+            raise ValueError("Le modèle n'a pas été chargé. Appelez load_artifacts() d'abord.")
+        
+        if exact and self.exact_item_factors is not None and self.exact_user_factors is not None:
+            return top_n_items(self.exact_user_factors, self.exact_item_factors, self.csr_train,
+                               user_indices, n_reco, block_size)
+        
+        if exact or not self._ann_enabled():
+            if isinstance(self.item_factors, QuantizedFactors):
+                return self._score_users_quantized(user_indices, n_reco, block_size)
+            return top_n_items(self.user_factors, self.item_factors, self.csr_train, user_indices, n_reco, block_size)
+        
+        user_indices = np.asarray(user_indices, dtype=np.int64)
+        item_indices = np.full((len(user_indices), n_reco), -1, dtype=np.int64)
+        scores = np.full((len(user_indices), n_reco), -np.inf, dtype=np.float32)
+        for row, user_idx in enumerate(user_indices):
+            item_indices[row], scores[row] = self._score_user_ann(user_idx, n_reco)
+        return item_indices, scores
+    
+    def solve_user_factors(self, item_indices, counts=None) -> np.ndarray:
+        """
+        Facteur d'un utilisateur absent du modèle (fold-in ALS)
+        
+        Résout (YtY + Yt(C - I)Y + λI) x = Yt C p sur les seuls articles lus,
+        avec la confiance C = alpha * clics comme à l'entraînement. YtY + λI est
+        précalculé au chargement : le coût est celui d'un système factors x factors.
+        
+        Args:
+            item_indices: Indices des articles lus (item_idx)
+            counts: Nombre de clics par article (défaut: 1)
+        
+        Returns:
+            Vecteur utilisateur float32 (factors,)
+        """
+        item_indices = np.asarray(item_indices, dtype=np.int64)
+        counts = np.ones(len(item_indices)) if counts is None else np.asarray(counts, dtype=np.float64)
+        _, item_factors = self._rerank_factors()
+        
+        read_factors = np.asarray(item_factors[item_indices], dtype=np.float64)
+        confidence = self.alpha * counts
+        a = self.gram_matrix + read_factors.T @ ((confidence - 1)[:, None] * read_factors)
+        b = confidence @ read_factors
+        return np.linalg.solve(a, b).astype(np.float32)
+    
+    def _score_vector(self, user_vector, exclude, n_reco: int):
+        """Top-N articles pour un vecteur utilisateur hors modèle (articles exclude masqués)"""
+        _, rerank_items = self._rerank_factors()
+        if self._ann_enabled():
+            candidates = self.ann_index.search(user_vector, self.ann_n_probe,
+                                               min_candidates=n_reco * max(1, self.rerank_factor), exclude=exclude)
+        else:
+            scores = score_matrix(user_vector[None, :], self.item_factors)[0]
+            scores[exclude] = -np.inf
+            n_candidates = n_reco * max(1, self.rerank_factor) if rerank_items is not self.item_factors else n_reco
+            candidates, _ = top_n_candidates(np.arange(len(scores)), scores, min(n_candidates, len(scores)))
+            candidates = candidates[candidates >= 0]
+        return top_n_candidates(candidates, rerank_items[candidates] @ user_vector, n_reco)
+    
+    def enable_overlay(self, log_path: Optional[str] = None) -> int:
+        """
+        Active la surcouche des utilisateurs mis à jour (voir add_events)
+        
+        Args:
+            log_path: Journal des événements, rejoué ici puis partagé avec les
+                autres workers (None = surcouche en mémoire uniquement)
+        
+        Returns:
+            Nombre d'utilisateurs restaurés depuis le journal
+        """
+        self.overlay = UserOverlay(self.model_version, log_path)
+        self.overlay.open_log()
+        return self.sync_overlay()
+    
+    def add_events(self, events) -> int:
+        """
+        Ajoute de nouveaux clics d'utilisateurs connus, sans ré-entraînement
+        
+        Chaque événement (user_id, article_id, count) est ajouté à la ligne de
+        l'utilisateur, puis son facteur ALS est recalculé seul (fold-in, comme
+        recalculate_user d'implicit). Les utilisateurs ou articles absents du
+        modèle sont ignorés.
+        
+        Args:
+            events: Séquence de tuples (user_id, article_id, count)
+        
+        Returns:
+            Nombre d'utilisateurs mis à jour
+        
+        Raises:
+            ValueError: Événement invalide (voir validate_event) ; aucun
+                événement du lot n'est alors appliqué ni journalisé
+        """
+        if self.overlay is None:
+            self.enable_overlay()
+        events = [validate_event(*event) for event in events]
+        if self.overlay.log_path is None:
+            with self.overlay.lock:
+                return self._apply_events(events)
+        # Le journal est la source de vérité : chaque événement est appliqué une
+        # seule fois, à sa relecture (y compris par le worker qui l'a écrit)
+        self.overlay.append(events)
+        return self.sync_overlay()
+    
+    def sync_overlay(self) -> int:
+        """Applique les événements ajoutés au journal par les autres workers"""
+        if self.overlay is None:
+            return 0
+        with self.overlay.lock:
+            return self._apply_events(self.overlay.read_new_events())
+    
+    def _apply_events(self, events) -> int:
+        """Fusionne les événements dans les lignes des utilisateurs et recalcule leurs facteurs"""
+        # Lignes du journal invalides (écrites à la main ou par une version antérieure) ignorées
+        events = [event for event in events if _is_valid_event(event)]
+        if not events:
+            return 0
+        user_ids, article_ids, counts = (np.asarray(column) for column in zip(*events))
+        user_indices = self.user_to_idx.lookup(user_ids.astype(np.int64))
+        item_indices = self.item_to_idx.lookup(article_ids.astype(np.int64))
+        valid = (user_indices >= 0) & (item_indices >= 0)
+        user_indices, item_indices, counts = user_indices[valid], item_indices[valid], counts[valid]
+        
+        updated_users = np.unique(user_indices)
+        for user_idx in updated_users:
+            entry = self.overlay.get(user_idx)
+            if entry is None:
+                start, end = self.csr_train.indptr[user_idx], self.csr_train.indptr[user_idx + 1]
+                row_items, row_counts = self.csr_train.indices[start:end], self.csr_train.data[start:end]
+            else:
+                row_items, row_counts = entry[0], entry[1]
+            
+            is_user = user_indices == user_idx
+            row_items, inverse = np.unique(
+                np.concatenate([row_items, item_indices[is_user]]).astype(np.int64), return_inverse=True
+            )
+            row_counts = np.bincount(
+                inverse.ravel(), weights=np.concatenate([row_counts, counts[is_user]]), minlength=len(row_items)
+            ).astype(np.float32)
+            self.overlay.update(user_idx, row_items, row_counts, self.solve_user_factors(row_items, row_counts))
+        
+        return len(updated_users)
+    
+    def user_revision(self, user_id: int) -> int:
+        """Nombre de mises à jour d'un utilisateur depuis le chargement (clé de cache)"""
+        if self.overlay is None or len(self.overlay) == 0:
+            return 0
+        user_idx = self.user_to_idx.get(user_id)
+        return 0 if user_idx is None else self.overlay.revision(user_idx)
+    
+    def _recommend_overlay(self, user_idx: int, n_reco: int, mode: str) -> List[int]:
+        """Recommandations d'un utilisateur de la surcouche (ligne et facteur à jour)"""
+        row_items, row_counts, factor = self.overlay.get(user_idx)
+        if mode == 'content':
+            recommended_item_ids = self._recommend_content_rows(self.item_content_rows[row_items], row_counts, n_reco)
+        else:
+            top_items, _ = self._score_vector(factor, row_items, n_reco)
+            recommended_item_ids = self.unique_items[top_items[top_items >= 0]].tolist()
+        
+        self._pad_with_popularity(recommended_item_ids, n_reco)
+        return recommended_item_ids
+    
+    def recommend_from_articles(self, article_ids, n_reco: int = 5, mode: str = 'als') -> List[int]:
+        """
+        Recommandations pour un utilisateur anonyme à partir des articles lus
+        
+        Le modèle stocké n'est pas modifié : en mode 'als', un facteur utilisateur
+        est calculé à la volée (solve_user_factors) ; en mode 'content', les
+        lectures sont étendues via le graphe de voisinage.
+        
+        Args:
+            article_ids: article_id lus pendant la session (répétitions = plusieurs clics)
+            n_reco: Nombre de recommandations (défaut: 5)
+            mode: 'als' (filtrage collaboratif) ou 'content' (embeddings d'articles)
+        
+        Returns:
+            Liste de article_id recommandés (popularité si aucun article n'est connu)
+        """
+        if self.item_factors is None:
+            raise ValueError("Le modèle n'a pas été chargé. Appelez load_artifacts() d'abord.")
+        self._check_mode(mode)
+        
+        # Seuls les IDs entiers comptent (1475.9 ou "1475" sont ignorés, comme dans recommend)
+        article_ids, valid = integer_ids(article_ids)
+        article_ids, counts = np.unique(article_ids[valid], return_counts=True)
+        recommended_item_ids = []
+        if mode == 'content':
+            with self._stage('lookup'):
+                rows = self.content_rows.lookup(article_ids)
+            if (rows >= 0).any():
+                with self._stage('scoring'):
+                    recommended_item_ids = self._recommend_content_rows(rows, counts.astype(np.float32), n_reco)
+        else:
+            with self._stage('lookup'):
+                item_indices = self.item_to_idx.lookup(article_ids)
+                known = item_indices >= 0
+            if known.any():
+                with self._stage('scoring'):
+                    user_vector = self.solve_user_factors(item_indices[known], counts[known])
+                    top_items, _ = self._score_vector(user_vector, item_indices[known], n_reco)
+                with self._stage('conversion'):
+                    recommended_item_ids = self.unique_items[top_items[top_items >= 0]].tolist()
+        
+        self._pad_with_popularity(recommended_item_ids, n_reco)
+        return recommended_item_ids
+    
+    def recommend_many(self, user_ids, n_reco: int = 5, block_size: int = 256,
+                       mode: str = 'als') -> List[List[int]]:
+        """
+        Recommandations vectorisées pour plusieurs utilisateurs en un seul appel
+        
+        Les utilisateurs inconnus reçoivent le fallback popularité, comme recommend().
+        
+        Args:
+            user_ids: Séquence d'ID utilisateurs
+            n_reco: Nombre de recommandations par utilisateur (défaut: 5)
+            block_size: Nombre d'utilisateurs scorés par produit matriciel
+            mode: 'als' (filtrage collaboratif) ou 'content' (embeddings d'articles)
+        
+        Returns:
+            Liste (dans l'ordre de user_ids) de listes de article_id recommandés
+        """
+        if self.item_factors is None:
+            raise ValueError("Le modèle n'a pas été chargé. Appelez load_artifacts() d'abord.")
+        self._check_mode(mode)
+        
+        with self._stage('lookup'):
+            user_indices = self.user_to_idx.lookup(user_ids)
+            known = np.flatnonzero(user_indices >= 0)
+        self._count('popularity_fallback', len(user_indices) - len(known))
+        # Une liste par ligne : modifier une ligne ne doit toucher ni les autres ni le fallback
+        popularity = list(self.popularity_recommendations[:n_reco])
+        results = [list(popularity) for _ in range(len(user_indices))]
+        
+        # Utilisateurs mis à jour depuis l'entraînement : servis depuis la surcouche
+        if self.overlay is not None and len(self.overlay):
+            in_overlay = np.array([int(user_indices[pos]) in self.overlay for pos in known], dtype=bool)
+            with self._stage('scoring'):
+                for pos in known[in_overlay]:
+                    results[pos] = self._recommend_overlay(int(user_indices[pos]), n_reco, mode)
+            known = known[~in_overlay]
+        
+        if mode == 'content':
+            with self._stage('scoring'):
+                for pos in known:
+                    recommended_item_ids = self._recommend_content(int(user_indices[pos]), n_reco)
+                    self._pad_with_popularity(recommended_item_ids, n_reco)
+                    results[pos] = recommended_item_ids
+            return results
+        
+        with self._stage('scoring'):
+            item_indices = self._topk_rows(user_indices[known], n_reco)
+            if item_indices is None:
+                item_indices, _ = self.score_users(user_indices[known], n_reco, block_size)
+        with self._stage('conversion'):
+            for pos, row in zip(known, item_indices):
+                recommended_item_ids = self.unique_items[row[row >= 0]].tolist()
+                self._pad_with_popularity(recommended_item_ids, n_reco)
+                results[pos] = recommended_item_ids
+        
+        return results
 
 
 # Fonction pure pour faciliter l'utilisation
-def recommend(user_id: int, artifacts_path: str = "artifacts.pkl", n_reco: int = 5) -> List[int]:
+def recommend(user_id: int, artifacts_path: str = "artifacts", n_reco: int = 5, mode: str = 'als') -> List[int]:
     """
     Fonction pure de recommandation (interface simplifiée)
     
     Args:
         user_id: ID de l'utilisateur
-        artifacts_path: Chemin vers le fichier artifacts.pkl
+        artifacts_path: Chemin vers le bundle d'artefacts (ou un fichier artifacts.pkl)
         n_reco: Nombre de recommandations (défaut: 5)
+        mode: 'als' (filtrage collaboratif) ou 'content' (embeddings d'articles)
     
     Returns:
         Liste de article_id recommandés
     """
     recommender = Recommender(artifacts_path)
-    return recommender.recommend(user_id, n_reco)
+    return recommender.recommend(user_id, n_reco, mode)
 
 
 if __name__ == "__main__":
@@ -152,7 +1165,7 @@ if __name__ == "__main__":
     print("Test de la fonction recommend()...")
     
     # Créer un recommandeur
-    recommender = Recommender("artifacts.pkl")
+    recommender = Recommender("artifacts")
     
     # Tester avec quelques utilisateurs
     test_user_ids = [0, 1, 2, 999999]  # Le dernier n'existe pas (test fallback)
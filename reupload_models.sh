@@ -1,5 +1,5 @@
 #!/bin/bash
-# Script pour ré-uploader les fichiers pickle en mode binaire
+# Script pour ré-uploader le bundle d'artefacts (artifacts/*.npy + manifest.json)
 
 set -e
 
@@ -46,31 +46,32 @@ if [ -z "$STORAGE_ACCOUNT" ] || [ -z "$RESOURCE_GROUP" ]; then
     exit 1
 fi
 
-print_header "RÉ-UPLOAD DES FICHIERS PICKLE EN MODE BINAIRE"
+print_header "RÉ-UPLOAD DU BUNDLE D'ARTEFACTS"
 
 print_info "Storage Account: $STORAGE_ACCOUNT"
 print_info "Resource Group: $RESOURCE_GROUP"
-print_info "Conteneur: models"
+print_info "Conteneur: models (préfixe artifacts/)"
 echo
 
-# Vérifier que les fichiers existent
-FILES="als_model.pkl metadata.pkl csr_train.pkl"
-MISSING_FILES=""
-
-for file in $FILES; do
-    if [ ! -f "$file" ]; then
-        MISSING_FILES="$MISSING_FILES $file"
-    fi
-done
-
-if [ -n "$MISSING_FILES" ]; then
-    print_error "Fichiers manquants:"
-    for file in $MISSING_FILES; do
-        echo "  - $file"
-    done
+# Vérifier que le bundle existe
+if [ ! -f "artifacts/manifest.json" ]; then
+    print_error "Bundle manquant: artifacts/manifest.json"
+    echo "Exécutez d'abord: python serialize_artifacts.py"
     exit 1
 fi
 
+# Les .npy sont uploadés sous un préfixe propre au bundle (jamais réécrits en
+# place) ; le manifest, qui pointe vers ce préfixe, est remplacé en dernier :
+# son ETag identifie la version et un worker ne voit jamais un bundle partiel
+BUNDLE_ID=$(sha256sum artifacts/manifest.json | cut -c1-16)
+BUNDLE_PREFIX="bundles/$BUNDLE_ID"
+PUBLISHED_MANIFEST=$(mktemp)
+trap 'rm -f "$PUBLISHED_MANIFEST"' EXIT
+python3 -c 'import json, sys; m = json.load(open(sys.argv[1])); m["files_prefix"] = sys.argv[2]; json.dump(m, open(sys.argv[3], "w"), indent=2)' \
+    artifacts/manifest.json "$BUNDLE_PREFIX" "$PUBLISHED_MANIFEST"
+print_info "Bundle $BUNDLE_ID (préfixe artifacts/$BUNDLE_PREFIX/)"
+echo
+
 # Récupérer la clé de stockage
 print_info "Récupération de la clé de stockage..."
 STORAGE_KEY=$(az storage account keys list \
@@ -87,8 +88,8 @@ fi
 print_success "Clé de stockage récupérée"
 echo
 
-# Uploader chaque fichier en mode binaire
-for file in $FILES; do
+# Uploader chaque fichier en mode binaire, sous le préfixe du bundle
+for file in artifacts/*.npy; do
     print_info "Upload de $file..."
     
     # Obtenir la taille du fichier
@@ -97,7 +98,7 @@ for file in $FILES; do
     
     if az storage blob upload \
         --container-name "models" \
-        --name "$file" \
+        --name "artifacts/$BUNDLE_PREFIX/$(basename "$file")" \
         --file "$file" \
         --account-name "$STORAGE_ACCOUNT" \
         --account-key "$STORAGE_KEY" \
@@ -105,14 +106,31 @@ for file in $FILES; do
         --overwrite 2>&1; then
         print_success "$file uploadé avec succès"
     else
-        print_error "Erreur lors de l'upload de $file"
+        print_error "Erreur lors de l'upload de $file (manifest inchangé, l'ancien bundle reste servi)"
         exit 1
     fi
     echo
 done
 
+# Publier le manifest en dernier : les workers basculent sur le nouveau bundle
+print_info "Publication de artifacts/manifest.json..."
+if az storage blob upload \
+    --container-name "models" \
+    --name "artifacts/manifest.json" \
+    --file "$PUBLISHED_MANIFEST" \
+    --account-name "$STORAGE_ACCOUNT" \
+    --account-key "$STORAGE_KEY" \
+    --content-type "application/json" \
+    --overwrite 2>&1; then
+    print_success "Manifest publié"
+else
+    print_error "Erreur lors de la publication du manifest"
+    exit 1
+fi
+echo
+
 print_header "RÉ-UPLOAD TERMINÉ"
-print_success "Tous les fichiers ont été ré-uploadés en mode binaire!"
+print_success "Tous les fichiers du bundle ont été ré-uploadés!"
 echo
 print_info "Prochaines étapes:"
 echo "  1. Redémarrer la Function App:"
@@ -121,4 +139,7 @@ echo
 echo "  2. Tester la fonction:"
 echo "     python3 test_and_analyze.py 0"
 echo
+echo "  3. Une fois les workers rechargés, supprimer les anciens préfixes artifacts/bundles/"
+echo "     (sauf artifacts/$BUNDLE_PREFIX/)"
+echo
 
@@ -3,26 +3,42 @@ Script de sérialisation des artefacts pour le système de recommandation
 À exécuter après l'entraînement du modèle dans le notebook
 """
 
+import argparse
 import pickle
 import numpy as np
 from pathlib import Path
 import pandas as pd
 from scipy.sparse import csr_matrix
 from implicit.als import AlternatingLeastSquares
-from sklearn.model_selection import train_test_split
+from ann_index import IVFIndex
+from evaluation import evaluate_model, relevance_matrix, unseen_interactions
+from content_index import ContentIndex
+from ingest_clicks import load_interactions
+from columnar_cache import load_articles_metadata, load_clicks
+from split_interactions import SPLIT_STRATEGIES, split_interactions
+from recommender import FACTOR_DTYPES, IdMapping, compute_topk_table, model_fingerprint, top_n_items, write_bundle
+
+# Articles du fallback popularité : au moins MAX_N_RECO (défaut 100 dans RecommendArticle)
+POPULARITY_SIZE = 100
+
+def load_articles():
+    """Charge les métadonnées des articles (via le cache en colonnes, voir columnar_cache.py)"""
+    articles = load_articles_metadata('articles_metadata.csv')
+    articles.drop(columns=['publisher_id'], inplace=True)
+    return articles.astype(np.int64)
 
 def load_data():
-    """Charge les données nécessaires"""
+    """
+    Charge les données nécessaires (clics bruts complets en mémoire)
+    
+    serialize_artifacts() n'utilise plus que les interactions agrégées, voir
+    ingest_clicks.load_interactions().
+    """
     # Load articles' metadata
-    articles = pd.read_csv('articles_metadata.csv')
-    articles.drop(columns=['publisher_id'], inplace=True)
-    articles = articles.astype(np.int64)
+    articles = load_articles()
 
-    # Load clicks
-    clicks_list = []
-    for file in sorted(Path("clicks/").glob("*.csv")):
-        clicks_list.append(pd.read_csv(file))
-    clicks = pd.concat(clicks_list, ignore_index=True)
+    # Load clicks (cache en colonnes, construit au premier appel)
+    clicks = load_clicks('clicks')
     clicks.rename(columns={'click_article_id':'article_id'}, inplace=True)
     clicks.drop(columns=['click_environment', 'click_deviceGroup', 'click_os', 
                         'click_country', 'click_region', 'click_referrer_type'], inplace=True)
@@ -31,42 +47,72 @@ def load_data():
     return articles, clicks
 
 def create_sparse_matrix(interactions_df):
-    """Crée une matrice sparse CSR (user_id, article_id)"""
-    unique_users = sorted(interactions_df['user_id'].unique())
-    unique_items = sorted(interactions_df['article_id'].unique())
+    """
+    Crée une matrice sparse CSR (user_id, article_id)
     
-    user_to_idx = {uid: idx for idx, uid in enumerate(unique_users)}
-    item_to_idx = {iid: idx for idx, iid in enumerate(unique_items)}
+    Les IDs sont factorisés en une passe vectorisée (codes triés = index de
+    ligne / colonne, en int32) ; les correspondances ID -> index sont des
+    IdMapping adossés aux arrays d'IDs triés unique_users / unique_items.
+    Le résultat est identique à l'ancienne version (dicts + list comprehensions),
+    voir benchmark_sparse_matrix.py.
+    """
+    user_indices, unique_users = pd.factorize(interactions_df['user_id'].values, sort=True)
+    item_indices, unique_items = pd.factorize(interactions_df['article_id'].values, sort=True)
     
-    user_indices = [user_to_idx[uid] for uid in interactions_df['user_id']]
-    item_indices = [item_to_idx[iid] for iid in interactions_df['article_id']]
+    user_to_idx = IdMapping(unique_users)
+    item_to_idx = IdMapping(unique_items)
     values = interactions_df['count'].values.astype(np.float32)
     
-    csr_matrix_train = csr_matrix((values, (user_indices, item_indices)), 
-                                   shape=(len(unique_users), len(unique_items)))
+    csr_matrix_train = csr_matrix(
+        (values, (user_indices.astype(np.int32), item_indices.astype(np.int32))),
+        shape=(len(unique_users), len(unique_items))
+    )
     
-    return csr_matrix_train, user_to_idx, item_to_idx, unique_users, unique_items
+    return csr_matrix_train, user_to_idx, item_to_idx, user_to_idx.ids, item_to_idx.ids
 
-def serialize_artifacts():
-    """Sérialise tous les artefacts nécessaires pour la production"""
+def serialize_artifacts(topk=50, bundle_dir='artifacts', legacy_pickles=False, ann_lists=0,
+                        factor_dtype='float32', keep_exact_factors=False, content_k=20,
+                        embeddings_path='articles_embeddings.pickle', content_embeddings=False,
+                        n_workers=None, split_strategy='random', als_params=None):
+    """
+    Sérialise tous les artefacts nécessaires pour la production
+    
+    Args:
+        topk: Taille de la table top-K précalculée pour les utilisateurs connus
+            (None ou 0 pour ne pas la calculer)
+        bundle_dir: Dossier du bundle d'artefacts (.npy + manifest.json)
+        legacy_pickles: Écrire aussi als_model.pkl, metadata.pkl et csr_train.pkl
+        ann_lists: Nombre de listes de l'index approximatif IVF sur les facteurs
+            articles (0 pour ne pas le construire, None pour ~4 * sqrt(n_articles))
+        factor_dtype: Stockage des facteurs dans le bundle ('float32', 'float16', 'int8')
+        keep_exact_factors: Avec des facteurs quantifiés, garder aussi les facteurs
+            float32 pour le re-ranking exact des candidats (bundle alors plus gros
+            qu'en float32 seul ; désactivé par défaut)
+        content_k: Voisins par article du graphe content-based (0 pour ne pas le construire)
+        embeddings_path: Embeddings d'articles (articles_embeddings_reduced.pickle pour
+            les embeddings réduits par reduce_embeddings_pca.py)
+        content_embeddings: Garder aussi les embeddings normalisés dans le bundle
+            (re-scoring cosinus exact des candidats content-based)
+        n_workers: Processus de lecture des fichiers de clics (défaut: nombre de CPU)
+        split_strategy: Séparation train/test par utilisateur, 'random' ou 'time'
+            (interactions les plus récentes en test)
+        als_params: Hyperparamètres ALS (factors, regularization, iterations, alpha),
+            par exemple la meilleure configuration de sweep_als.py
+    """
     print("=== SÉRIALISATION DES ARTEFACTS ===")
     
     # 1. Charger les données
     print("\n1. Chargement des données...")
-    articles, clicks = load_data()
+    articles = load_articles()
     
-    # 2. Créer les interactions
+    # 2. Créer les interactions (agrégées fichier par fichier, en parallèle)
     print("2. Création des interactions...")
-    interactions = clicks.groupby(['user_id', 'article_id']).size().reset_index(name='count')
+    interactions = load_interactions('clicks', n_workers, with_timestamps=split_strategy == 'time')
+    print(f"   {len(interactions):,} paires (utilisateur, article)")
     
     # 3. Séparer train/test (on utilise seulement le train pour le modèle final)
-    print("3. Séparation train/test...")
-    train_interactions, _ = train_test_split(
-        interactions, 
-        test_size=0.2, 
-        random_state=42,
-        stratify=interactions['user_id']
-    )
+    print(f"3. Séparation train/test par utilisateur ({split_strategy})...")
+    train_interactions, test_interactions = split_interactions(interactions, test_size=0.2, strategy=split_strategy, seed=42)
     
     # 4. Créer la matrice sparse et les mappings
     print("4. Création de la matrice sparse...")
@@ -78,69 +124,181 @@ def serialize_artifacts():
     
     # 5. Entraîner le modèle ALS
     print("\n5. Entraînement du modèle ALS...")
-    als_model = AlternatingLeastSquares(factors=50, iterations=15, random_state=42, num_threads=4)
+    als_params = dict({'factors': 50, 'iterations': 15}, **(als_params or {}))
+    als_model = AlternatingLeastSquares(random_state=42, num_threads=4, **als_params)
     als_model.fit(csr_train)
     print("   ✅ Modèle entraîné")
     
     # 6. Calculer les articles populaires (fallback)
     print("\n6. Calcul des articles populaires (fallback)...")
-    popularity_recommendations = train_interactions.groupby('article_id')['count'].sum().sort_values(ascending=False).head(5).index.tolist()
-    print(f"   Top 5 articles: {popularity_recommendations}")
+    # Assez d'articles pour servir n_reco jusqu'à MAX_N_RECO (et la taille du top-K)
+    n_popular = max(topk or 0, POPULARITY_SIZE)
+    popularity_recommendations = [int(iid) for iid in train_interactions.groupby('article_id')['count'].sum().sort_values(ascending=False).head(n_popular).index]
+    print(f"   Top 5 articles: {popularity_recommendations[:5]} ({len(popularity_recommendations)} gardés)")
+    
+    # 7. Précalculer le top-K de chaque utilisateur connu (servi par simple lecture)
+    topk_artifacts = {}
+    if topk:
+        print(f"\n7. Précalcul de la table top-{topk}...")
+        topk_table = compute_topk_table(als_model.user_factors, als_model.item_factors, csr_train, k=topk)
+        topk_artifacts = {
+            'topk_table': topk_table,
+            'topk_fingerprint': model_fingerprint(als_model.user_factors, als_model.item_factors)
+        }
+        print(f"   ✅ Table {topk_table.shape} ({topk_table.nbytes / (1024 * 1024):.2f} MB)")
+    
+    # 8. Évaluer le modèle sur le split de test (MAP@5 enregistrée dans le manifest)
+    print("\n8. Évaluation sur le split de test...")
+    relevance = relevance_matrix(test_interactions, user_to_idx, item_to_idx, csr_train.shape[1])
+    test_users = np.flatnonzero(np.diff(relevance.indptr))
+    if topk_artifacts and topk >= 5:
+        test_recommendations = topk_artifacts['topk_table'][test_users, :5]
+    else:
+        test_recommendations, _ = top_n_items(als_model.user_factors, als_model.item_factors,
+                                              csr_train, test_users, n_reco=5)
+    evaluation = evaluate_model(test_recommendations, relevance[test_users], k=5)
+    evaluation.update(unseen_interactions(test_interactions, user_to_idx, item_to_idx))
+    print(f"   ✅ {evaluation['n_users']:,} utilisateurs: MAP@5 {evaluation['map@k']:.4f}, "
+          f"precision@5 {evaluation['precision@k']:.4f}, recall@5 {evaluation['recall@k']:.4f}, "
+          f"hit rate@5 {evaluation['hit_rate@k']:.4f}")
+    print(f"   Interactions de test hors modèle: {evaluation['unknown_users']:,} d'utilisateurs inconnus, "
+          f"{evaluation['unseen_items']:,} sur des articles absents du train")
     
-    # 7. Sérialiser tous les artefacts
-    print("\n7. Sérialisation des artefacts...")
+    # 9. Écrire le bundle d'artefacts (un .npy par array + manifest JSON, sans pickle)
+    print(f"\n9. Écriture du bundle d'artefacts dans '{bundle_dir}/'...")
     artifacts = {
         'als_model': als_model,
         'csr_train': csr_train,
-        'user_to_idx': user_to_idx,
-        'item_to_idx': item_to_idx,
         'unique_users': unique_users,
         'unique_items': unique_items,
-        'popularity_recommendations': popularity_recommendations
+        'popularity_recommendations': popularity_recommendations,
+        **topk_artifacts
     }
     
-    output_path = 'artifacts.pkl'
-    with open(output_path, 'wb') as f:
-        pickle.dump(artifacts, f)
-    
-    # Afficher la taille du fichier
-    file_size = Path(output_path).stat().st_size / (1024 * 1024)  # MB
-    print(f"   ✅ Artefacts sauvegardés dans '{output_path}' ({file_size:.2f} MB)")
-    
-    # 8. Sérialiser aussi séparément pour faciliter le chargement
-    print("\n8. Sauvegarde séparée des composants...")
-    
-    # Modèle ALS
-    with open('als_model.pkl', 'wb') as f:
-        pickle.dump(als_model, f)
-    print(f"   ✅ Modèle ALS: {Path('als_model.pkl').stat().st_size / (1024 * 1024):.2f} MB")
-    
-    # Mappings et metadata (plus petits)
-    metadata = {
-        'user_to_idx': user_to_idx,
-        'item_to_idx': item_to_idx,
-        'unique_users': unique_users,
-        'unique_items': unique_items,
-        'popularity_recommendations': popularity_recommendations
+    bundle_arrays = {}
+    bundle_metadata = {
+        'als_params': {
+            'factors': int(als_model.factors),
+            'regularization': float(als_model.regularization),
+            'alpha': float(getattr(als_model, 'alpha', 1.0)),
+            'iterations': int(als_model.iterations)
+        },
+        'evaluation': dict(evaluation, k=5, split=split_strategy)
     }
-    with open('metadata.pkl', 'wb') as f:
-        pickle.dump(metadata, f)
-    print(f"   ✅ Metadata: {Path('metadata.pkl').stat().st_size / (1024 * 1024):.2f} MB")
+    if topk_artifacts:
+        bundle_arrays['topk_table'] = topk_artifacts['topk_table']
+        bundle_metadata['topk_fingerprint'] = topk_artifacts['topk_fingerprint']
+    if ann_lists != 0:
+        ann_index = IVFIndex.build(als_model.item_factors, n_lists=ann_lists)
+        bundle_arrays.update(ann_index.to_arrays())
+        bundle_metadata['ann_n_lists'] = ann_index.n_lists
+        print(f"   ✅ Index IVF: {ann_index.n_lists} listes")
+    if content_k:
+        if Path(embeddings_path).exists():
+            with open(embeddings_path, 'rb') as f:
+                embeddings = np.asarray(pickle.load(f), dtype=np.float32)
+            # Les lignes d'embeddings suivent l'ordre de articles_metadata.csv
+            article_ids = articles['article_id'].values if len(articles) == len(embeddings) else None
+            content_index = ContentIndex.build(embeddings, article_ids, k=content_k,
+                                               keep_embeddings=content_embeddings)
+            bundle_arrays.update(content_index.to_arrays())
+            bundle_metadata['content'] = {
+                'embeddings': Path(embeddings_path).name,
+                'dim': int(embeddings.shape[1]),
+                'k': int(content_index.neighbours.shape[1])
+            }
+            print(f"   ✅ Graphe content-based: {content_index.n_articles:,} articles x {content_k} voisins "
+                  f"(embeddings {embeddings.shape[1]}d)")
+        else:
+            print(f"   ⚠️  {embeddings_path} introuvable, mode content-based non disponible")
+    
+    manifest = write_bundle(
+        bundle_dir, als_model.user_factors, als_model.item_factors, csr_train,
+        unique_users, unique_items, popularity_recommendations,
+        arrays=bundle_arrays, metadata=bundle_metadata,
+        factor_dtype=factor_dtype, keep_exact_factors=keep_exact_factors
+    )
+    for name, info in manifest['arrays'].items():
+        file_size = (Path(bundle_dir) / info['file']).stat().st_size / (1024 * 1024)  # MB
+        print(f"   ✅ {info['file']}: {info['dtype']} {tuple(info['shape'])} ({file_size:.2f} MB)")
+    print(f"   ✅ Manifest: version du modèle {manifest['model_version'][:12]}")
     
-    # Matrice CSR (peut être gros)
-    with open('csr_train.pkl', 'wb') as f:
-        pickle.dump(csr_train, f)
-    print(f"   ✅ Matrice CSR: {Path('csr_train.pkl').stat().st_size / (1024 * 1024):.2f} MB")
+    # 10. Anciens fichiers pickle séparés (optionnel, format historique)
+    if legacy_pickles:
+        print("\n10. Sauvegarde des fichiers pickle séparés (format historique)...")
+        
+        # Modèle ALS
+        with open('als_model.pkl', 'wb') as f:
+            pickle.dump(als_model, f)
+        print(f"   ✅ Modèle ALS: {Path('als_model.pkl').stat().st_size / (1024 * 1024):.2f} MB")
+        
+        # Mappings et metadata (plus petits)
+        # Les mappings user_to_idx / item_to_idx sont reconstruits au chargement
+        # depuis les arrays d'IDs triés (pas de dicts de scalaires numpy à dépickler)
+        metadata = {
+            'unique_users': unique_users,
+            'unique_items': unique_items,
+            'popularity_recommendations': popularity_recommendations,
+            **topk_artifacts
+        }
+        with open('metadata.pkl', 'wb') as f:
+            pickle.dump(metadata, f)
+        print(f"   ✅ Metadata: {Path('metadata.pkl').stat().st_size / (1024 * 1024):.2f} MB")
+        
+        # Matrice CSR (peut être gros)
+        with open('csr_train.pkl', 'wb') as f:
+            pickle.dump(csr_train, f)
+        print(f"   ✅ Matrice CSR: {Path('csr_train.pkl').stat().st_size / (1024 * 1024):.2f} MB")
     
     print("\n=== SÉRIALISATION TERMINÉE ===")
     print("\nFichiers créés:")
-    print("  - artifacts.pkl (tout en un)")
-    print("  - als_model.pkl (modèle seul)")
-    print("  - metadata.pkl (mappings et fallback)")
-    print("  - csr_train.pkl (matrice sparse)")
+    print(f"  - {bundle_dir}/ (bundle .npy + manifest.json, chargé en memory-mapping)")
+    if legacy_pickles:
+        print("  - als_model.pkl (modèle seul)")
+        print("  - metadata.pkl (mappings et fallback)")
+        print("  - csr_train.pkl (matrice sparse)")
     
     return artifacts
 
 if __name__ == "__main__":
-    artifacts = serialize_artifacts()
+    parser = argparse.ArgumentParser(description="Sérialisation des artefacts de recommandation")
+    parser.add_argument('--topk', type=int, default=50,
+                        help="Taille de la table top-K précalculée (0 pour désactiver)")
+    parser.add_argument('--bundle-dir', default='artifacts',
+                        help="Dossier de sortie du bundle d'artefacts")
+    parser.add_argument('--ann-lists', type=int, default=0,
+                        help="Listes de l'index approximatif IVF (0 pour désactiver, -1 pour ~4*sqrt(n_articles))")
+    parser.add_argument('--factor-dtype', choices=FACTOR_DTYPES, default='float32',
+                        help="Stockage des facteurs ALS (float16 / int8 : 2 à 4x plus compact)")
+    parser.add_argument('--exact-factors', action='store_true',
+                        help="Avec --factor-dtype float16/int8, garder aussi les facteurs float32 de re-ranking "
+                             "(bundle plus gros qu'en float32 seul)")
+    parser.add_argument('--content-k', type=int, default=20,
+                        help="Voisins par article du graphe content-based (0 pour désactiver)")
+    parser.add_argument('--embeddings', default='articles_embeddings.pickle',
+                        help="Embeddings d'articles (ex: articles_embeddings_reduced.pickle après PCA)")
+    parser.add_argument('--content-embeddings', action='store_true',
+                        help="Garder les embeddings normalisés dans le bundle (re-scoring cosinus exact)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processus de lecture des fichiers de clics (défaut: nombre de CPU)")
+    parser.add_argument('--split', choices=SPLIT_STRATEGIES, default='random',
+                        help="Séparation train/test par utilisateur (time : interactions les plus récentes en test)")
+    parser.add_argument('--factors', type=int, default=50, help="Facteurs latents ALS")
+    parser.add_argument('--regularization', type=float, default=0.01)
+    parser.add_argument('--iterations', type=int, default=15)
+    parser.add_argument('--alpha', type=float, default=1.0, help="Confiance ALS (C = alpha * clics)")
+    parser.add_argument('--legacy-pickles', action='store_true',
+                        help="Écrire aussi les fichiers als_model.pkl / metadata.pkl / csr_train.pkl")
+    args = parser.parse_args()
+    
+    artifacts = serialize_artifacts(topk=args.topk, bundle_dir=args.bundle_dir,
+                                    legacy_pickles=args.legacy_pickles,
+                                    ann_lists=None if args.ann_lists < 0 else args.ann_lists,
+                                    factor_dtype=args.factor_dtype,
+                                    keep_exact_factors=args.exact_factors,
+                                    content_k=args.content_k, embeddings_path=args.embeddings,
+                                    content_embeddings=args.content_embeddings,
+                                    n_workers=args.workers, split_strategy=args.split,
+                                    als_params={'factors': args.factors, 'regularization': args.regularization,
+                                                'iterations': args.iterations, 'alpha': args.alpha})
 
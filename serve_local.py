@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Serveur HTTP local pour les Azure Functions (sans runtime Azure ni réseau)
+
+Chaque fonction HTTP de azure_function/ (dossier avec function.json) est servie
+sur /api/<nom> avec ses méthodes déclarées ; la requête HTTP est adaptée en
+HttpRequest puis passée telle quelle au main() de la fonction. Les artefacts
+sont lus depuis un bundle local (ARTIFACTS_LOCAL_DIR).
+
+Avec --workers N, N processus écoutent le même port (SO_REUSEPORT : le noyau
+répartit les connexions) ; chacun charge son recommandeur, les arrays du bundle
+étant partagés via le memory-mapping. Le journal de la surcouche (RecordClicks)
+est commun aux workers, comme sur un hôte Azure.
+
+Usage:
+    python serve_local.py --artifacts artifacts --port 7071 --workers 4
+    python load_test.py --url http://localhost:7071/api/recommendarticle --rps 500
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from local_functions import FUNCTION_ROOT, ensure_azure_functions, load_function, use_local_artifacts
+
+
+def discover_functions(function_root=None) -> dict:
+    """
+    Fonctions HTTP déclarées dans azure_function/
+
+    Returns:
+        Dict route (minuscules) -> (nom du dossier, méthodes autorisées)
+    """
+    functions = {}
+    for config_path in sorted(Path(function_root or FUNCTION_ROOT).glob('*/function.json')):
+        with open(config_path, 'r') as f:
+            bindings = json.load(f).get('bindings', [])
+        for binding in bindings:
+            if binding.get('type') == 'httpTrigger':
+                route = binding.get('route') or config_path.parent.name
+                methods = {method.upper() for method in binding.get('methods', ['get', 'post'])}
+                functions[route.lower()] = (config_path.parent.name, methods)
+    return functions
+
+
+class FunctionRequestHandler(BaseHTTPRequestHandler):
+    """Adapte chaque requête HTTP en HttpRequest et appelle le main() de la fonction"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    # Renseignés par serve() : route -> (module, méthodes)
+    functions = {}
+
+    def _handle(self):
+        parts = urlsplit(self.path)
+        route = parts.path.strip('/')
+        route = route[len('api/'):] if route.lower().startswith('api/') else route
+        function = self.functions.get(route.lower())
+        if function is None:
+            return self._send(404, json.dumps({'error': f"Fonction inconnue: /{parts.path.strip('/')}"}).encode(),
+                              'application/json')
+        module, methods = function
+        if self.command not in methods:
+            return self._send(405, b'', None)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        func = ensure_azure_functions()
+        request = func.HttpRequest(
+            method=self.command,
+            url=f"http://{self.headers.get('Host', 'localhost')}{self.path}",
+            headers=dict(self.headers.items()),
+            params=dict(parse_qsl(parts.query, keep_blank_values=True)),
+            route_params={},
+            body=body
+        )
+        try:
+            response = module.main(request)
+        except Exception as e:
+            logging.exception(f"main() a levé une exception: {e}")
+            return self._send(500, json.dumps({'error': type(e).__name__, 'message': str(e)}).encode(),
+                              'application/json')
+        self._send(response.status_code, response.get_body(), response.mimetype, dict(response.headers))
+
+    def _send(self, status: int, body: bytes, mimetype, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            if name.lower() not in ('content-length', 'content-type', 'connection'):
+                self.send_header(name, value)
+        if mimetype:
+            self.send_header('Content-Type', f"{mimetype}; charset=utf-8")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """Serveur multi-thread ; SO_REUSEPORT permet à plusieurs processus d'écouter le même port"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def server_bind(self):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def serve(host: str, port: int, preload: bool = True, worker_id: int = 0):
+    """Importe les fonctions et sert les requêtes (un processus worker)"""
+    functions = {}
+    for route, (name, methods) in discover_functions().items():
+        functions[route] = (load_function(name), methods)
+    FunctionRequestHandler.functions = functions
+
+    if preload and 'recommendarticle' in functions:
+        start = time.perf_counter()
+        functions['recommendarticle'][0].load_recommender()
+        logging.warning(f"[worker {worker_id}] Recommandeur chargé en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    server = ReusePortHTTPServer((host, port), FunctionRequestHandler)
+    logging.warning(f"[worker {worker_id}] pid {os.getpid()} : http://{host}:{port}/api/"
+                    f"{{{', '.join(sorted(functions))}}}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def run_workers(n_workers: int, host: str, port: int, preload: bool = True):
+    """Lance n_workers processus serveurs (fork) et les arrête sur SIGINT / SIGTERM"""
+    if n_workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError("Plusieurs workers nécessitent SO_REUSEPORT (Linux / macOS)")
+    if n_workers == 1:
+        serve(host, port, preload)
+        return
+
+    children = []
+    for worker_id in range(n_workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                serve(host, port, preload, worker_id)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur HTTP local des Azure Functions")
+    parser.add_argument('--artifacts', default='artifacts', help="Bundle d'artefacts local")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7071)
+    parser.add_argument('--workers', type=int, default=1, help="Processus serveurs (SO_REUSEPORT)")
+    parser.add_argument('--cache-dir', default=None, help="Cache local des bundles (ARTIFACTS_CACHE_DIR)")
+    parser.add_argument('--no-preload', action='store_true',
+                        help="Charger le modèle à la première requête (mesure du cold start)")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(levelname)s %(message)s')
+    if not Path(args.artifacts).is_dir():
+        sys.exit(f"Bundle introuvable: '{args.artifacts}' (voir serialize_artifacts.py)")
+    use_local_artifacts(args.artifacts, cache_dir=args.cache_dir, overlay_log=None)
+
+    print("=== SERVEUR LOCAL DES AZURE FUNCTIONS ===")
+    print(f"Bundle: {args.artifacts} ; {args.workers} worker(s) sur http://{args.host}:{args.port}/api/")
+    run_workers(args.workers, args.host, args.port, preload=not args.no_preload)
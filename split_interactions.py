@@ -0,0 +1,117 @@
+"""
+Séparation train/test par utilisateur, vectorisée (numpy, sans boucle Python)
+
+Chaque utilisateur garde une fraction de ses interactions en test :
+- 'random' : interactions tirées au hasard (déterministe pour une graine donnée)
+- 'time'   : ses interactions les plus récentes (last_click_timestamp), plus
+             réaliste pour des articles d'actualité
+
+Les interactions sont triées une seule fois par (utilisateur, clé de tri) ; le
+rang de chaque ligne dans son segment utilisateur se déduit des bornes des
+segments. Un utilisateur avec une seule interaction reste entièrement en train
+(là où train_test_split(stratify=...) échoue).
+
+Usage:
+    python split_interactions.py --strategy time --test-size 0.2
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+SPLIT_STRATEGIES = ('random', 'time')
+
+
+def per_user_holdout(user_ids, sort_keys, test_size: float = 0.2, min_train: int = 1) -> np.ndarray:
+    """
+    Masque des lignes de test : les dernières lignes de chaque utilisateur selon sort_keys
+
+    Chaque utilisateur de n interactions en place round(n * test_size) en test,
+    en en gardant au moins min_train en train.
+
+    Args:
+        user_ids: user_id de chaque interaction (n,)
+        sort_keys: Clé de tri au sein d'un utilisateur (n,), les plus grandes vont en test
+        test_size: Fraction des interactions de chaque utilisateur placée en test
+        min_train: Nombre minimum d'interactions gardées en train par utilisateur
+
+    Returns:
+        Masque booléen (n,), True pour les lignes de test
+    """
+    user_ids = np.asarray(user_ids)
+    n_rows = len(user_ids)
+    if n_rows == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Tri par utilisateur puis par clé (lexsort : dernière clé = clé principale)
+    order = np.lexsort((np.asarray(sort_keys), user_ids))
+    sorted_users = user_ids[order]
+
+    # Bornes des segments utilisateur et rang de chaque ligne dans son segment
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+    sizes = np.diff(np.r_[starts, n_rows])
+    segment = np.repeat(np.arange(len(starts)), sizes)
+    rank = np.arange(n_rows) - starts[segment]
+
+    n_test = np.floor(sizes * test_size + 0.5).astype(np.int64)
+    n_test = np.clip(n_test, 0, np.maximum(sizes - min_train, 0))
+
+    test_mask = np.empty(n_rows, dtype=bool)
+    test_mask[order] = rank >= (sizes - n_test)[segment]
+    return test_mask
+
+
+def split_interactions(interactions: pd.DataFrame, test_size: float = 0.2, strategy: str = 'random',
+                       seed: int = 42, min_train: int = 1) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Sépare les interactions (user_id, article_id, count) en train / test par utilisateur
+
+    Args:
+        interactions: Table des interactions (avec last_click_timestamp pour 'time')
+        test_size: Fraction des interactions de chaque utilisateur placée en test
+        strategy: 'random' (tirage déterministe) ou 'time' (interactions les plus récentes)
+        seed: Graine du tirage 'random' (départage aussi les timestamps égaux en 'time')
+        min_train: Nombre minimum d'interactions gardées en train par utilisateur
+
+    Returns:
+        Tuple (train, test) dans l'ordre d'origine des lignes
+    """
+    if strategy not in SPLIT_STRATEGIES:
+        raise ValueError(f"Stratégie inconnue '{strategy}' (attendu: {', '.join(SPLIT_STRATEGIES)})")
+
+    rng = np.random.default_rng(seed)
+    random_keys = rng.random(len(interactions))
+    if strategy == 'time':
+        if 'last_click_timestamp' not in interactions.columns:
+            raise ValueError("Le split 'time' nécessite la colonne last_click_timestamp "
+                             "(load_interactions(..., with_timestamps=True))")
+        # Timestamp en clé principale, tirage aléatoire pour départager les égalités
+        order = np.lexsort((random_keys, interactions['last_click_timestamp'].values))
+        sort_keys = np.empty(len(order), dtype=np.int64)
+        sort_keys[order] = np.arange(len(order))
+    else:
+        sort_keys = random_keys
+
+    test_mask = per_user_holdout(interactions['user_id'].values, sort_keys, test_size, min_train)
+    return interactions[~test_mask], interactions[test_mask]
+
+
+if __name__ == "__main__":
+    from ingest_clicks import load_interactions
+
+    parser = argparse.ArgumentParser(description="Séparation train/test par utilisateur")
+    parser.add_argument('--clicks-dir', default='clicks')
+    parser.add_argument('--strategy', choices=SPLIT_STRATEGIES, default='random')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("=== SÉPARATION TRAIN/TEST PAR UTILISATEUR ===")
+    interactions = load_interactions(args.clicks_dir, with_timestamps=args.strategy == 'time')
+    start = time.perf_counter()
+    train, test = split_interactions(interactions, args.test_size, args.strategy, args.seed)
+    print(f"   ✅ {len(train):,} train / {len(test):,} test en {time.perf_counter() - start:.2f}s "
+          f"({args.strategy})")
+    print(f"   Utilisateurs avec un test: {test['user_id'].nunique():,} / {interactions['user_id'].nunique():,}")
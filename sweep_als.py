@@ -0,0 +1,193 @@
+"""
+Recherche d'hyperparamètres ALS en parallèle (factors, regularization, iterations, alpha)
+
+Chaque configuration de la grille est entraînée dans un processus du pool puis
+évaluée sur le split de test (evaluation.py). La matrice d'entraînement et la
+vérité terrain sont écrites une seule fois en .npy et ouvertes en memory-mapping
+par les workers : elles ne sont jamais picklées vers chaque processus, et les
+pages sont partagées via le cache disque de l'OS.
+
+Le classement (temps d'entraînement, taille du modèle, MAP@5...) est écrit en CSV.
+
+Usage:
+    python sweep_als.py --factors 32 64 128 --regularization 0.01 0.1 --iterations 15 --alpha 1 10 40
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from scipy.sparse import csr_matrix
+from typing import Optional
+
+from evaluation import evaluate_model, relevance_matrix
+from ingest_clicks import load_interactions
+from recommender import top_n_items
+from serialize_artifacts import create_sparse_matrix
+from split_interactions import SPLIT_STRATEGIES, split_interactions
+
+
+def write_shared_csr(matrix, data_dir, name: str):
+    """Écrit les arrays d'une matrice CSR en .npy (ouverts ensuite en memory-mapping)"""
+    for part in ('indptr', 'indices', 'data'):
+        np.save(Path(data_dir) / f"{name}_{part}.npy", getattr(matrix, part))
+
+
+def load_shared_csr(data_dir, name: str, shape) -> csr_matrix:
+    """
+    Matrice CSR adossée aux .npy memory-mappés (aucune copie des arrays)
+
+    Les arrays sont ouverts en copie sur écriture (mmap_mode='c') : implicit
+    exige des buffers inscriptibles, et les pages restent partagées entre
+    workers tant qu'elles ne sont pas modifiées.
+    """
+    arrays = [np.load(Path(data_dir) / f"{name}_{part}.npy", mmap_mode='c') for part in ('data', 'indices', 'indptr')]
+    return csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+
+def train_and_evaluate(config: dict, data_dir: str, shape, test_users_shape, k: int = 5,
+                       num_threads: int = 1) -> dict:
+    """
+    Entraîne une configuration ALS et l'évalue sur le split de test (exécuté dans un worker)
+
+    Args:
+        config: Hyperparamètres (factors, regularization, iterations, alpha)
+        data_dir: Dossier des matrices partagées (voir write_shared_csr)
+        shape: Shape de la matrice d'entraînement
+        test_users_shape: Shape de la vérité terrain (utilisateurs de test, articles)
+        k: Nombre de recommandations évaluées
+        num_threads: Threads d'implicit par worker
+
+    Returns:
+        Ligne du classement (config + métriques)
+    """
+    from implicit.als import AlternatingLeastSquares
+
+    csr_train = load_shared_csr(data_dir, 'train', shape)
+    relevance = load_shared_csr(data_dir, 'relevance', test_users_shape)
+    test_users = np.load(Path(data_dir) / 'test_users.npy', mmap_mode='r')
+
+    model = AlternatingLeastSquares(random_state=42, num_threads=num_threads, **config)
+    start = time.perf_counter()
+    model.fit(csr_train, show_progress=False)
+    train_time = time.perf_counter() - start
+
+    # Les modèles GPU d'implicit se ramènent sur CPU avec to_cpu()
+    if hasattr(model, 'to_cpu'):
+        model = model.to_cpu()
+    user_factors, item_factors = np.asarray(model.user_factors), np.asarray(model.item_factors)
+
+    start = time.perf_counter()
+    recommendations, _ = top_n_items(user_factors, item_factors, csr_train, np.asarray(test_users), n_reco=k)
+    evaluation = evaluate_model(recommendations, relevance, k)
+
+    return {
+        **config,
+        f'map@{k}': evaluation['map@k'],
+        f'precision@{k}': evaluation['precision@k'],
+        f'recall@{k}': evaluation['recall@k'],
+        f'hit_rate@{k}': evaluation['hit_rate@k'],
+        'train_s': train_time,
+        'eval_s': time.perf_counter() - start,
+        'model_mb': (user_factors.nbytes + item_factors.nbytes) / (1024 * 1024)
+    }
+
+
+def parameter_grid(factors, regularization, iterations, alpha) -> list:
+    """Produit cartésien des valeurs d'hyperparamètres"""
+    return [
+        {'factors': int(f), 'regularization': float(r), 'iterations': int(i), 'alpha': float(a)}
+        for f, r, i, a in itertools.product(factors, regularization, iterations, alpha)
+    ]
+
+
+def run_sweep(configs, clicks_dir='clicks', split_strategy='random', k: int = 5,
+              n_workers: Optional[int] = None, work_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Entraîne et évalue chaque configuration dans un pool de processus
+
+    Args:
+        configs: Liste de dicts d'hyperparamètres (voir parameter_grid)
+        clicks_dir: Dossier des fichiers clicks/*.csv
+        split_strategy: Séparation train/test ('random' ou 'time', comme serialize_artifacts.py)
+        k: Nombre de recommandations évaluées
+        n_workers: Configurations entraînées en parallèle (défaut: min(nb configs, nb CPU))
+        work_dir: Dossier des matrices partagées (défaut: dossier temporaire supprimé à la fin)
+
+    Returns:
+        Classement trié par MAP@k décroissante
+    """
+    print("1. Chargement et séparation des interactions...")
+    interactions = load_interactions(clicks_dir, with_timestamps=split_strategy == 'time')
+    train_interactions, test_interactions = split_interactions(interactions, test_size=0.2,
+                                                               strategy=split_strategy, seed=42)
+    csr_train, user_to_idx, item_to_idx, _, _ = create_sparse_matrix(train_interactions)
+    relevance = relevance_matrix(test_interactions, user_to_idx, item_to_idx, csr_train.shape[1])
+    test_users = np.flatnonzero(np.diff(relevance.indptr))
+    relevance = relevance[test_users]
+    print(f"   Matrice {csr_train.shape}, {len(test_users):,} utilisateurs de test")
+
+    n_cpus = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or n_cpus, len(configs)))
+    num_threads = max(1, n_cpus // n_workers)
+
+    data_dir = Path(work_dir) if work_dir else Path(tempfile.mkdtemp(prefix='als_sweep_'))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        write_shared_csr(csr_train, data_dir, 'train')
+        write_shared_csr(relevance, data_dir, 'relevance')
+        np.save(data_dir / 'test_users.npy', test_users)
+        del interactions, train_interactions, test_interactions
+
+        print(f"\n2. {len(configs)} configurations, {n_workers} workers x {num_threads} threads...")
+        rows = []
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(train_and_evaluate, config, str(data_dir), csr_train.shape,
+                                relevance.shape, k, num_threads)
+                for config in configs
+            ]
+            for future in as_completed(futures):
+                row = future.result()
+                rows.append(row)
+                print(f"   ✅ [{len(rows)}/{len(configs)}] factors={row['factors']} "
+                      f"reg={row['regularization']} it={row['iterations']} alpha={row['alpha']}: "
+                      f"MAP@{k} {row[f'map@{k}']:.4f} ({row['train_s']:.1f}s)")
+    finally:
+        if not work_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    return pd.DataFrame(rows).sort_values(f'map@{k}', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres ALS en parallèle")
+    parser.add_argument('--clicks-dir', default='clicks')
+    parser.add_argument('--factors', type=int, nargs='+', default=[50])
+    parser.add_argument('--regularization', type=float, nargs='+', default=[0.01])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[15])
+    parser.add_argument('--alpha', type=float, nargs='+', default=[1.0])
+    parser.add_argument('--split', choices=SPLIT_STRATEGIES, default='random')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="Configurations en parallèle (défaut: nb de CPU)")
+    parser.add_argument('--output', default='als_sweep.csv', help="Fichier CSV du classement")
+    args = parser.parse_args()
+
+    print("=== RECHERCHE D'HYPERPARAMÈTRES ALS ===")
+    configs = parameter_grid(args.factors, args.regularization, args.iterations, args.alpha)
+    leaderboard = run_sweep(configs, args.clicks_dir, args.split, args.k, args.workers)
+
+    print("\n=== CLASSEMENT ===")
+    print(leaderboard.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    leaderboard.to_csv(args.output, index=False)
+    print(f"\n✅ Classement sauvegardé dans '{args.output}'")
+    best = leaderboard.iloc[0]
+    print(f"Meilleure configuration: python serialize_artifacts.py --factors {int(best['factors'])} "
+          f"--regularization {best['regularization']} --iterations {int(best['iterations'])} "
+          f"--alpha {best['alpha']}")
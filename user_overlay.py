@@ -0,0 +1,126 @@
+"""
+Surcouche des utilisateurs connus mis à jour entre deux ré-entraînements
+
+Les nouveaux clics (user_id, article_id, count) d'un utilisateur connu sont
+ajoutés à sa ligne de la matrice d'interactions et son facteur ALS est recalculé
+seul (fold-in) ; le modèle stocké n'est pas modifié. Les événements sont ajoutés
+à un journal JSON lines dont la première ligne porte la version du modèle : le
+journal est rejoué au chargement, relu par les autres workers du même hôte, et
+abandonné au premier chargement d'un nouveau modèle.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class UserOverlay:
+    """Lignes d'interactions et facteurs recalculés des utilisateurs mis à jour"""
+
+    def __init__(self, model_version: str, log_path: Optional[str] = None):
+        """
+        Args:
+            model_version: Version du modèle auquel les facteurs se rapportent
+            log_path: Journal des événements (None = surcouche en mémoire uniquement)
+        """
+        self.model_version = model_version
+        self.log_path = Path(log_path) if log_path else None
+        self._entries = {}  # user_idx -> (item_indices, counts, factor)
+        self._revisions = {}  # user_idx -> nombre de mises à jour
+        self._offset = 0
+        self._inode = None
+        # Sérialise lecture du journal + application des événements (voir Recommender.sync_overlay)
+        self.lock = threading.Lock()
+
+    def __contains__(self, user_idx) -> bool:
+        return int(user_idx) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_idx):
+        """Tuple (item_indices, counts, factor) de l'utilisateur, ou None"""
+        return self._entries.get(int(user_idx))
+
+    def revision(self, user_idx) -> int:
+        """Nombre de mises à jour de l'utilisateur (0 s'il n'est pas dans la surcouche)"""
+        return self._revisions.get(int(user_idx), 0)
+
+    def update(self, user_idx, item_indices, counts, factor):
+        """Remplace d'un bloc la ligne et le facteur d'un utilisateur"""
+        user_idx = int(user_idx)
+        self._entries[user_idx] = (item_indices, counts, factor)
+        self._revisions[user_idx] = self._revisions.get(user_idx, 0) + 1
+
+    def open_log(self):
+        """
+        Prépare le journal pour le modèle courant
+
+        Un journal écrit pour un autre modèle est renommé en .stale puis remplacé :
+        les clics qu'il contient sont intégrés au prochain ré-entraînement.
+        """
+        if self.log_path is None:
+            return
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.log_path.exists() and self._read_header() != self.model_version:
+            os.replace(self.log_path, self.log_path.with_suffix('.stale'))
+        if not self.log_path.exists():
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps({'model_version': self.model_version}) + '\n')
+        self._offset = 0
+
+    def _read_header(self) -> Optional[str]:
+        try:
+            with open(self.log_path, 'r') as f:
+                return json.loads(f.readline()).get('model_version')
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def append(self, events: List[Tuple[int, int, float]]):
+        """Ajoute des événements au journal, en une seule écriture"""
+        if self.log_path is None or not events:
+            return
+        lines = ''.join(
+            json.dumps({'user_id': int(user_id), 'article_id': int(article_id), 'count': float(count)}) + '\n'
+            for user_id, article_id, count in events
+        )
+        with open(self.log_path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_new_events(self) -> List[Tuple[int, int, float]]:
+        """
+        Événements ajoutés au journal depuis la dernière lecture (tous workers)
+
+        Seules les lignes complètes sont consommées. Un journal appartenant à un
+        autre modèle (ou remplacé depuis la dernière lecture) est ignoré. À
+        appeler sous self.lock.
+        """
+        if self.log_path is None:
+            return []
+        try:
+            with open(self.log_path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode:
+                    self._inode, self._offset = inode, 0
+                if self._offset == 0:
+                    header = f.readline()
+                    if json.loads(header or b'{}').get('model_version') != self.model_version:
+                        return []
+                    self._offset = f.tell()
+                f.seek(self._offset)
+                data = f.read()
+        except (OSError, ValueError):
+            return []
+
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        events = []
+        for line in data[:end].splitlines():
+            if line.strip():
+                event = json.loads(line)
+                events.append((event['user_id'], event['article_id'], event.get('count', 1.0)))
+        return events